@@ -1,17 +1,20 @@
-from fastapi import APIRouter, HTTPException, status
-from app.core.security import create_access_token, verify_password
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.core.security import create_access_token, verify_and_update_password, get_current_user
 from app.models import Login, TokenResponse
 from pydantic import ValidationError
-from app.core.config import get_user_from_db, update_token_metadata  # ✅ Add update function
-from datetime import datetime, timedelta
-from app.core.utils import limiter
+from app.core.user_repository import user_repository
+from app.core.token_metadata import token_metadata
+from app.core.revocation import revocation_list
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from app.core.utils import limiter, route_limit
 from fastapi import Request 
 
 router = APIRouter()
 ACCESS_TOKEN_EXPIRE_MINUTES = 10
 
 @router.post("/token", response_model=TokenResponse)
-@limiter.limit("5/minute")  # Rate limiting
+@limiter.limit(route_limit("login", "5/minute"))  # Rate limiting
 async def login(login_data: dict, request: Request) -> TokenResponse:
     try:
         login = Login(**login_data)
@@ -23,14 +26,23 @@ async def login(login_data: dict, request: Request) -> TokenResponse:
         )
 
     # 🔄 Actual DB lookup
-    user = get_user_from_db(login.username)
-    if user is None or not verify_password(login.password, user["password"]):
-        update_token_metadata(login.username, success=False)  # ⛔ On failure
+    user = await user_repository.get_by_username(login.username)
+    valid, new_hash = (False, None)
+    if user is not None:
+        # 🔐 bcrypt runs on the password executor, not the event loop
+        valid, new_hash = await verify_and_update_password(login.password, user["password"])
+    if not valid:
+        if user is not None:
+            await token_metadata.record(user, success=False)  # ⛔ On failure
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
+    # ♻️ Stored hash uses outdated bcrypt rounds; upgrade it while we have the plaintext
+    if new_hash:
+        await user_repository.update_password_hash(user["id"], login.username, new_hash)
+
     user_roles = user.get("roles", [])
 
     # ✅ Generate access token
@@ -42,11 +54,33 @@ async def login(login_data: dict, request: Request) -> TokenResponse:
     # 🕒 Calculate token expiration time
     expire_time = (datetime.utcnow() + timedelta(minutes=expires_in_minutes)).isoformat()
 
-    # ✅ Update token metadata in DynamoDB
-    update_token_metadata(login.username, success=True, expire_time=expire_time)
+    # ✅ Update token metadata in DynamoDB (coalesced and written in the background)
+    await token_metadata.record(user, success=True, expire_time=expire_time)
 
     return {
         "token_type": "bearer",
         "access_token": access_token,
         "expires_in_minutes": expires_in_minutes
     }
+
+
+@router.post("/revoke", status_code=204)
+async def revoke_tokens(
+    username: Optional[str] = Query(None, description="Admins only; defaults to the caller"),
+    current_user=Depends(get_current_user)
+):
+    """
+    Revokes every token issued so far for a user (sign out everywhere).
+    """
+    username = username or current_user.username
+    if username != current_user.username and "admin" not in current_user.roles:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+
+    user = await user_repository.get_by_username(username)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    revoked_at = datetime.utcnow()
+    await user_repository.update(user["id"], username, {"tokens_revoked_at": revoked_at.isoformat()})
+    # Other workers pick it up on their next revocation list refresh
+    revocation_list.revoke(username, revoked_at.replace(tzinfo=timezone.utc).timestamp())
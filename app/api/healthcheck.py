@@ -1,8 +1,27 @@
-from fastapi import *
-
 from fastapi import APIRouter
+from fastapi.responses import Response
+from app.core.serialization import FastJSONResponse
+from app.core.scanner_health import scanner_monitor
+
 router = APIRouter()
 
+# Pre-encoded: the probe is the hottest route and its body never changes
+HEALTH_OK = b'{"status":"ok"}'
+
 @router.get("/")
 async def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return Response(content=HEALTH_OK, media_type="application/json")
+
+# 💓 Liveness: the process answers; never depends on clamd
+@router.get("/live")
+async def liveness():
+    return Response(content=HEALTH_OK, media_type="application/json")
+
+# 🩺 Readiness: served from the monitor's last probe, so checks never reach clamd
+@router.get("/ready")
+async def readiness():
+    scanner_monitor.ensure_started()
+    snapshot = scanner_monitor.snapshot()
+    if not snapshot["ready"]:
+        return FastJSONResponse(status_code=503, content={"status": "unavailable", **snapshot})
+    return FastJSONResponse(content={"status": "ok", **snapshot})
@@ -0,0 +1,123 @@
+import os
+import hmac
+import logging
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from dotenv import load_dotenv
+from app.core.metrics import registry, Gauge
+from app.core.scan_cache import scan_cache
+from app.core.principal_cache import principal_cache
+from app.core.mime import mime_policy
+from app.core.security import password_stats
+from app.core.cloudwatch import CloudWatchLoggingHandler
+from app.core.scan_pool import scan_pool
+from app.core.scanner_health import scanner_monitor
+from app.core.scan_history import scan_history
+from app.core.token_metadata import token_metadata
+from app.core.revocation import revocation_list
+from app.api.scan import job_queue, batch_slots, BATCH_CONCURRENCY
+
+# Load metrics settings
+load_dotenv(dotenv_path="app/.env")
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter()
+
+
+def _cloudwatch_handlers() -> list[CloudWatchLoggingHandler]:
+    return [h for h in logging.getLogger().handlers if isinstance(h, CloudWatchLoggingHandler)]
+
+
+def _cloudwatch_stats(key: str) -> float:
+    return sum(handler.stats[key] for handler in _cloudwatch_handlers())
+
+
+# Gauges read the existing stats at scrape time, so their owners pay nothing per request
+Gauge("scan_job_queue_depth", "Async scan jobs waiting for a worker", job_queue.depth)
+Gauge("batch_scan_slots_busy", "Batch items currently scanning", lambda: BATCH_CONCURRENCY - batch_slots._value)
+Gauge(
+    "clamd_pool_connections", "clamd session connections by scanner and state",
+    lambda: {
+        (node.name, state): count for node in scanner_monitor.states for state, count in node.client.pool_stats().items()
+    },
+    ("scanner", "state")
+)
+Gauge(
+    "scanner_available", "1 while the last probe of each clamd succeeded",
+    lambda: {(state.name,): int(state.available is not False) for state in scanner_monitor.states}, ("scanner",)
+)
+Gauge(
+    "scanner_outstanding_scans", "Scans in flight on each clamd",
+    lambda: {(state.name,): state.outstanding for state in scanner_monitor.states}, ("scanner",)
+)
+Gauge(
+    "scanner_scans", "Scans completed on each clamd",
+    lambda: {(state.name,): state.scans for state in scanner_monitor.states}, ("scanner",), kind="counter"
+)
+Gauge(
+    "scanner_monitor_events", "clamd probes, signature reloads, queued, retried and hedged scans",
+    lambda: {(key,): count for key, count in scanner_monitor.stats.items()}, ("event",), kind="counter"
+)
+Gauge("scan_pool_in_flight", "Hash and scan jobs queued or running in worker processes", lambda: scan_pool.stats["in_flight"])
+Gauge(
+    "scan_pool_jobs", "Scan pool jobs by lane and failure",
+    lambda: {(key,): scan_pool.stats[key] for key in ("small", "large", "timeouts", "broken")}, ("kind",), kind="counter"
+)
+Gauge("scan_history_queue_depth", "Scan records waiting to be written to the history store", scan_history.depth)
+Gauge(
+    "scan_history_records", "Scan history records by outcome",
+    lambda: {(key,): count for key, count in scan_history.stats.items()}, ("outcome",), kind="counter"
+)
+Gauge("password_hash_in_flight", "bcrypt jobs queued or running", lambda: password_stats["in_flight"])
+Gauge("scan_cache_entries", "Verdicts held in the in-memory scan cache", lambda: len(scan_cache._entries))
+Gauge(
+    "scan_cache_lookups", "Scan cache lookups and evictions by result",
+    lambda: {(result,): count for result, count in scan_cache.stats.items()}, ("result",), kind="counter"
+)
+Gauge("token_metadata_pending", "Users with token metadata waiting to be written", token_metadata.depth)
+Gauge(
+    "token_metadata_updates", "Token metadata updates by outcome",
+    lambda: {(key,): count for key, count in token_metadata.stats.items()}, ("outcome",), kind="counter"
+)
+Gauge("revocation_list_entries", "Users on the token revocation list", lambda: len(revocation_list.cutoffs))
+Gauge(
+    "revocation_list_events", "Revocation list refreshes, failures and rejected tokens",
+    lambda: {(key,): count for key, count in revocation_list.stats.items()}, ("event",), kind="counter"
+)
+Gauge("principal_cache_entries", "Principals held in the auth cache", lambda: len(principal_cache._entries))
+Gauge(
+    "principal_cache_lookups", "Principal cache lookups and invalidations by result",
+    lambda: {(result,): count for result, count in principal_cache.stats.items()}, ("result",), kind="counter"
+)
+Gauge(
+    "mime_policy_decisions", "MIME policy decisions by detected type",
+    lambda: {
+        (mime_type, decision): count
+        for mime_type, counts in mime_policy.stats.items()
+        for decision, count in counts.items()
+    },
+    ("mime_type", "decision"), kind="counter"
+)
+Gauge(
+    "cloudwatch_queue_depth", "Log events waiting to be shipped to CloudWatch",
+    lambda: sum(handler.queue_depth() for handler in _cloudwatch_handlers())
+)
+Gauge(
+    "cloudwatch_events", "CloudWatch shipper outcomes",
+    lambda: {(key,): _cloudwatch_stats(key) for key in ("sent", "retries", "spilled", "dropped")},
+    ("outcome",), kind="counter"
+)
+
+
+@router.get("", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Prometheus text exposition of every registered metric.
+    """
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api import auth, users, scan, healthcheck
+from app.api import auth, users, scan, healthcheck, metrics
 
 router = APIRouter()
 
@@ -7,3 +7,4 @@ router.include_router(auth.router, prefix="/auth", tags=["auth"])
 router.include_router(users.router, prefix="/users", tags=["users"])
 router.include_router(scan.router, prefix="/scan", tags=["users"])
 router.include_router(healthcheck.router, prefix="/healthcheck", tags=["healthcheck"])
+router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
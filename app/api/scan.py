@@ -1,19 +1,44 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Request
-from app.core.security import get_current_user
-from app.models import Scan
-from app.core.utils import limiter
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Request, Query
+from fastapi.responses import StreamingResponse, Response
+from app.core.security import get_current_user, require_role
+from app.models import Scan, BatchScanItem, BatchScanResponse, ScanJob, InfectedMember, ScanRecord, ScanHistoryPage
+from app.core.utils import limiter, route_limit
+from app.core.clamd import ClamdError, ClamdUnavailableError, CLAMD_CHUNK_SIZE
+from app.core.scan_cache import scan_cache, signature_version_from
+from app.core.archive import (
+    is_archive, expand_archive, unpack_archive, ArchiveLimitError, ARCHIVE_READ_ERRORS, ARCHIVE_INCREMENTAL
+)
+from app.core.jobs import JobQueue, QueueFullError, CallbackNotAllowedError, check_callback_url, JOB_SPOOL_DIR, JOB_RETRY_AFTER
+from app.core.spool import (
+    receive_upload, receive_raw_upload, is_raw_upload, check_content_length, SpooledUpload, UploadTooLargeError,
+    LimitedUploadRoute, UPLOAD_OPENAPI
+)
+from app.core.stream_scan import StreamScan, UploadStalledError, idle_limited
+from app.core.mime import detector, mime_policy, SNIFF_BYTES, DENY, ALLOW
+from app.core.metrics import scan_phase_seconds, scan_verdicts
+from app.core.scan_pool import scan_pool, shareable_path
+from app.core.scan_history import scan_history, HistoryQuery
+from app.core.scanner_health import scanner_monitor, SCANNER_RETRY_AFTER
+from app.core.serialization import model_response
 
 import os
-import subprocess
+import uuid
+import shutil
+import asyncio
+import hashlib
 import logging
+import tempfile
 import time
-import re
-import uuid
-import magic  # pip install python-magic
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
 
 # Initialize router
 router = APIRouter()
 
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
 # Setup logging
 logs_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
 os.makedirs(logs_directory, exist_ok=True)
@@ -26,80 +51,514 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
-def parse_virus_name(output: str) -> str | None:
+async def iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
     """
-    Extracts virus name from ClamAV output.
+    Yields the upload in chunks without loading it fully into memory.
     """
-    match = re.search(r'(?<=: )(.+?)(?= FOUND)', output)
-    return match.group(1).strip() if match else None
+    await file.seek(0)
+    while chunk := await file.read(CLAMD_CHUNK_SIZE):
+        yield chunk
+
+def sha256_of(fileobj) -> str:
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    while chunk := fileobj.read(CLAMD_CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
 
-def scan_file(file_path: str) -> tuple[bool, str]:
+async def hash_upload(file: UploadFile) -> str:
     """
-    Scans the file using ClamAV.
-    Returns tuple (infected: bool, virus_name: str).
+    SHA-256 of the upload, computed in the scan pool when the file is on disk.
+    """
+    path = shareable_path(file.file) if scan_pool.enabled else None
+    if path:
+        return await scan_pool.hash(path)
+    # Hash off the event loop; the multipart parser has already spooled the upload
+    return await asyncio.to_thread(sha256_of, file.file)
+
+def record_scan(
+    username: str, filename: str | None, sha256: str | None, size: int | None, mime_type: str | None,
+    infected: bool, virus_name: str | None, started: float
+):
     """
+    Queues the verdict for the scan history store; never waits on the write.
+    """
+    scan_history.record(ScanRecord(
+        id=uuid.uuid4().hex,
+        scanned_at=datetime.utcnow().isoformat(timespec="microseconds"),
+        username=username,
+        filename=filename,
+        sha256=sha256,
+        size=size,
+        mime_type=mime_type,
+        is_infected=infected,
+        infected_by=virus_name,
+        duration_ms=int((time.perf_counter() - started) * 1000),
+        signature_version=scan_cache.signature_version,
+    ))
+
+async def refresh_signature_version():
+    """
+    Re-reads the clamd signature version at most every SIGNATURE_CHECK_INTERVAL seconds.
+    """
+    if not scan_cache.signature_check_due():
+        return
     try:
-        logging.info(f"Scanning file: {file_path}")
-        result = subprocess.run(
-            ['clamdscan', file_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
+        await scan_cache.set_signature_version(signature_version_from(await scanner_monitor.primary.version()))
+    except ClamdError as e:
+        scan_cache.mark_signature_checked()
+        logging.warning(f"Could not read clamd signature version: {e}")
+
+def apply_mime_policy(mime_type: str, filename: str | None) -> bool:
+    """
+    Raises 415 for denied types. Returns True when the type is allowed without a scan.
+    """
+    decision = mime_policy.evaluate(mime_type, filename)
+    if decision == DENY:
+        logging.warning(f"Rejected {filename} by MIME policy ({mime_type})")
+        scan_verdicts.labels("rejected", "policy").inc()
+        raise HTTPException(status_code=415, detail=f"File type not allowed: {mime_type}")
+    if decision == ALLOW:
+        scan_verdicts.labels("clean", "policy").inc()
+        return True
+    return False
+
+async def sniff_upload(file: UploadFile) -> str:
+    head = await file.read(SNIFF_BYTES)
+    await file.seek(0)
+    return detector.detect(head)
+
+async def scan_on_available_scanner(
+    file: UploadFile, path: Optional[str], sha256: Optional[str] = None
+) -> tuple[bool, str | None]:
+    """
+    Scans on the clamd node the monitor picks for the file's hash, queueing
+    briefly while none is available (restart or signature reload). Scans
+    that lose their connection or time out are retried once on another
+    node; files on disk can also be hedged, since each attempt reads the path.
+    """
+    if path:
+        return await scanner_monitor.run(
+            lambda client: scan_pool.scan(path, client.socket_path, client.host, client.port), sha256, hedge=True
         )
+    return await scanner_monitor.run(lambda client: client.instream(iter_upload(file)), sha256)
+
+async def scan_file(file: UploadFile, sha256: Optional[str] = None, check_cache: bool = True) -> tuple[bool, str | None]:
+    """
+    Returns the cached verdict for the upload's SHA-256, or streams it to clamd (INSTREAM).
+    Pass `sha256` when it was already computed while the upload was spooled,
+    and check_cache=False when the caller already looked it up.
+    Files on disk are hashed and scanned in the scan pool's worker processes;
+    in-memory ones are streamed from the event loop.
+    Returns tuple (infected: bool, virus_name: str).
+    """
+    await refresh_signature_version()
+    path = shareable_path(file.file) if scan_pool.enabled else None
+    try:
+        if sha256 is None:
+            sha256 = await hash_upload(file)
+        cached = await scan_cache.get(sha256) if check_cache else None
+        if cached is not None:
+            logging.info(f"Cache hit for {file.filename} ({sha256})")
+            scan_verdicts.labels("infected" if cached.is_infected else "clean", "cache").inc()
+            return cached.is_infected, cached.infected_by
 
-        output = result.stdout + result.stderr
-        logging.debug(f"ClamAV scan output:\n{output}")
+        logging.info(f"Scanning file: {file.filename}")
+        with scan_phase_seconds.labels("clamd").time():
+            infected, virus_name = await scan_on_available_scanner(file, path, sha256)
+        scan_verdicts.labels("infected" if infected else "clean", "clamd").inc()
+        await scan_cache.put(sha256, infected, virus_name)
 
-        if result.returncode == 0:
-            logging.info(f"File is clean: {file_path}")
-            return False, None
-        elif result.returncode == 1:
-            virus_name = parse_virus_name(output)
-            logging.warning(f"Malware detected in {file_path}: {virus_name}")
-            return True, virus_name
+        if infected:
+            logging.warning(f"Malware detected in {file.filename}: {virus_name}")
         else:
-            raise RuntimeError(f"ClamAV scan failed (code {result.returncode}): {output}")
+            logging.info(f"File is clean: {file.filename}")
+        return infected, virus_name
 
-    except Exception as e:
+    except ClamdUnavailableError as e:
+        logging.error(f"Scanning error: {e}")
+        scan_verdicts.labels("error", "clamd").inc()
+        raise HTTPException(status_code=503, detail="Scanner temporarily unavailable", headers={"Retry-After": str(SCANNER_RETRY_AFTER)})
+    except (ClamdError, OSError) as e:
         logging.error(f"Scanning error: {e}")
+        scan_verdicts.labels("error", "clamd").inc()
         raise HTTPException(status_code=500, detail=f"Error scanning file: {str(e)}")
 
-@router.post("/", response_model=Scan)
-@limiter.limit("5/minute")
+def virus_names(members: List[InfectedMember]) -> str | None:
+    return ", ".join(dict.fromkeys(m.infected_by for m in members if m.infected_by)) or None
+
+async def scan_archive(file: UploadFile, sha256: str) -> tuple[bool, str | None, Optional[List[InfectedMember]]]:
+    """
+    Scans a zip/tar upload member by member. Every member is hashed while
+    it is unpacked and only those without a cached verdict are sent to
+    clamd, so re-uploading a bundle with one changed file scans one file.
+    Archives that can't be unpacked (encrypted, corrupt) are scanned whole.
+    A cached infected verdict is unpacked again to list the infected
+    members; their verdicts are cached, so that costs no clamd calls.
+    Returns tuple (infected, virus names, infected members).
+    """
+    await refresh_signature_version()
+    cached = await scan_cache.get(sha256)
+    if cached is not None and not cached.is_infected:
+        scan_verdicts.labels("clean", "cache").inc()
+        return False, None, None
+
+    loop = asyncio.get_running_loop()
+
+    async def lookup(digest: str):
+        return await scan_cache.get(digest)
+
+    def known(digest: str):
+        # The cache is only touched from the event loop; the unpacking thread waits for the answer
+        return asyncio.run_coroutine_threadsafe(lookup(digest), loop).result()
+
+    try:
+        with scan_phase_seconds.labels("unpack").time():
+            unpacked = await asyncio.to_thread(unpack_archive, file.file, file.filename or "archive", known)
+    except ArchiveLimitError as e:
+        raise HTTPException(status_code=413, detail=f"{file.filename}: {e}")
+    except ARCHIVE_READ_ERRORS as e:
+        logging.warning(f"Could not unpack {file.filename} ({e!r}); scanning it whole")
+        infected, virus_name = await scan_file(file, sha256)
+        return infected, virus_name, None
+
+    async def scan_member(member) -> tuple[bool, str | None]:
+        if member.file is None:
+            scan_verdicts.labels("infected" if member.verdict.is_infected else "clean", "cache").inc()
+            return member.verdict.is_infected, member.verdict.infected_by
+        async with batch_slots:
+            try:
+                upload = UploadFile(file=member.file, filename=member.name, size=member.size)
+                return await scan_file(upload, member.sha256, check_cache=False)
+            finally:
+                member.file.close()
+
+    members = unpacked.members
+    results = await asyncio.gather(*(scan_member(member) for member in members), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    infected_members = [
+        InfectedMember(name=member.name, infected_by=virus_name)
+        for member, (infected, virus_name) in zip(members, results) if infected
+    ]
+    # Cache nested archives too, so an unchanged inner bundle is skipped without unpacking it
+    for path, digest in unpacked.nested:
+        inside = [m for m in infected_members if m.name.startswith(f"{path}/")]
+        await scan_cache.put(digest, bool(inside), virus_names(inside))
+    virus_name = virus_names(infected_members)
+    await scan_cache.put(sha256, bool(infected_members), virus_name)
+    unseen = sum(member.file is not None for member in members)
+    logging.info(f"Archive {file.filename}: {len(members)} members, {unseen} scanned, {len(members) - unseen} already known")
+    return bool(infected_members), virus_name, infected_members
+
+async def scan_upload(file: UploadFile, sha256: str) -> tuple[bool, str | None, Optional[List[InfectedMember]]]:
+    """
+    The scan path shared by /scan/ and queued jobs: archives member by
+    member (when ARCHIVE_INCREMENTAL), everything else whole.
+    """
+    if ARCHIVE_INCREMENTAL and await asyncio.to_thread(is_archive, file.file):
+        return await scan_archive(file, sha256)
+    infected, virus_name = await scan_file(file, sha256)
+    return infected, virus_name, None
+
+async def scan_spooled(path: str, job: ScanJob) -> tuple[bool, str | None, Optional[List[InfectedMember]]]:
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        upload = UploadFile(file=f, filename=job.filename, size=job.size)
+        mime_type = await sniff_upload(upload)
+        sha256 = await hash_upload(upload)
+        infected, virus_name, infected_members = await scan_upload(upload, sha256)
+    record_scan(job.owner, job.filename, sha256, job.size, mime_type, infected, virus_name, started)
+    return infected, virus_name, infected_members
+
+# Background scan workers for ?async=true uploads
+job_queue = JobQueue(scan=scan_spooled)
+
+def spool_upload(file: UploadFile) -> str:
+    """
+    Copies the upload into JOB_SPOOL_DIR so it outlives the request.
+    """
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=JOB_SPOOL_DIR, prefix="scanjob_", delete=False) as spool:
+        shutil.copyfileobj(file.file, spool)
+    return spool.name
+
+async def submit_scan_job(file: UploadFile, owner: str, callback_url: Optional[str]) -> Response:
+    if callback_url:
+        try:
+            check_callback_url(callback_url)
+        except CallbackNotAllowedError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    spool_path = await asyncio.to_thread(spool_upload, file)
+    job = ScanJob(
+        id=uuid.uuid4().hex,
+        status="queued",
+        filename=file.filename,
+        size=os.path.getsize(spool_path),
+        owner=owner,
+        submitted_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+        callback_url=callback_url
+    )
+    try:
+        await job_queue.submit(job, spool_path)
+    except QueueFullError as e:
+        os.remove(spool_path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(JOB_RETRY_AFTER)})
+
+    logging.info(f"Queued scan job {job.id} for {file.filename} ({job.size} bytes) | User: {owner}")
+    return model_response(job, status_code=202)
+
+async def scan_stream(request: Request, filename: Optional[str], username: str) -> Scan | Response:
+    """
+    Scans a raw application/octet-stream body while it arrives (see StreamScan).
+    As soon as a checkpoint finds malware or the sniffed type is denied, the
+    rest of the body is left unread and the connection is closed.
+    """
+    check_content_length(request)
+    await refresh_signature_version()
+    started = time.perf_counter()
+    upload = SpooledUpload(filename)
+    stream = None
+    try:
+        try:
+            node = await scanner_monitor.acquire()
+            policy_checked = allowed = False
+            with scan_phase_seconds.labels("stream").time(), scanner_monitor.busy(node) as client:
+                stream = StreamScan(upload, client)
+                async for chunk in idle_limited(request.stream()):
+                    virus_name = await stream.feed(chunk)
+                    if virus_name is not None:
+                        await stream.stop()
+                        logging.warning(f"Malware detected in {filename} after {upload.size} bytes: {virus_name}; upload aborted")
+                        scan_verdicts.labels("infected", "stream").inc()
+                        record_scan(username, filename, None, upload.size, upload.mime_type, True, virus_name, started)
+                        result = Scan(
+                            time=time.strftime("%Y-%m-%d %H:%M:%S"), is_infected=True, infected_by=virus_name,
+                            aborted_at=upload.size
+                        )
+                        return model_response(result, headers={"Connection": "close"})
+                    if not policy_checked and upload.mime_type is not None:
+                        policy_checked = True
+                        try:
+                            allowed = apply_mime_policy(upload.mime_type, filename)
+                            if allowed:
+                                await stream.stop()
+                        except HTTPException as e:
+                            e.headers = {"Connection": "close"}
+                            raise
+                if allowed:
+                    # Not scanned, but the history record still needs the hash
+                    await upload.finish()
+                    verdict = (False, None)
+                else:
+                    verdict = await stream.finish()
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e), headers={"Connection": "close"})
+        except UploadStalledError as e:
+            logging.warning(f"Stream upload of {filename} stalled after {upload.size} bytes | User: {username}")
+            raise HTTPException(status_code=408, detail=str(e), headers={"Connection": "close"})
+        except ClamdUnavailableError as e:
+            logging.error(f"Scanning error: {e}")
+            scan_verdicts.labels("error", "clamd").inc()
+            raise HTTPException(status_code=503, detail="Scanner temporarily unavailable", headers={"Retry-After": str(SCANNER_RETRY_AFTER)})
+        except ClamdError as e:
+            logging.error(f"Scanning error: {e}")
+            scan_verdicts.labels("error", "clamd").inc()
+            raise HTTPException(status_code=500, detail=f"Error scanning file: {str(e)}")
+
+        logging.info(f"File received: {filename} | MIME: {upload.mime_type} | Size: {upload.size} | User: {username}")
+        if not policy_checked:
+            # Bodies shorter than the sniff window are typed once complete
+            apply_mime_policy(upload.mime_type, filename)
+        if verdict is None:
+            # The live pass lost clamd; scan the spooled copy through the usual retry path
+            scanner_monitor.report_failure(node.client)
+            infected, virus_name = await scan_file(upload.as_upload_file(), upload.sha256)
+        else:
+            infected, virus_name = verdict
+            if not allowed:
+                scan_verdicts.labels("infected" if infected else "clean", "stream").inc()
+                await scan_cache.put(upload.sha256, infected, virus_name)
+    finally:
+        if stream is not None:
+            await stream.stop()
+        upload.close()
+    if infected:
+        logging.warning(f"Malware detected in {filename}: {virus_name}")
+    record_scan(username, filename, upload.sha256, upload.size, upload.mime_type, infected, virus_name, started)
+    return Scan(time=time.strftime("%Y-%m-%d %H:%M:%S"), is_infected=infected, infected_by=virus_name)
+
+@router.post("/", response_model=Scan, openapi_extra=UPLOAD_OPENAPI)
+@limiter.limit(route_limit("scan", "5/minute"))
 async def scan_file_endpoint(
     request: Request,
-    file: UploadFile = File(...),
+    async_mode: bool = Query(False, alias="async", description="Queue the scan and return a job ID"),
+    callback_url: Optional[str] = Query(None, description="POSTed the finished job when async=true"),
+    filename: Optional[str] = Query(None, description="File name for application/octet-stream bodies"),
     user: str = Depends(get_current_user)
 ) -> Scan:
     """
     Endpoint to scan uploaded files.
     Supports all file types.
+    The multipart body is streamed straight to a spool file (hashed and
+    size-checked on the way), so large uploads never sit in memory.
+    Zip/tar uploads are scanned member by member, skipping known members.
+    Raw application/octet-stream bodies skip multipart parsing and are
+    scanned while they arrive, stopping early on a detection.
     """
-    unique_id = uuid.uuid4().hex
-    safe_filename = f"{unique_id}_{file.filename}"
-    file_location = os.path.join("/tmp", safe_filename)
+    if is_raw_upload(request) and not async_mode:
+        return await scan_stream(request, filename, user.username)
+    with scan_phase_seconds.labels("upload").time():
+        if is_raw_upload(request):
+            upload = await receive_raw_upload(request, filename)
+        else:
+            upload = await receive_upload(request)
+    started = time.perf_counter()
+    infected_members = None
+    try:
+        logging.info(f"File received: {upload.filename} | MIME: {upload.mime_type} | Size: {upload.size} | User: {user}")
+        if apply_mime_policy(upload.mime_type, upload.filename):
+            infected, virus_name = False, None
+        elif async_mode:
+            return await submit_scan_job(upload.as_upload_file(), user.username, callback_url)
+        else:
+            infected, virus_name, infected_members = await scan_upload(upload.as_upload_file(), upload.sha256)
+    finally:
+        with scan_phase_seconds.labels("cleanup").time():
+            upload.close()
+    record_scan(user.username, upload.filename, upload.sha256, upload.size, upload.mime_type, infected, virus_name, started)
+
+    # Build response
+    return Scan(
+        time=time.strftime("%Y-%m-%d %H:%M:%S"),
+        is_infected=infected,
+        infected_by=virus_name,
+        infected_members=infected_members
+    )
+
+async def scan_batch_item(file: UploadFile | BatchScanItem, username: str) -> BatchScanItem:
+    if isinstance(file, BatchScanItem):
+        # Already refused by expand_batch
+        return file
+    async with batch_slots:
+        started = time.perf_counter()
+        try:
+            mime_type = await sniff_upload(file)
+            allowed = apply_mime_policy(mime_type, file.filename)
+            sha256 = await hash_upload(file)
+            if allowed:
+                infected, virus_name = False, None
+            else:
+                infected, virus_name = await scan_file(file, sha256)
+        except HTTPException as e:
+            return BatchScanItem(filename=file.filename, error=e.detail)
+        finally:
+            await file.close()
+    record_scan(username, file.filename, sha256, file.size, mime_type, infected, virus_name, started)
+    return BatchScanItem(
+        filename=file.filename,
+        result=Scan(time=time.strftime("%Y-%m-%d %H:%M:%S"), is_infected=infected, infected_by=virus_name)
+    )
 
+async def expand_batch(files: List[UploadFile], expand_archives: bool) -> List[UploadFile | BatchScanItem]:
+    """
+    Replaces archives with their members. An archive over the unpack
+    limits becomes a per-item error; one that can't be read (encrypted,
+    corrupt) is scanned whole, as /scan/ does. Neither fails the batch.
+    """
+    parts: List[UploadFile | BatchScanItem] = []
+    for file in files:
+        if expand_archives and await asyncio.to_thread(is_archive, file.file):
+            try:
+                parts.extend(await asyncio.to_thread(expand_archive, file))
+            except ArchiveLimitError as e:
+                parts.append(BatchScanItem(filename=file.filename, error=str(e)))
+            except ARCHIVE_READ_ERRORS as e:
+                logging.warning(f"Could not unpack {file.filename} ({e!r}); scanning it whole")
+                await file.seek(0)
+                parts.append(file)
+        else:
+            parts.append(file)
+        if len(parts) > BATCH_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_FILES} files")
+    return parts
+
+@limiter.limit(route_limit("scan_batch", "5/minute"))
+async def scan_batch_endpoint(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    expand_archives: bool = Query(True, description="Scan zip/tar members individually"),
+    stream: bool = Query(False, description="Return NDJSON lines as each file finishes"),
+    user: str = Depends(get_current_user)
+):
+    """
+    Scans many files (or archive members) concurrently in one request.
+    The whole body is held to MAX_UPLOAD_SIZE, like the single-file endpoints.
+    """
+    parts = await expand_batch(files, expand_archives)
+    logging.info(f"Batch received: {len(files)} uploads, {len(parts)} parts | User: {user}")
+    tasks = [asyncio.ensure_future(scan_batch_item(part, user.username)) for part in parts]
+
+    if stream:
+        async def ndjson():
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield (await next_done).model_dump_json() + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    return BatchScanResponse(results=await asyncio.gather(*tasks))
+
+# Registered here rather than with @router.post: FastAPI parses File(...)
+# bodies before the endpoint runs, so the size limit lives in the route class
+router.add_api_route(
+    "/batch", scan_batch_endpoint, methods=["POST"], response_model=BatchScanResponse,
+    route_class_override=LimitedUploadRoute
+)
+
+@router.get("/jobs/{job_id}", response_model=ScanJob)
+async def scan_job_status(job_id: str, user=Depends(get_current_user)):
+    job = await job_queue.get(job_id)
+    if job is None or (job.owner != user.username and "admin" not in user.roles):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def utc_iso(value: Optional[datetime]) -> Optional[str]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds") if value is not None else None
+
+@router.get("/history", response_model=ScanHistoryPage)
+async def scan_history_endpoint(
+    username: Optional[str] = Query(None, description="Admins only; others always see their own scans"),
+    sha256: Optional[str] = Query(None, min_length=64, max_length=64),
+    since: Optional[datetime] = Query(None, description="Inclusive start (ISO 8601, UTC if no offset)"),
+    until: Optional[datetime] = Query(None, description="Inclusive end (ISO 8601, UTC if no offset)"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    user=Depends(get_current_user)
+):
+    """
+    Past verdicts, newest first, filtered by user, file hash and time range.
+    """
+    if "admin" not in user.roles:
+        username = user.username
+    query = HistoryQuery(username, sha256 and sha256.lower(), utc_iso(since), utc_iso(until), limit, cursor)
     try:
-        # Save uploaded file to disk
-        with open(file_location, "wb") as f:
-            f.write(await file.read())
-
-        # Detect MIME type
-        mime = magic.Magic(mime=True)
-        mime_type = mime.from_file(file_location)
-        logging.info(f"File received: {file.filename} | MIME: {mime_type} | User: {user}")
-
-        # Scan the file
-        infected, virus_name = scan_file(file_location)
-
-        # Build response
-        return Scan(
-            time=time.strftime("%Y-%m-%d %H:%M:%S"),
-            is_infected=infected,
-            infected_by=virus_name
-        )
+        items, next_cursor = await scan_history.query(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ScanHistoryPage(items=items, next_cursor=next_cursor)
 
-    finally:
-        # Always delete temporary file
-        if os.path.exists(file_location):
-            os.remove(file_location)
+@router.get("/cache/stats", response_model=dict)
+async def scan_cache_stats(user=Depends(require_role("admin"))):
+    return scan_cache.snapshot()
+
+@router.get("/mime/stats", response_model=dict)
+async def mime_policy_stats(user=Depends(require_role("admin"))):
+    return mime_policy.snapshot()
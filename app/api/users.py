@@ -1,24 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.core.security import get_current_user, require_role, hash_password
-from app.models import User, RegisteredUserResponse
-from app.core.config import get_user_from_db
-import boto3
-from dotenv import load_dotenv
-import os
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.core.security import get_current_user, require_role, hash_password_async, password_stats
+from app.models import User, RegisteredUserResponse, BulkRegisterResult
+from app.core.user_repository import user_repository
+from app.core.principal_cache import principal_cache
+from app.core.bulk_users import read_body, parse_rows, BULK_REGISTER_CHUNK, BULK_HASH_CONCURRENCY
 import uuid
-
-# Load AWS credentials
-load_dotenv(dotenv_path="app/.env")
-
-# AWS setup
-dynamodb = boto3.resource(
-    'dynamodb',
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
-users = os.getenv("DYNAMODB_USERS_TABLE")
-table = dynamodb.Table(users)
+import asyncio
+import logging
 
 router = APIRouter()
 
@@ -38,6 +27,29 @@ async def read_user_data(user: User = Depends(require_role("user"))):
     return {"message": "This is user data."}
 
 
+@router.get("/principal-cache/stats", response_model=dict)
+async def principal_cache_stats(user: User = Depends(require_role("admin"))):
+    return principal_cache.snapshot()
+
+
+@router.get("/password-hasher/stats", response_model=dict)
+async def password_hasher_stats(user: User = Depends(require_role("admin"))):
+    return password_stats
+
+
+def new_user_item(username: str, hashed_pw: str) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "username": username,
+        "password": hashed_pw,
+        "roles": ["user"],
+        "token_created": "",
+        "token_expiration": "",
+        "token_failed": 0,
+        "token_last_used": ""
+    }
+
+
 # ✅ Register route restricted to admin users only
 @router.post("/register", response_model=RegisteredUserResponse, status_code=201)
 async def register(
@@ -53,28 +65,17 @@ async def register(
             detail="Username and password are required."
         )
 
-    existing_user = get_user_from_db(username)
+    existing_user = await user_repository.get_by_username(username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already exists."
         )
 
-    user_id = str(uuid.uuid4())
-    hashed_pw = hash_password(password)
-
-    new_user = {
-        "id": user_id,
-        "username": username,
-        "password": hashed_pw,
-        "roles": ["user"],
-        "token_created": "",
-        "token_expiration": "",
-        "token_failed": 0,
-        "token_last_used": ""
-    }
+    hashed_pw = await hash_password_async(password)
+    new_user = new_user_item(username, hashed_pw)
 
-    table.put_item(Item=new_user)
+    await user_repository.create(new_user)
 
     return {
         "id": new_user["id"],
@@ -85,3 +86,71 @@ async def register(
         "token_failed": new_user["token_failed"],
         "token_last_used": new_user["token_last_used"]
     }
+
+
+# ✅ Bulk register, admin only; one NDJSON result line per input row
+@router.post("/register/bulk", response_class=StreamingResponse)
+async def register_bulk(
+    request: Request,
+    current_user: User = Depends(require_role("admin"))
+):
+    """
+    Registers many users from a CSV (username,password header), NDJSON or
+    JSON array body of at most BULK_REGISTER_MAX_BYTES, which is read into
+    memory whole before parsing. Existing usernames are checked with one
+    username-index query per distinct name, run concurrently; passwords are
+    hashed in parallel (leaving bcrypt slots free for logins) and users are
+    written BULK_REGISTER_CHUNK at a time with batched writes. Rows are
+    reported as they are decided.
+    """
+    rows = parse_rows(await read_body(request), request.headers.get("content-type"))
+    results: list[BulkRegisterResult] = []
+    pending: list[tuple[int, str, str]] = []
+    seen: set[str] = set()
+    for number, row in enumerate(rows, start=1):
+        username = str(row.get("username") or "").strip()
+        password = str(row.get("password") or "")
+        if not username or not password:
+            results.append(BulkRegisterResult(
+                row=number, username=username or None, status="invalid", error="Username and password are required."
+            ))
+        elif username in seen:
+            results.append(BulkRegisterResult(row=number, username=username, status="duplicate"))
+        else:
+            seen.add(username)
+            pending.append((number, username, password))
+
+    existing = await user_repository.existing_usernames(seen)
+    results.extend(
+        BulkRegisterResult(row=number, username=username, status="exists")
+        for number, username, _ in pending if username in existing
+    )
+    pending = [entry for entry in pending if entry[1] not in existing]
+    logging.info(f"Bulk register by {current_user.username}: {len(rows)} rows, {len(pending)} new users")
+    slots = asyncio.Semaphore(BULK_HASH_CONCURRENCY)
+
+    async def hash_limited(password: str) -> str:
+        async with slots:
+            return await hash_password_async(password)
+
+    async def ndjson():
+        for result in results:
+            yield result.model_dump_json() + "\n"
+        for start in range(0, len(pending), BULK_REGISTER_CHUNK):
+            chunk = pending[start:start + BULK_REGISTER_CHUNK]
+            hashed = await asyncio.gather(*(hash_limited(password) for _, _, password in chunk))
+            items = [new_user_item(username, hashed_pw) for (_, username, _), hashed_pw in zip(chunk, hashed)]
+            try:
+                await user_repository.create_many(items)
+                error = None
+            except Exception as e:
+                logging.error(f"Bulk register write failed for rows {chunk[0][0]}-{chunk[-1][0]}: {e}")
+                error = "Could not write user."
+            for (number, username, _), item in zip(chunk, items):
+                if error:
+                    result = BulkRegisterResult(row=number, username=username, status="error", error=error)
+                else:
+                    result = BulkRegisterResult(row=number, username=username, status="created", id=item["id"])
+                yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
@@ -0,0 +1,223 @@
+import os
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+from typing import BinaryIO, Callable, Iterator, NamedTuple, Optional
+from fastapi import UploadFile
+from dotenv import load_dotenv
+from app.core.mime import detector, SNIFF_BYTES
+
+# Load archive limits
+load_dotenv(dotenv_path="app/.env")
+
+ARCHIVE_MAX_ENTRIES = int(os.getenv("ARCHIVE_MAX_ENTRIES", "1000"))
+ARCHIVE_MAX_MEMBER_SIZE = int(os.getenv("ARCHIVE_MAX_MEMBER_SIZE", str(100 * 1024 * 1024)))
+ARCHIVE_MAX_TOTAL_SIZE = int(os.getenv("ARCHIVE_MAX_TOTAL_SIZE", str(512 * 1024 * 1024)))
+ARCHIVE_MAX_DEPTH = int(os.getenv("ARCHIVE_MAX_DEPTH", "3"))  # Nested archives unpacked before handing off to clamd
+ARCHIVE_MAX_RATIO = float(os.getenv("ARCHIVE_MAX_RATIO", "100"))  # Unpacked bytes allowed per archive byte
+ARCHIVE_INCREMENTAL = os.getenv("ARCHIVE_INCREMENTAL", "true").lower() == "true"
+SPOOL_MEMORY_SIZE = 1024 * 1024  # Members larger than this are spooled to disk
+
+# Raised by the zip/tar readers on corrupt, encrypted or unsupported members
+ARCHIVE_READ_ERRORS = (zipfile.BadZipFile, tarfile.TarError, RuntimeError, NotImplementedError, EOFError, OSError)
+
+
+# Zip-based documents and packages (OOXML, ODF/EPUB, jar/war, apk) rather than plain archives
+CONTAINER_MARKERS = ("[Content_Types].xml", "mimetype", "META-INF/MANIFEST.MF", "AndroidManifest.xml")
+
+
+class ArchiveLimitError(ValueError):
+    """Raised when an archive exceeds the configured entry or size limits."""
+
+
+def _is_plain_zip(fileobj: BinaryIO) -> bool:
+    fileobj.seek(0)
+    if detector.detect(fileobj.read(SNIFF_BYTES)) != "application/zip":
+        # Self-extracting executables, apk, and documents libmagic recognises
+        return False
+    fileobj.seek(0)
+    try:
+        with zipfile.ZipFile(fileobj) as archive:
+            names = set(archive.namelist())
+    except ARCHIVE_READ_ERRORS:
+        # Let the unpacker report it; unreadable archives are scanned whole
+        return True
+    return not any(marker in names for marker in CONTAINER_MARKERS)
+
+
+def is_archive(fileobj: BinaryIO) -> bool:
+    """
+    True for zip/tar files that are unpacked member by member. Zip-based
+    containers (docx, odt, jar, apk, self-extracting exe, ...) are not:
+    they go to clamd whole, so container-level signatures still fire.
+    """
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        try:
+            return _is_plain_zip(fileobj)
+        finally:
+            fileobj.seek(0)
+    fileobj.seek(0)
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r:*"):
+            return True
+    except tarfile.TarError:
+        return False
+    finally:
+        fileobj.seek(0)
+
+
+def _members(fileobj: BinaryIO) -> Iterator[tuple[str, BinaryIO]]:
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield info.filename, member
+        return
+
+    fileobj.seek(0)
+    with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+        for info in archive:
+            if info.isfile():
+                yield info.name, archive.extractfile(info)
+
+
+def _copy_limited(source: BinaryIO, target: BinaryIO, limit: int, digest=None) -> int:
+    copied = 0
+    while chunk := source.read(64 * 1024):
+        copied += len(chunk)
+        if copied > limit:
+            raise ArchiveLimitError("Archive contents exceed the configured size limits")
+        target.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+    target.seek(0)
+    return copied
+
+
+def _size_of(fileobj: BinaryIO) -> int:
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+def unpack_budget(fileobj: BinaryIO) -> int:
+    """
+    Bytes an archive may unpack to: ARCHIVE_MAX_RATIO times its own size,
+    capped by ARCHIVE_MAX_TOTAL_SIZE. Small archives always get SPOOL_MEMORY_SIZE.
+    """
+    return min(ARCHIVE_MAX_TOTAL_SIZE, max(int(_size_of(fileobj) * ARCHIVE_MAX_RATIO), SPOOL_MEMORY_SIZE))
+
+
+def expand_archive(file: UploadFile) -> list[UploadFile]:
+    """
+    Extracts a zip/tar upload into spooled UploadFiles, enforcing entry and size limits.
+    Sizes are counted from the decompressed bytes, not the (untrusted) headers.
+    """
+    expanded: list[UploadFile] = []
+    total = 0
+    budget = unpack_budget(file.file)
+    try:
+        for name, member in _members(file.file):
+            if len(expanded) >= ARCHIVE_MAX_ENTRIES:
+                raise ArchiveLimitError(f"Archive has more than {ARCHIVE_MAX_ENTRIES} entries")
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_SIZE)
+            try:
+                size = _copy_limited(member, spool, min(ARCHIVE_MAX_MEMBER_SIZE, budget - total))
+            except BaseException:
+                # Not in `expanded` yet, so the cleanup below wouldn't see it
+                spool.close()
+                raise
+            total += size
+            expanded.append(UploadFile(file=spool, filename=f"{file.filename}/{name}", size=size))
+    except BaseException:
+        for upload in expanded:
+            upload.file.close()
+        raise
+    return expanded
+
+
+
+class ArchiveMember(NamedTuple):
+    name: str
+    sha256: str
+    size: int
+    file: Optional[BinaryIO]  # None when `known` already had a verdict for the hash
+    verdict: object = None  # Whatever `known` returned for the hash
+
+
+class UnpackedArchive(NamedTuple):
+    members: list[ArchiveMember]
+    nested: list[tuple[str, str]]  # (path, sha256) of every nested archive that was unpacked
+
+
+class _Unpacker:
+    """
+    Streams archive members (recursing into nested archives) into spools,
+    hashing each on the way. Entry count and unpacked bytes are shared by
+    every nesting level, so a nested bomb can't multiply the limits.
+    """
+
+    def __init__(self, known: Callable[[str], object], budget: int, max_depth: int):
+        self.known = known
+        self.budget = budget
+        self.max_depth = max_depth
+        self.total = 0
+        self.entries = 0
+        self.members: list[ArchiveMember] = []
+        self.nested: list[tuple[str, str]] = []
+
+    def unpack(self, fileobj: BinaryIO, prefix: str, depth: int):
+        for name, member in _members(fileobj):
+            self.entries += 1
+            if self.entries > ARCHIVE_MAX_ENTRIES:
+                raise ArchiveLimitError(f"Archive has more than {ARCHIVE_MAX_ENTRIES} entries")
+            path = f"{prefix}/{name}"
+            spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_SIZE)
+            try:
+                digest = hashlib.sha256()
+                size = _copy_limited(member, spool, min(ARCHIVE_MAX_MEMBER_SIZE, self.budget - self.total), digest)
+                self.total += size
+                sha256 = digest.hexdigest()
+                verdict = self.known(sha256)
+                if verdict is not None:
+                    # Seen before (including whole nested archives): nothing to unpack or scan
+                    self.members.append(ArchiveMember(path, sha256, size, None, verdict))
+                    spool.close()
+                elif depth < self.max_depth and is_archive(spool):
+                    self.nested.append((path, sha256))
+                    self.unpack(spool, path, depth + 1)
+                    spool.close()
+                else:
+                    # Past max_depth nested archives go to clamd whole, under its own limits
+                    self.members.append(ArchiveMember(path, sha256, size, spool))
+            except BaseException:
+                spool.close()
+                raise
+
+
+def unpack_archive(
+    fileobj: BinaryIO, name: str, known: Callable[[str], object], max_depth: int = ARCHIVE_MAX_DEPTH
+) -> UnpackedArchive:
+    """
+    Unpacks a zip/tar (and archives nested up to max_depth levels) into
+    hashed members. `known(sha256)` is asked about every member as soon as
+    it is hashed; members it returns a verdict for are dropped right away,
+    so only unseen ones keep an open spool for the caller to scan and close.
+
+    Raises ArchiveLimitError when the entry, member size or ratio limits
+    are exceeded, and one of ARCHIVE_READ_ERRORS for archives that can't be read.
+    """
+    unpacker = _Unpacker(known, unpack_budget(fileobj), max_depth)
+    try:
+        unpacker.unpack(fileobj, name, 1)
+    except BaseException:
+        for member in unpacker.members:
+            if member.file is not None:
+                member.file.close()
+        raise
+    return UnpackedArchive(unpacker.members, unpacker.nested)
@@ -0,0 +1,30 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+# Load AWS settings
+load_dotenv(dotenv_path="app/.env")
+
+AWS_REGION = os.getenv("AWS_REGION")
+
+_session = None
+_lock = threading.Lock()
+
+
+def aws_session():
+    """
+    The process-wide boto3 Session, created on first use.
+
+    boto3 is imported here rather than at module level, so importing the
+    app doesn't pay for it, and botocore's service data is loaded once and
+    shared by every client and resource. Credentials come from the
+    standard AWS chain (env, profile, instance role).
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import boto3
+
+                _session = boto3.session.Session(region_name=AWS_REGION)
+    return _session
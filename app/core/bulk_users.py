@@ -0,0 +1,73 @@
+import io
+import os
+import csv
+from typing import Optional
+from fastapi import HTTPException, Request
+from dotenv import load_dotenv
+from app.core.security import BCRYPT_WORKERS
+from app.core.serialization import loads
+
+# Load bulk provisioning settings
+load_dotenv(dotenv_path="app/.env")
+
+BULK_REGISTER_MAX_ROWS = int(os.getenv("BULK_REGISTER_MAX_ROWS", "10000"))
+# The body is buffered whole before parsing (a JSON array can't be parsed in pieces),
+# so this is also the memory one upload may hold; split larger imports into several requests
+BULK_REGISTER_MAX_BYTES = int(os.getenv("BULK_REGISTER_MAX_BYTES", str(10 * 1024 * 1024)))
+BULK_REGISTER_CHUNK = int(os.getenv("BULK_REGISTER_CHUNK", "100"))  # Rows hashed and written per batch
+# bcrypt slots a bulk upload may hold at once; the rest stay free for logins
+BULK_HASH_CONCURRENCY = int(os.getenv("BULK_HASH_CONCURRENCY", str(max(1, BCRYPT_WORKERS - 1))))
+
+
+async def read_body(request: Request, max_bytes: int = BULK_REGISTER_MAX_BYTES) -> bytes:
+    """
+    Reads the whole request body into memory, failing with 413 as soon as
+    it grows past max_bytes. Nothing is parsed until the body is complete,
+    so max_bytes bounds what one upload holds.
+    """
+    too_large = HTTPException(
+        status_code=413, detail=f"Body exceeds {max_bytes} bytes; split the import into smaller requests"
+    )
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_bytes:
+            raise too_large
+    return bytes(body)
+
+
+def _row(value) -> dict:
+    # Non-object rows become empty ones and are reported as invalid
+    return value if isinstance(value, dict) else {}
+
+
+def parse_rows(body: bytes, content_type: Optional[str]) -> list[dict]:
+    """
+    CSV with a username,password header, NDJSON (one object per line) or a
+    JSON array -> list of row dicts. Raises 400 when the body can't be
+    parsed at all and 413 past BULK_REGISTER_MAX_ROWS.
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    try:
+        text = body.decode("utf-8-sig")
+        if media_type == "text/csv":
+            rows = [dict(row) for row in csv.DictReader(io.StringIO(text))]
+        elif media_type in ("application/x-ndjson", "application/jsonl"):
+            rows = [_row(loads(line)) for line in text.splitlines() if line.strip()]
+        elif media_type == "application/json":
+            data = loads(text)
+            if not isinstance(data, list):
+                raise ValueError("expected a JSON array of users")
+            rows = [_row(item) for item in data]
+        else:
+            raise HTTPException(
+                status_code=415, detail="Send text/csv, application/x-ndjson or a JSON array (application/json)"
+            )
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse users: {e}")
+    if len(rows) > BULK_REGISTER_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_REGISTER_MAX_ROWS} users per request")
+    return rows
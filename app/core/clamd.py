@@ -0,0 +1,207 @@
+import os
+import re
+import time
+import struct
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from dotenv import load_dotenv
+
+# Load clamd settings
+load_dotenv(dotenv_path="app/.env")
+
+CLAMD_SOCKET = os.getenv("CLAMD_SOCKET", "/var/run/clamav/clamd.ctl")
+CLAMD_HOST = os.getenv("CLAMD_HOST")  # When set, TCP is used instead of the Unix socket
+CLAMD_PORT = int(os.getenv("CLAMD_PORT", "3310"))
+CLAMD_POOL_SIZE = int(os.getenv("CLAMD_POOL_SIZE", "10"))
+CLAMD_TIMEOUT = float(os.getenv("CLAMD_TIMEOUT", "60"))
+CLAMD_IDLE_TIMEOUT = float(os.getenv("CLAMD_IDLE_TIMEOUT", "20"))  # Keep below clamd's IdleTimeout (30s)
+CLAMD_CHUNK_SIZE = int(os.getenv("CLAMD_CHUNK_SIZE", str(64 * 1024)))
+
+_FOUND = re.compile(r"^(?:.*?: )?(.+?) FOUND$")
+
+
+class ClamdError(Exception):
+    """Raised when clamd is unreachable or answers with an error."""
+
+
+class ClamdUnavailableError(ClamdError):
+    """Raised when clamd can't be reached or drops the connection (restart, reload); safe to retry."""
+
+
+class ClamdTimeoutError(ClamdError):
+    """Raised when clamd takes a command but doesn't answer in time (overloaded or stuck); safe to retry elsewhere."""
+
+
+def parse_reply(reply: str) -> tuple[bool, Optional[str]]:
+    """
+    Turns an INSTREAM reply into (infected, virus_name).
+    """
+    if reply.endswith("OK"):
+        return False, None
+    match = _FOUND.match(reply)
+    if match:
+        return True, match.group(1).strip()
+    raise ClamdError(reply)
+
+
+class ClamdConnection:
+    """
+    A single clamd socket kept in IDSESSION mode so it can serve many commands.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    @classmethod
+    async def open(cls, socket_path: Optional[str], host: Optional[str], port: int) -> "ClamdConnection":
+        if host:
+            reader, writer = await asyncio.open_connection(host, port)
+        else:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(b"zIDSESSION\0")
+        await writer.drain()
+        return cls(reader, writer)
+
+    def is_stale(self, idle_timeout: float) -> bool:
+        return self.reader.at_eof() or time.monotonic() - self.last_used > idle_timeout
+
+    async def command(self, name: bytes, chunks: Optional[AsyncIterator[bytes]] = None) -> str:
+        self.writer.write(b"z" + name + b"\0")
+        if chunks is not None:
+            async for chunk in chunks:
+                # A zero-length chunk would terminate the stream early
+                for start in range(0, len(chunk), CLAMD_CHUNK_SIZE):
+                    part = chunk[start:start + CLAMD_CHUNK_SIZE]
+                    self.writer.write(struct.pack("!L", len(part)) + part)
+                    await self.writer.drain()
+            self.writer.write(struct.pack("!L", 0))
+        await self.writer.drain()
+
+        reply = (await self.reader.readuntil(b"\0"))[:-1].decode("utf-8", "replace").strip()
+        # Session replies are prefixed with the request id, e.g. "3: stream: OK"
+        request_id, sep, rest = reply.partition(": ")
+        return rest if sep and request_id.isdigit() else reply
+
+    def close(self):
+        try:
+            self.writer.write(b"zEND\0")
+        except Exception:
+            pass
+        self.writer.close()
+
+
+class ClamdClient:
+    """
+    Async clamd client with a bounded pool of session connections.
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = CLAMD_SOCKET,
+        host: Optional[str] = CLAMD_HOST,
+        port: int = CLAMD_PORT,
+        pool_size: int = CLAMD_POOL_SIZE,
+        timeout: float = CLAMD_TIMEOUT,
+        idle_timeout: float = CLAMD_IDLE_TIMEOUT,
+    ):
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: list[ClamdConnection] = []
+
+    @property
+    def target(self) -> str:
+        return f"{self.host}:{self.port}" if self.host else self.socket_path
+
+    def __repr__(self):
+        return f"ClamdClient({self.target})"
+
+    def _take_idle(self) -> Optional[ClamdConnection]:
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.is_stale(self.idle_timeout):
+                return conn
+            conn.close()
+        return None
+
+    @asynccontextmanager
+    async def _connection(self):
+        async with self._slots:
+            conn = self._take_idle()
+            if conn is None:
+                conn = await asyncio.wait_for(
+                    ClamdConnection.open(self.socket_path, self.host, self.port), self.timeout
+                )
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            conn.last_used = time.monotonic()
+            self._idle.append(conn)
+
+    async def _command(
+        self, name: bytes, chunks: Optional[AsyncIterator[bytes]] = None, timeout: Optional[float] = None
+    ) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            async with self._connection() as conn:
+                return await asyncio.wait_for(conn.command(name, chunks), timeout)
+        except asyncio.TimeoutError as e:
+            raise ClamdTimeoutError(f"clamd at {self!r} did not answer within {timeout:.0f}s") from e
+        except (OSError, EOFError, asyncio.IncompleteReadError) as e:
+            raise ClamdUnavailableError(f"clamd at {self!r} unavailable: {e!r}") from e
+
+    async def ping(self) -> bool:
+        try:
+            return await self._command(b"PING") == "PONG"
+        except ClamdError:
+            return False
+
+    async def version(self) -> str:
+        return await self._command(b"VERSION")
+
+    async def instream(self, chunks: AsyncIterator[bytes], timeout: Optional[float] = None) -> tuple[bool, Optional[str]]:
+        """
+        Streams chunks to clamd and returns (infected, virus_name).
+        `timeout` covers producing the chunks too; it defaults to the client's.
+        """
+        reply = await self._command(b"INSTREAM", chunks, timeout)
+        logging.debug(f"clamd INSTREAM reply: {reply}")
+        return parse_reply(reply)
+
+    def pool_stats(self) -> dict:
+        return {"idle": len(self._idle), "busy": self.pool_size - self._slots._value}
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        await asyncio.gather(*(conn.writer.wait_closed() for conn in idle), return_exceptions=True)
+
+
+def client_from_address(address: str, **kwargs) -> ClamdClient:
+    """
+    "unix:/run/clamd.sock" or "/run/clamd.sock" -> Unix socket, "host:port" -> TCP.
+    """
+    address = address.strip()
+    if address.startswith("unix:"):
+        return ClamdClient(socket_path=address[5:], host=None, **kwargs)
+    if address.startswith("/"):
+        return ClamdClient(socket_path=address, host=None, **kwargs)
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid clamd address {address!r}; expected unix:/path or host:port")
+    return ClamdClient(socket_path=None, host=host, port=int(port), **kwargs)
+
+
+# Shared client used by the scan endpoints
+scanner = ClamdClient()
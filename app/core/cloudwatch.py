@@ -0,0 +1,232 @@
+import os
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+from app.core.aws import aws_session
+
+# Load shipper settings
+load_dotenv(dotenv_path="app/.env")
+
+CLOUDWATCH_QUEUE_SIZE = int(os.getenv("CLOUDWATCH_QUEUE_SIZE", "10000"))
+CLOUDWATCH_FLUSH_INTERVAL = float(os.getenv("CLOUDWATCH_FLUSH_INTERVAL", "5"))
+CLOUDWATCH_MAX_RETRIES = int(os.getenv("CLOUDWATCH_MAX_RETRIES", "5"))
+
+# PutLogEvents limits
+MAX_BATCH_EVENTS = 10000
+MAX_BATCH_BYTES = 1048576
+EVENT_OVERHEAD = 26
+MAX_EVENT_BYTES = 256 * 1024 - EVENT_OVERHEAD
+
+_STOP = object()
+
+
+class CloudWatchLoggingHandler(logging.Handler):
+    """
+    Ships log records to CloudWatch from a background thread.
+
+    emit() only enqueues; a shipper thread batches events up to the
+    PutLogEvents limits and flushes every CLOUDWATCH_FLUSH_INTERVAL seconds
+    or at shutdown. When the queue is full, records are appended to
+    spill_path (or dropped when no spill file is configured).
+
+    Nothing touches the network until start(): the shipper thread then
+    creates the logs client (when none was given) from the shared session
+    and, with provision=True, creates the log group and stream once
+    before shipping what has queued up meanwhile.
+    """
+
+    def __init__(
+        self,
+        client,
+        log_group: str,
+        log_stream: str,
+        queue_size: int = CLOUDWATCH_QUEUE_SIZE,
+        flush_interval: float = CLOUDWATCH_FLUSH_INTERVAL,
+        max_retries: int = CLOUDWATCH_MAX_RETRIES,
+        spill_path: Optional[str] = None,
+        provision: bool = False,
+    ):
+        super().__init__()
+        self.client = client
+        self.log_group = log_group
+        self.log_stream = log_stream
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spill_path = spill_path
+        self.provision = provision
+        self.sequence_token = None
+        self.stats = {"sent": 0, "batches": 0, "retries": 0, "spilled": 0, "dropped": 0}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()  # Callers (spills) and the shipper both count
+        self._carry = None  # Event that did not fit in the previous batch
+        self._thread = threading.Thread(target=self._run, name="cloudwatch-shipper", daemon=True)
+        atexit.register(self.close)
+
+    def start(self):
+        if not self._thread.is_alive() and self._thread.ident is None:
+            self._thread.start()
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        event = {
+            "timestamp": int(record.created * 1000),
+            "message": message.encode("utf-8")[:MAX_EVENT_BYTES].decode("utf-8", "ignore"),
+        }
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spill([event])
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=self.flush_interval + 5)
+        elif self._thread.ident is None:
+            # Never started (no lifespan ran): keep what was logged in the spill file
+            self._spill(self._drain())
+        super().close()
+
+    def _drain(self) -> list[dict]:
+        events = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                return events
+            if event is not _STOP:
+                events.append(event)
+
+    def _connect(self) -> bool:
+        """
+        Creates the client and provisions the group and stream, retrying with backoff.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.client is None:
+                    self.client = aws_session().client("logs")
+                if self.provision:
+                    for create, kwargs in (
+                        (self.client.create_log_group, {"logGroupName": self.log_group}),
+                        (self.client.create_log_stream, {"logGroupName": self.log_group, "logStreamName": self.log_stream}),
+                    ):
+                        try:
+                            create(**kwargs)
+                        except self.client.exceptions.ResourceAlreadyExistsException:
+                            pass
+                return True
+            except Exception as e:
+                failure = e
+            if attempt < self.max_retries:
+                time.sleep(random.uniform(0, min(30.0, 0.2 * 2 ** attempt)))
+        print(f"Could not set up CloudWatch log stream {self.log_group}/{self.log_stream}: {failure}")
+        return False
+
+    def _spill(self, events: list[dict]):
+        if not self.spill_path:
+            self._count("dropped", len(events))
+            return
+        with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(f"{event['timestamp']} {event['message']}\n")
+        self._count("spilled", len(events))
+
+    @staticmethod
+    def _event_size(event: dict) -> int:
+        return len(event["message"].encode("utf-8")) + EVENT_OVERHEAD
+
+    def _next_batch(self) -> tuple[list[dict], bool]:
+        """
+        Collects events until a PutLogEvents limit is hit or the flush interval ends.
+        The event carried over from the previous batch counts against the limits too.
+        """
+        batch, size = [], 0
+        if self._carry is not None:
+            batch.append(self._carry)
+            size = self._event_size(self._carry)
+            self._carry = None
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < MAX_BATCH_EVENTS:
+            try:
+                event = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return batch, False
+            if event is _STOP:
+                return batch, True
+            event_size = self._event_size(event)
+            if size + event_size > MAX_BATCH_BYTES:
+                self._carry = event
+                return batch, False
+            batch.append(event)
+            size += event_size
+        return batch, False
+
+    def _run(self):
+        if not self._connect():
+            # No CloudWatch for this process; everything goes to the spill file instead
+            self.client = None
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._ship(sorted(batch, key=lambda e: e["timestamp"]))
+        if self._carry:
+            self._ship([self._carry])
+
+    def _ship(self, events: list[dict]):
+        import botocore.exceptions
+
+        if self.client is None:
+            self._spill(events)
+            return
+        for attempt in range(self.max_retries + 1):
+            kwargs = {
+                "logGroupName": self.log_group,
+                "logStreamName": self.log_stream,
+                "logEvents": events,
+            }
+            if self.sequence_token:
+                kwargs["sequenceToken"] = self.sequence_token
+            try:
+                response = self.client.put_log_events(**kwargs)
+                self.sequence_token = response.get("nextSequenceToken")
+                self._count("sent", len(events))
+                self._count("batches")
+                return
+            except botocore.exceptions.ClientError as e:
+                error = e.response.get("Error", {})
+                if error.get("Code") in ("InvalidSequenceTokenException", "DataAlreadyAcceptedException"):
+                    self.sequence_token = e.response.get("expectedSequenceToken") or self._token_from(error)
+                    if error.get("Code") == "DataAlreadyAcceptedException":
+                        return
+                failure = e
+            except (botocore.exceptions.BotoCoreError, OSError) as e:
+                failure = e
+            if attempt < self.max_retries:
+                self._count("retries")
+                # Exponential backoff with full jitter
+                time.sleep(random.uniform(0, min(30.0, 0.2 * 2 ** attempt)))
+
+        print(f"Failed to send {len(events)} log events to CloudWatch: {failure}")
+        self._spill(events)
+
+    @staticmethod
+    def _token_from(error: dict) -> Optional[str]:
+        message = error.get("Message", "")
+        return message.rsplit(" ", 1)[-1] if "sequenceToken" in message else None
@@ -1,56 +1,23 @@
 import os
 from base64 import urlsafe_b64encode
 from passlib.context import CryptContext
-import boto3
 from dotenv import load_dotenv
-from datetime import datetime
 import warnings
 warnings.filterwarnings("ignore", message=".*error reading bcrypt version.*")
 import logging
 logging.getLogger("passlib").setLevel(logging.ERROR)
 logging.getLogger("bcrypt").setLevel(logging.ERROR)
-# Load AWS credentials
+# Load settings
 load_dotenv(dotenv_path="app/.env")
-# AWS setup
-dynamodb = boto3.resource(
-    'dynamodb',
-    region_name="region",
-    aws_access_key_id="id",
-    aws_secret_access_key="key"
-)
-users = os.getenv("DYNAMODB_USERS_TABLE")  # Default to 'users' if not set
-table = dynamodb.Table(users)
 
-SECRET_KEY = urlsafe_b64encode(os.urandom(32)).decode('utf-8')  # Use a fixed one in production
-ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Function to get user from DynamoDB
-def get_user_from_db(username: str):
-    response = table.scan(
-        FilterExpression="username = :u",
-        ExpressionAttributeValues={":u": username}
-    )
-    items = response.get("Items", [])
-    return items[0] if items else None
-def update_token_metadata(username: str, success: bool, expire_time: str = ""):
-    user = get_user_from_db(username)
-    if not user:
-        return
-
-    updates = {
-        "token_last_used": datetime.utcnow().isoformat()
-    }
+# Signing key shared by every worker and replica; without it each process signs with its own random key
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+# Keys being rotated out: still accepted for verification, never used to sign
+JWT_PREVIOUS_SECRET_KEYS = [key.strip() for key in os.getenv("JWT_PREVIOUS_SECRET_KEYS", "").split(",") if key.strip()]
 
-    if success:
-        updates["token_created"] = datetime.utcnow().isoformat()
-        updates["token_expiration"] = expire_time
-        updates["token_failed"] = 0
-    else:
-        updates["token_failed"] = int(user.get("token_failed", 0)) + 1
-
-    table.update_item(
-        Key={"id": user["id"]},  # Assumes 'id' is the partition key
-        UpdateExpression="SET " + ", ".join(f"{k} = :{k}" for k in updates),
-        ExpressionAttributeValues={f":{k}": v for k, v in updates.items()}
-    )
\ No newline at end of file
+SECRET_KEY = JWT_SECRET_KEY or urlsafe_b64encode(os.urandom(32)).decode('utf-8')
+if not JWT_SECRET_KEY:
+    logging.getLogger(__name__).warning("JWT_SECRET_KEY is not set; tokens are only valid in this process and die with it")
+VERIFY_KEYS = [SECRET_KEY, *JWT_PREVIOUS_SECRET_KEYS]
+ALGORITHM = "HS256"
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
\ No newline at end of file
@@ -0,0 +1,277 @@
+import os
+import ssl
+import time
+import socket
+import asyncio
+import logging
+import itertools
+import ipaddress
+import http.client
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from app.models import ScanJob, Scan, InfectedMember
+
+# Load job queue settings
+load_dotenv(dotenv_path="app/.env")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+JOB_SMALL_FILE_SIZE = int(os.getenv("JOB_SMALL_FILE_SIZE", str(10 * 1024 * 1024)))
+JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER", "30"))
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "/tmp")
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "10000"))
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "10"))
+# Hosts callback_url may point at, e.g. "hooks.example.com,*.ci.example.com"; empty disables callbacks
+JOB_CALLBACK_HOSTS = os.getenv("JOB_CALLBACK_HOSTS", "")
+
+SMALL_LANE, LARGE_LANE = 0, 1
+
+# scan(path, job) -> (infected, virus_name, infected archive members)
+ScanFn = Callable[[str, ScanJob], Awaitable[tuple[bool, Optional[str], Optional[List[InfectedMember]]]]]
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work."""
+
+
+class CallbackNotAllowedError(ValueError):
+    """Raised when a callback_url is not an allowed http(s) host on a public address."""
+
+
+class JobBackend(ABC):
+    """
+    Storage for job records. Subclass to persist jobs outside the process.
+    """
+
+    @abstractmethod
+    async def save(self, job: ScanJob):
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[ScanJob]:
+        ...
+
+
+class InMemoryJobBackend(JobBackend):
+    """
+    Process-local job store; keeps the most recent JOB_HISTORY_SIZE jobs.
+    """
+
+    def __init__(self, max_jobs: int = JOB_HISTORY_SIZE):
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict[str, ScanJob] = OrderedDict()
+
+    async def save(self, job: ScanJob):
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[ScanJob]:
+        return self._jobs.get(job_id)
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_callback_hosts(spec: str) -> list[str]:
+    return [host.strip().lower().rstrip(".") for host in spec.split(",") if host.strip()]
+
+
+def callback_host_allowed(host: str, allowed: list[str]) -> bool:
+    host = host.lower().rstrip(".")
+    for pattern in allowed:
+        if pattern.startswith("*."):
+            if host.endswith(pattern[1:]):
+                return True
+        elif host == pattern:
+            return True
+    return False
+
+
+def check_callback_url(url: str, allowed: Optional[list[str]] = None) -> tuple[str, str, int]:
+    """
+    Validates callback_url against JOB_CALLBACK_HOSTS.
+    Returns (scheme, host, port); raises CallbackNotAllowedError.
+    """
+    allowed = parse_callback_hosts(JOB_CALLBACK_HOSTS) if allowed is None else allowed
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise CallbackNotAllowedError("callback_url must be an http(s) URL")
+    if parts.username or parts.password:
+        raise CallbackNotAllowedError("callback_url must not carry credentials")
+    if not callback_host_allowed(parts.hostname, allowed):
+        raise CallbackNotAllowedError(f"callback_url host {parts.hostname} is not allowed")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise CallbackNotAllowedError("callback_url has an invalid port")
+    return parts.scheme, parts.hostname, port
+
+
+def public_address(host: str, port: int) -> str:
+    """
+    Resolves host and returns one of its addresses. Raises
+    CallbackNotAllowedError when any of them is loopback, private,
+    link-local (e.g. the 169.254.169.254 metadata service) or otherwise
+    not globally routable.
+    """
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise CallbackNotAllowedError(f"callback_url host {host} does not resolve: {e}")
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise CallbackNotAllowedError(f"callback_url host {host} resolves to a non-public address")
+    return addresses[0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    # Connects to the address that was checked, so a second DNS answer can't redirect the POST
+    def __init__(self, host: str, port: int, address: str, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host: str, port: int, address: str, **kwargs):
+        super().__init__(host, port, context=ssl.create_default_context(), **kwargs)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        # Certificate and SNI are still checked against the host name
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def _post_callback(job: ScanJob):
+    """
+    POSTs the finished job to its callback_url. The host is checked against
+    the allowlist and resolved again here, and the request goes to the
+    checked address. Redirects are not followed.
+    """
+    scheme, host, port = check_callback_url(job.callback_url)
+    address = public_address(host, port)
+    connection_class = _PinnedHTTPSConnection if scheme == "https" else _PinnedHTTPConnection
+    connection = connection_class(host, port, address, timeout=JOB_CALLBACK_TIMEOUT)
+    parts = urlsplit(job.callback_url)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    try:
+        connection.request(
+            "POST", target, body=job.model_dump_json().encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        response = connection.getresponse()
+        response.read()
+        if response.status >= 300:
+            raise http.client.HTTPException(f"callback answered {response.status} {response.reason}")
+    finally:
+        connection.close()
+
+
+class JobQueue:
+    """
+    In-process priority queue of spooled uploads drained by a pool of scan workers.
+    Small files go to a higher-priority lane so large ISOs don't starve them.
+    """
+
+    def __init__(
+        self,
+        scan: ScanFn,
+        backend: Optional[JobBackend] = None,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_MAX,
+        small_file_size: int = JOB_SMALL_FILE_SIZE,
+    ):
+        self.scan = scan
+        self.backend = backend or InMemoryJobBackend()
+        self.workers = workers
+        self.max_queued = max_queued
+        self.small_file_size = small_file_size
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._sequence = itertools.count()
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue(maxsize=self.max_queued)
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def submit(self, job: ScanJob, spool_path: str) -> ScanJob:
+        """
+        Queues a spooled upload. Raises QueueFullError instead of waiting.
+        """
+        self._ensure_started()
+        lane = SMALL_LANE if job.size <= self.small_file_size else LARGE_LANE
+        await self.backend.save(job)
+        try:
+            self._queue.put_nowait((lane, next(self._sequence), job.id, spool_path))
+        except asyncio.QueueFull:
+            job.status, job.error = "failed", "Job queue is full"
+            await self.backend.save(job)
+            raise QueueFullError(f"Job queue is full ({self.max_queued} jobs)")
+        return job
+
+    async def get(self, job_id: str) -> Optional[ScanJob]:
+        return await self.backend.get(job_id)
+
+    async def _worker(self, number: int):
+        while True:
+            _, _, job_id, spool_path = await self._queue.get()
+            try:
+                await self._run(job_id, spool_path)
+            except Exception as e:
+                logging.error(f"Scan worker {number} failed on job {job_id}: {e}")
+            finally:
+                if os.path.exists(spool_path):
+                    os.remove(spool_path)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, spool_path: str):
+        job = await self.backend.get(job_id)
+        if job is None:
+            return
+        job.status = "running"
+        await self.backend.save(job)
+        try:
+            infected, virus_name, infected_members = await self.scan(spool_path, job)
+            job.result = Scan(
+                time=_now(), is_infected=infected, infected_by=virus_name, infected_members=infected_members
+            )
+            job.status = "done"
+        except Exception as e:
+            job.error = str(getattr(e, "detail", e))
+            job.status = "failed"
+        job.finished_at = _now()
+        await self.backend.save(job)
+
+        if job.callback_url:
+            try:
+                await asyncio.to_thread(_post_callback, job)
+            except Exception as e:
+                logging.warning(f"Callback for job {job.id} to {job.callback_url} failed: {e}")
+
+    async def stop(self):
+        """
+        Waits for queued jobs to finish, then stops the workers.
+        """
+        if self._queue is None:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue, self._tasks = None, []
@@ -0,0 +1,250 @@
+import time
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+# Latency buckets in seconds, from a cache hit up to a large-file scan
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = tuple[str, dict, float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def route_label(scope) -> str:
+    """
+    The route template for a matched request, e.g. /scan/jobs/{job_id}.
+    Rebuilt from the path and path_params so it doesn't depend on how the
+    router nests included routes; unmatched paths share one label.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    for name, value in scope.get("path_params", {}).items():
+        value = str(value)
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == value:
+                segments[i] = "{" + name + "}"
+                break
+    return "/".join(segments)
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self.lock:
+            return list(self.counts), self.sum
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    @abstractmethod
+    def samples(self) -> list[Sample]:
+        ...
+
+
+class _LabelledMetric(_Metric):
+    """
+    A metric updated in place through one child per label-value tuple.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self._children: dict[tuple, object] = {}
+        super().__init__(name, documentation, labelnames)
+
+    @abstractmethod
+    def _new_child(self):
+        ...
+
+    def labels(self, *values):
+        """
+        Returns the child for these label values. Callers on a hot path can
+        keep the child and update it directly.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            key = tuple(str(v) for v in values)
+            child = self._children.get(key) or self._children.setdefault(key, self._new_child())
+        return child
+
+
+class Counter(_LabelledMetric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self) -> list[Sample]:
+        return [
+            (f"{self.name}_total", dict(zip(self.labelnames, values)), child.value)
+            for values, child in list(self._children.items())
+        ]
+
+
+class Histogram(_LabelledMetric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self) -> list[Sample]:
+        samples = []
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Gauge(_Metric):
+    """
+    Read at scrape time from a callback, so owners of the value (queues,
+    pools, caches) never pay for it on their hot path. The callback returns
+    a number, or a dict of label-value tuples to numbers. Use
+    kind="counter" for monotonic totals kept in an existing stats dict.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, callback: Callable, labelnames: Iterable[str] = (), kind: str = "gauge"
+    ):
+        self.callback = callback
+        self.kind = kind
+        super().__init__(name, documentation, labelnames)
+
+    def samples(self) -> list[Sample]:
+        name = f"{self.name}_total" if self.kind == "counter" else self.name
+        value = self.callback()
+        if not isinstance(value, dict):
+            return [(name, {}, value)]
+        return [(name, dict(zip(self.labelnames, key)), v) for key, v in value.items()]
+
+
+class Registry:
+    """
+    Collects metrics and renders the Prometheus text exposition format.
+
+    Most updates come from the event loop, but some come from worker
+    threads (the MIME sniff runs in asyncio.to_thread), so every child
+    guards its update with its own lock. The lock is uncontended almost
+    always and costs well under a microsecond. Scrapes read each
+    histogram child under the same lock, so _count and _sum agree.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def unregister(self, name: str):
+        self._metrics.pop(name, None)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception:  # A broken gauge callback must not take down the scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry served from /metrics
+registry = Registry()
+
+# Hot-path metrics; gauges over existing stats are registered in app/api/metrics.py
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+scan_phase_seconds = Histogram(
+    "scan_phase_duration_seconds", "Time spent in each phase of a /scan/ request", ("phase",)
+)
+scan_verdicts = Counter("scan_verdicts", "Scan outcomes by verdict and source", ("verdict", "source"))
+dynamodb_call_seconds = Histogram("dynamodb_call_duration_seconds", "DynamoDB call latency", ("operation",))
+password_seconds = Histogram("password_hash_duration_seconds", "bcrypt time by stage", ("stage",))
+rate_limit_rejections = Counter("rate_limit_rejections", "Requests rejected by the rate limiter", ("route",))
@@ -0,0 +1,202 @@
+import os
+import time
+import random
+import logging
+from typing import Optional
+from urllib.parse import parse_qsl
+from dotenv import load_dotenv
+from app.core.metrics import http_request_seconds, route_label
+from app.core.serialization import dumps, loads
+
+# Load logging middleware settings
+load_dotenv(dotenv_path="app/.env")
+
+LOG_BODY_BYTES = int(os.getenv("LOG_BODY_BYTES", "2048"))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+# Per-route sampling, longest prefix wins, e.g. "/healthcheck=0.01,/scan=1"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# Request bodies on these path prefixes are never copied, e.g. bulk imports full of passwords
+LOG_SKIP_BODY_PATHS = os.getenv("LOG_SKIP_BODY_PATHS", "/users/register/bulk")
+
+SENSITIVE_KEYS = {"password", "token", "access_token", "refresh_token", "secret", "authorization"}
+# Every sensitive key contains one of these, so a body without them has nothing to redact
+SENSITIVE_MARKERS = ("password", "token", "secret", "authorization")
+
+
+def redact_sensitive(data):
+    if isinstance(data, dict):
+        return {
+            k: ("***REDACTED***" if k.lower() in SENSITIVE_KEYS else redact_sensitive(v))
+            for k, v in data.items()
+        }
+    elif isinstance(data, list):
+        return [redact_sensitive(item) for item in data]
+    else:
+        return data
+
+
+def may_be_sensitive(text: str) -> bool:
+    # \u escapes could spell a key without matching, so they always get the full walk
+    lowered = text.lower()
+    return "\\u" in lowered or any(marker in lowered for marker in SENSITIVE_MARKERS)
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rate = item.partition("=")
+        rates[prefix.strip()] = float(rate)
+    return rates
+
+
+def summarize_body(captured: bytes, total: int, content_type: str):
+    """
+    Redacted view of a captured body prefix; never parses more than was captured.
+    Only complete JSON and form bodies can be redacted, so only those are
+    logged. Anything else (truncated, text, CSV, NDJSON, binary) is logged
+    as its size and type, never as raw text.
+    JSON bodies that can't hold a sensitive key are logged as their text,
+    without a parse; only the rest are parsed and redacted.
+    """
+    if not captured:
+        return None
+    media_type = content_type.split(";")[0].strip().lower()
+    if total == len(captured):
+        text = captured.decode("utf-8", "replace")
+        if media_type == "application/json" or media_type.endswith("+json"):
+            if not may_be_sensitive(text):
+                return text
+            try:
+                return redact_sensitive(loads(captured))
+            except ValueError:
+                pass
+        elif media_type == "application/x-www-form-urlencoded":
+            return {
+                k: ("***REDACTED***" if k.lower() in SENSITIVE_KEYS else v)
+                for k, v in parse_qsl(text, keep_blank_values=True)
+            }
+    return {"size": total, "content_type": media_type or None, "truncated": total > len(captured)}
+
+
+class LoggingMiddleware:
+    """
+    Pure ASGI request logger.
+
+    Request and response bodies pass through untouched; only the first
+    max_body_bytes of each are copied for the log line. Multipart bodies
+    and requests to skip_body_paths are never copied at all.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_body_bytes: int = LOG_BODY_BYTES,
+        default_rate: float = LOG_SAMPLE_RATE,
+        sample_rates: Optional[dict[str, float]] = None,
+        skip_body_paths: Optional[list[str]] = None,
+    ):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.default_rate = default_rate
+        rates = parse_sample_rates(LOG_SAMPLE_RATES) if sample_rates is None else sample_rates
+        # Longest prefix first so the most specific route wins
+        self.sample_rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        if skip_body_paths is None:
+            skip_body_paths = [path.strip() for path in LOG_SKIP_BODY_PATHS.split(",") if path.strip()]
+        self.skip_body_paths = tuple(skip_body_paths)
+
+    def sample_rate(self, path: str) -> float:
+        for prefix, rate in self.sample_rates:
+            if path.startswith(prefix):
+                return rate
+        return self.default_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        limit = self.max_body_bytes
+        request_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        request_type = request_headers.get("content-type", "")
+        multipart = request_type.startswith("multipart/")
+        skip_request = multipart or scope["path"].startswith(self.skip_body_paths)
+        request_body, response_body = bytearray(), bytearray()
+        sizes = {"request": 0, "response": 0}
+        response = {"status": 500, "content-type": ""}
+
+        async def tee_receive():
+            message = await receive()
+            if message["type"] == "http.request" and not skip_request:
+                chunk = message.get("body", b"")
+                sizes["request"] += len(chunk)
+                if len(request_body) < limit:
+                    request_body.extend(chunk[:limit - len(request_body)])
+            return message
+
+        async def tee_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for key, value in message.get("headers", []):
+                    if key.lower() == b"content-type":
+                        response["content-type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                sizes["response"] += len(chunk)
+                if len(response_body) < limit:
+                    response_body.extend(chunk[:limit - len(response_body)])
+            await send(message)
+
+        try:
+            await self.app(scope, tee_receive, tee_send)
+        finally:
+            log_details = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "headers": {
+                    k: ("***REDACTED***" if k.lower() in SENSITIVE_KEYS else v)
+                    for k, v in request_headers.items()
+                },
+                "body": (
+                    "***REDACTED MULTIPART FORM DATA***" if multipart
+                    else "***REDACTED REQUEST BODY***" if skip_request
+                    else summarize_body(bytes(request_body), sizes["request"], request_type)
+                ),
+                "status_code": response["status"],
+                "response_body": summarize_body(bytes(response_body), sizes["response"], response["content-type"]),
+                "process_time": f"{(time.perf_counter() - start_time):.4f}s",
+            }
+            logging.info(f"📋 API Call: {dumps(log_details).decode('utf-8')}")
+
+
+class MetricsMiddleware:
+    """
+    Records every HTTP request in http_request_duration_seconds, labelled
+    with the matched route template so path parameters don't explode the
+    series count. Unlike LoggingMiddleware it is never sampled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status = [500]
+
+        async def record_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record_send)
+        finally:
+            http_request_seconds.labels(
+                scope["method"], route_label(scope), str(status[0])
+            ).observe(time.perf_counter() - start_time)
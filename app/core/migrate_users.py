@@ -0,0 +1,81 @@
+"""
+Adds the username GSI used by UserRepository.get_by_username to an existing users table.
+
+DynamoDB backfills a new GSI from the existing items, so this tool only
+has to create the index, wait for it to become ACTIVE and report any
+usernames that appear on more than one item.
+
+    python -m app.core.migrate_users [--table users] [--index username-index]
+"""
+import time
+import argparse
+from collections import Counter
+
+from app.core.user_repository import UserRepository, DYNAMODB_USERS_TABLE, USERNAME_INDEX
+
+
+def username_index_status(table, index_name: str = USERNAME_INDEX):
+    table.reload()
+    for index in table.global_secondary_indexes or []:
+        if index["IndexName"] == index_name:
+            return index["IndexStatus"]
+    return None
+
+
+def create_username_index(table, index_name: str = USERNAME_INDEX):
+    index = {
+        "IndexName": index_name,
+        "KeySchema": [{"AttributeName": "username", "KeyType": "HASH"}],
+        "Projection": {"ProjectionType": "ALL"},
+    }
+    billing = (table.billing_mode_summary or {}).get("BillingMode", "PROVISIONED")
+    if billing == "PROVISIONED":
+        throughput = table.provisioned_throughput
+        index["ProvisionedThroughput"] = {
+            "ReadCapacityUnits": throughput["ReadCapacityUnits"],
+            "WriteCapacityUnits": throughput["WriteCapacityUnits"],
+        }
+    table.update(
+        AttributeDefinitions=[{"AttributeName": "username", "AttributeType": "S"}],
+        GlobalSecondaryIndexUpdates=[{"Create": index}],
+    )
+
+
+def wait_for_index(table, index_name: str = USERNAME_INDEX, poll: float = 10.0):
+    while (status := username_index_status(table, index_name)) != "ACTIVE":
+        print(f"⏳ {index_name} is {status}, waiting for backfill...")
+        time.sleep(poll)
+
+
+def duplicate_usernames(table) -> list[str]:
+    counts = Counter()
+    kwargs = {"ProjectionExpression": "username"}
+    while True:
+        page = table.scan(**kwargs)
+        counts.update(item["username"] for item in page.get("Items", []) if "username" in item)
+        if "LastEvaluatedKey" not in page:
+            break
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+    return [name for name, count in counts.items() if count > 1]
+
+
+def migrate(table_name: str = DYNAMODB_USERS_TABLE, index_name: str = USERNAME_INDEX, poll: float = 10.0):
+    table = UserRepository(table_name=table_name, username_index=index_name).table
+    if username_index_status(table, index_name) is None:
+        print(f"➕ Creating {index_name} on {table_name}")
+        create_username_index(table, index_name)
+    wait_for_index(table, index_name, poll)
+    print(f"✅ {index_name} is ACTIVE")
+
+    duplicates = duplicate_usernames(table)
+    if duplicates:
+        print(f"⚠️ Usernames stored on more than one item (lookups return only one): {', '.join(duplicates)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", default=DYNAMODB_USERS_TABLE)
+    parser.add_argument("--index", default=USERNAME_INDEX)
+    parser.add_argument("--poll", type=float, default=10.0)
+    args = parser.parse_args()
+    migrate(args.table, args.index, args.poll)
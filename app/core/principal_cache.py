@@ -0,0 +1,64 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+from app.models import UserInDB
+
+# Load principal cache settings
+load_dotenv(dotenv_path="app/.env")
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))  # Max staleness in seconds
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of authenticated users keyed by username.
+    Entries never outlive `ttl`; writers call invalidate() when a user changes.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_entries: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, UserInDB]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, username: str) -> Optional[UserInDB]:
+        entry = self._entries.get(username)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(username)
+            self.stats["hits"] += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[username]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, user: UserInDB):
+        if self.ttl <= 0:
+            return
+        self._entries[user.username] = (time.monotonic(), user)
+        self._entries.move_to_end(user.username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        if self._entries.pop(username, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "ttl_seconds": self.ttl,
+        }
+
+
+# Shared cache used by get_current_user
+principal_cache = PrincipalCache()
@@ -0,0 +1,98 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from dotenv import load_dotenv
+from app.core.user_repository import user_repository
+
+# Load token revocation settings
+load_dotenv(dotenv_path="app/.env")
+
+# Validate tokens from their claims alone; the DB is only read by the revocation refresher
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() == "true"
+REVOCATION_REFRESH_INTERVAL = float(os.getenv("REVOCATION_REFRESH_INTERVAL", "30"))
+
+
+def revoked_since(value: Optional[str]) -> float:
+    """
+    tokens_revoked_at (UTC ISO 8601) -> epoch seconds; tokens with an earlier `iat` are revoked.
+    """
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationList:
+    """
+    Usernames whose tokens must be rejected, with the time before which
+    tokens count as revoked (infinity for disabled users).
+
+    The list only holds users with a revocation marker, so it stays small
+    however many users exist. It is rebuilt from the repository every
+    refresh interval; revocations made in this process apply at once.
+    A failed refresh keeps the previous list.
+    """
+
+    def __init__(self, repository=None, interval: float = REVOCATION_REFRESH_INTERVAL):
+        self.repository = repository or user_repository
+        self.interval = interval
+        self.cutoffs: dict[str, float] = {}
+        self.refreshed_at = 0.0
+        self.stats = {"refreshes": 0, "failures": 0, "rejections": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, username: str, issued_at: float) -> bool:
+        cutoff = self.cutoffs.get(username)
+        if cutoff is not None and issued_at < cutoff:
+            self.stats["rejections"] += 1
+            return True
+        return False
+
+    def revoke(self, username: str, at: Optional[float] = None, disabled: bool = False):
+        self.cutoffs[username] = math.inf if disabled else max(self.cutoffs.get(username, 0.0), at or time.time())
+
+    async def refresh(self):
+        items = await self.repository.revoked_users()
+        self.cutoffs = {
+            item["username"]: math.inf if item.get("disabled") else revoked_since(item.get("tokens_revoked_at"))
+            for item in items
+        }
+        self.refreshed_at = time.time()
+        self.stats["refreshes"] += 1
+
+    async def _refresh_logged(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            self.stats["failures"] += 1
+            logging.warning(f"Could not refresh the token revocation list: {e}")
+
+    async def _refresher(self):
+        while True:
+            if time.time() - self.refreshed_at >= self.interval:
+                await self._refresh_logged()
+            await asyncio.sleep(self.interval)
+
+    def ensure_started(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresher())
+
+    async def start(self):
+        """
+        Loads the list before the first request is checked against it, then keeps it fresh.
+        """
+        await self._refresh_logged()
+        self.ensure_started()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# Shared list used by get_current_user in stateless mode
+revocation_list = RevocationList()
@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import sqlite3
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+from dotenv import load_dotenv
+
+# Load cache settings
+load_dotenv(dotenv_path="app/.env")
+
+SCAN_CACHE_MAX_ENTRIES = int(os.getenv("SCAN_CACHE_MAX_ENTRIES", "100000"))
+SCAN_CACHE_MAX_BYTES = int(os.getenv("SCAN_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SCAN_CACHE_TTL = float(os.getenv("SCAN_CACHE_TTL", "86400"))
+SCAN_CACHE_DISK_PATH = os.getenv("SCAN_CACHE_DISK_PATH")  # Optional SQLite file for the disk tier
+SIGNATURE_CHECK_INTERVAL = float(os.getenv("SIGNATURE_CHECK_INTERVAL", "60"))
+
+
+class CachedVerdict(NamedTuple):
+    is_infected: bool
+    infected_by: Optional[str]
+    stored_at: float
+
+
+def signature_version_from(version_reply: str) -> str:
+    """
+    'ClamAV 1.0.0/27000/Thu Jan  1 00:00:00 2026' -> '1.0.0/27000'
+    """
+    return "/".join(version_reply.replace("ClamAV ", "", 1).split("/")[:2])
+
+
+class ScanCache:
+    """
+    SHA-256 keyed verdict cache: in-memory LRU with an optional SQLite tier.
+    Every entry belongs to one signature version; a new version empties the cache.
+    The memory tier is only touched from the event loop; the SQLite tier is
+    read and written on its own thread, so disk I/O never blocks the loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SCAN_CACHE_MAX_ENTRIES,
+        max_bytes: int = SCAN_CACHE_MAX_BYTES,
+        ttl: float = SCAN_CACHE_TTL,
+        disk_path: Optional[str] = SCAN_CACHE_DISK_PATH,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.signature_version: Optional[str] = None
+        self.signature_checked_at = 0.0
+        self._entries: OrderedDict[str, CachedVerdict] = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+        self._db = None
+        self._executor = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "sha256 TEXT PRIMARY KEY, is_infected INTEGER, infected_by TEXT, "
+                "stored_at REAL, signature_version TEXT)"
+            )
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-cache")
+
+    @staticmethod
+    def _entry_size(sha256: str, verdict: CachedVerdict) -> int:
+        return sys.getsizeof(sha256) + sys.getsizeof(verdict) + sys.getsizeof(verdict.infected_by)
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def get(self, sha256: str) -> Optional[CachedVerdict]:
+        verdict = self._entries.get(sha256)
+        if verdict is not None:
+            if time.time() - verdict.stored_at < self.ttl:
+                self._entries.move_to_end(sha256)
+                self.stats["hits"] += 1
+                return verdict
+            self._remove(sha256)
+
+        version = self.signature_version
+        verdict = await self._run(self._disk_get, sha256, version) if self._db is not None else None
+        # A verdict read under a signature version that changed meanwhile is stale
+        if verdict is not None and version == self.signature_version:
+            self.stats["disk_hits"] += 1
+            self._remember(sha256, verdict)
+            return verdict
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, sha256: str, is_infected: bool, infected_by: Optional[str]):
+        verdict = CachedVerdict(is_infected, infected_by, time.time())
+        self._remember(sha256, verdict)
+        if self._db is not None:
+            await self._run(self._disk_put, sha256, verdict, self.signature_version)
+
+    async def set_signature_version(self, version: str):
+        """
+        Drops every cached verdict when ClamAV loads a new signature database.
+        """
+        self.mark_signature_checked()
+        if version == self.signature_version:
+            return
+        if self.signature_version is not None:
+            logging.info(f"Signature version changed {self.signature_version} -> {version}; clearing scan cache")
+            self.stats["invalidations"] += 1
+        self.signature_version = version
+        self._entries.clear()
+        self._bytes = 0
+        if self._db is not None:
+            await self._run(self._db.execute, "DELETE FROM verdicts WHERE signature_version IS NOT ?", (version,))
+
+    def mark_signature_checked(self):
+        self.signature_checked_at = time.monotonic()
+
+    def signature_check_due(self) -> bool:
+        return time.monotonic() - self.signature_checked_at >= SIGNATURE_CHECK_INTERVAL
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "signature_version": self.signature_version,
+        }
+
+    def _remember(self, sha256: str, verdict: CachedVerdict):
+        if sha256 in self._entries:
+            self._remove(sha256)
+        self._entries[sha256] = verdict
+        self._bytes += self._entry_size(sha256, verdict)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def _remove(self, sha256: str):
+        verdict = self._entries.pop(sha256)
+        self._bytes -= self._entry_size(sha256, verdict)
+
+    def _disk_get(self, sha256: str, version: Optional[str]) -> Optional[CachedVerdict]:
+        row = self._db.execute(
+            "SELECT is_infected, infected_by, stored_at FROM verdicts "
+            "WHERE sha256 = ? AND signature_version IS ? AND stored_at > ?",
+            (sha256, version, time.time() - self.ttl),
+        ).fetchone()
+        return CachedVerdict(bool(row[0]), row[1], row[2]) if row else None
+
+    def _disk_put(self, sha256: str, verdict: CachedVerdict, version: Optional[str]):
+        self._db.execute(
+            "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?)",
+            (sha256, int(verdict.is_infected), verdict.infected_by, verdict.stored_at, version),
+        )
+
+
+# Shared cache used by the scan endpoints
+scan_cache = ScanCache()
@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+from app.core.aws import aws_session
+from app.models import ScanRecord
+
+# Load scan history settings
+load_dotenv(dotenv_path="app/.env")
+
+SCAN_HISTORY_BACKEND = os.getenv("SCAN_HISTORY_BACKEND", "sqlite")  # sqlite | dynamodb | memory
+SCAN_HISTORY_PATH = os.getenv("SCAN_HISTORY_PATH", "app/logs/scan_history.db")
+SCAN_HISTORY_TABLE = os.getenv("SCAN_HISTORY_TABLE", "scan_history")
+SCAN_HISTORY_BATCH_SIZE = int(os.getenv("SCAN_HISTORY_BATCH_SIZE", "100"))
+SCAN_HISTORY_FLUSH_INTERVAL = float(os.getenv("SCAN_HISTORY_FLUSH_INTERVAL", "1.0"))
+SCAN_HISTORY_QUEUE_MAX = int(os.getenv("SCAN_HISTORY_QUEUE_MAX", "10000"))
+SCAN_HISTORY_MEMORY_SIZE = int(os.getenv("SCAN_HISTORY_MEMORY_SIZE", "10000"))
+
+# DynamoDB indexes (HASH key, RANGE scanned_at) used by the history queries
+USERNAME_TIME_INDEX = "username-time-index"
+SHA256_TIME_INDEX = "sha256-time-index"
+
+
+class HistoryQuery:
+    """
+    Filters for one page of history, newest first. `since`/`until` are
+    inclusive UTC ISO timestamps; `cursor` is the previous page's next_cursor.
+    """
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        sha256: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ):
+        self.username = username
+        self.sha256 = sha256
+        self.since = since
+        self.until = until
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor") from None
+
+
+def decode_keyset(cursor: str) -> tuple[str, str]:
+    value = decode_cursor(cursor)
+    if not (isinstance(value, list) and len(value) == 2 and all(isinstance(v, str) for v in value)):
+        raise ValueError("Invalid cursor")
+    return value[0], value[1]
+
+
+class ScanHistoryBackend(ABC):
+    """
+    Storage for scan records. Subclass to keep history somewhere else.
+    """
+
+    @abstractmethod
+    async def write(self, records: list[ScanRecord]):
+        ...
+
+    @abstractmethod
+    async def query(self, query: HistoryQuery) -> tuple[list[ScanRecord], Optional[str]]:
+        ...
+
+    async def close(self):
+        pass
+
+
+class InMemoryScanHistoryBackend(ScanHistoryBackend):
+    """
+    Process-local stand-in for tests and benchmarks; keeps the newest max_records.
+    """
+
+    def __init__(self, max_records: int = SCAN_HISTORY_MEMORY_SIZE):
+        self.max_records = max_records
+        self.records: list[ScanRecord] = []
+
+    async def write(self, records: list[ScanRecord]):
+        self.records.extend(records)
+        del self.records[:-self.max_records]
+
+    async def query(self, query: HistoryQuery) -> tuple[list[ScanRecord], Optional[str]]:
+        after = decode_keyset(query.cursor) if query.cursor else None
+        matches = sorted(
+            (
+                r for r in self.records
+                if (query.username is None or r.username == query.username)
+                and (query.sha256 is None or r.sha256 == query.sha256)
+                and (query.since is None or r.scanned_at >= query.since)
+                and (query.until is None or r.scanned_at <= query.until)
+                and (after is None or (r.scanned_at, r.id) < after)
+            ),
+            key=lambda r: (r.scanned_at, r.id),
+            reverse=True,
+        )
+        page = matches[:query.limit]
+        more = len(matches) > query.limit
+        return page, encode_cursor([page[-1].scanned_at, page[-1].id]) if more else None
+
+
+class SQLiteScanHistoryBackend(ScanHistoryBackend):
+    """
+    Scan history in a local SQLite file (WAL mode).
+
+    One index per query shape (user, hash, time), each ending in
+    (scanned_at, id), so every page is an index range read. Pages use
+    keyset cursors on (scanned_at, id) rather than OFFSET, so deep pages
+    cost the same as the first. All access goes through one thread.
+    """
+
+    def __init__(self, path: str = SCAN_HISTORY_PATH):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-history")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS scans ("
+                "id TEXT PRIMARY KEY, scanned_at TEXT NOT NULL, username TEXT, filename TEXT, "
+                "sha256 TEXT, size INTEGER, mime_type TEXT, is_infected INTEGER NOT NULL, "
+                "infected_by TEXT, duration_ms INTEGER, signature_version TEXT)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS scans_by_username ON scans (username, scanned_at, id)")
+            db.execute("CREATE INDEX IF NOT EXISTS scans_by_sha256 ON scans (sha256, scanned_at, id)")
+            db.execute("CREATE INDEX IF NOT EXISTS scans_by_time ON scans (scanned_at, id)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _write(self, records: list[ScanRecord]):
+        db = self._connect()
+        with db:
+            db.executemany(
+                "INSERT OR IGNORE INTO scans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (r.id, r.scanned_at, r.username, r.filename, r.sha256, r.size, r.mime_type,
+                     int(r.is_infected), r.infected_by, r.duration_ms, r.signature_version)
+                    for r in records
+                ],
+            )
+
+    async def write(self, records: list[ScanRecord]):
+        await self._run(self._write, records)
+
+    def _query(self, query: HistoryQuery) -> tuple[list[ScanRecord], Optional[str]]:
+        clauses, params = [], []
+        for column, value in (("username", query.username), ("sha256", query.sha256)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if query.since is not None:
+            clauses.append("scanned_at >= ?")
+            params.append(query.since)
+        if query.until is not None:
+            clauses.append("scanned_at <= ?")
+            params.append(query.until)
+        if query.cursor:
+            clauses.append("(scanned_at, id) < (?, ?)")
+            params.extend(decode_keyset(query.cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT id, scanned_at, username, filename, sha256, size, mime_type, is_infected, "
+            f"infected_by, duration_ms, signature_version FROM scans {where} "
+            f"ORDER BY scanned_at DESC, id DESC LIMIT ?",
+            (*params, query.limit + 1),
+        ).fetchall()
+        fields = ScanRecord.model_fields
+        page = [ScanRecord(**dict(zip(fields, row))) for row in rows[:query.limit]]
+        more = len(rows) > query.limit
+        return page, encode_cursor([page[-1].scanned_at, page[-1].id]) if more else None
+
+    async def query(self, query: HistoryQuery) -> tuple[list[ScanRecord], Optional[str]]:
+        return await self._run(self._query, query)
+
+    async def close(self):
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+
+
+class DynamoDBScanHistoryBackend(ScanHistoryBackend):
+    """
+    Scan history in DynamoDB: partition key `id`, plus GSIs
+    username-time-index and sha256-time-index (HASH username/sha256,
+    RANGE scanned_at, projection ALL). Every query must name a user or a
+    hash so it can be served by one of the indexes; cursors wrap
+    LastEvaluatedKey.
+    """
+
+    def __init__(self, table_name: str = SCAN_HISTORY_TABLE):
+        self.table_name = table_name
+        self._table = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="scan-history")
+
+    @property
+    def table(self):
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    self._table = aws_session().resource("dynamodb").Table(self.table_name)
+        return self._table
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _write(self, records: list[ScanRecord]):
+        # batch_writer groups puts into BatchWriteItem calls of 25 and resends unprocessed items
+        with self.table.batch_writer(overwrite_by_pkeys=["id"]) as batch:
+            for record in records:
+                # Index keys can't be NULL; streamed uploads stopped early have no sha256
+                batch.put_item(Item=record.model_dump(exclude_none=True))
+
+    async def write(self, records: list[ScanRecord]):
+        await self._run(self._write, records)
+
+    def _query(self, query: HistoryQuery) -> tuple[list[ScanRecord], Optional[str]]:
+        from boto3.dynamodb.conditions import Attr, Key
+
+        if query.sha256 is not None:
+            index, condition = SHA256_TIME_INDEX, Key("sha256").eq(query.sha256)
+        elif query.username is not None:
+            index, condition = USERNAME_TIME_INDEX, Key("username").eq(query.username)
+        else:
+            raise ValueError("History queries need a username or sha256 with the DynamoDB backend")
+        if query.since is not None and query.until is not None:
+            condition &= Key("scanned_at").between(query.since, query.until)
+        elif query.since is not None:
+            condition &= Key("scanned_at").gte(query.since)
+        elif query.until is not None:
+            condition &= Key("scanned_at").lte(query.until)
+
+        kwargs = {"IndexName": index, "KeyConditionExpression": condition, "ScanIndexForward": False, "Limit": query.limit}
+        if query.sha256 is not None and query.username is not None:
+            kwargs["FilterExpression"] = Attr("username").eq(query.username)
+        if query.cursor:
+            kwargs["ExclusiveStartKey"] = decode_cursor(query.cursor)
+            if not isinstance(kwargs["ExclusiveStartKey"], dict):
+                raise ValueError("Invalid cursor")
+        response = self.table.query(**kwargs)
+        page = [
+            ScanRecord(**{k: int(v) if isinstance(v, Decimal) else v for k, v in item.items()})
+            for item in response.get("Items", [])
+        ]
+        last_key = response.get("LastEvaluatedKey")
+        return page, encode_cursor(last_key) if last_key else None
+
+    async def query(self, query: HistoryQuery) -> tuple[list[ScanRecord], Optional[str]]:
+        return await self._run(self._query, query)
+
+
+def backend_from_settings(name: str = SCAN_HISTORY_BACKEND) -> ScanHistoryBackend:
+    if name == "dynamodb":
+        return DynamoDBScanHistoryBackend()
+    if name == "memory":
+        return InMemoryScanHistoryBackend()
+    return SQLiteScanHistoryBackend()
+
+
+class ScanHistory:
+    """
+    Buffers scan records and writes them to the backend in batches, off the
+    request path. record() never waits: when the buffer is full the record
+    is dropped and counted. Records become queryable once their batch has
+    been flushed (at most flush_interval later).
+    """
+
+    def __init__(
+        self,
+        backend: Optional[ScanHistoryBackend] = None,
+        batch_size: int = SCAN_HISTORY_BATCH_SIZE,
+        flush_interval: float = SCAN_HISTORY_FLUSH_INTERVAL,
+        max_queued: int = SCAN_HISTORY_QUEUE_MAX,
+    ):
+        self.backend = backend or backend_from_settings()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self.stats = {"written": 0, "dropped": 0, "failed": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._task = asyncio.create_task(self._flusher())
+
+    def record(self, record: ScanRecord):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    async def _flusher(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self.backend.write(batch)
+                self.stats["written"] += len(batch)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                logging.error(f"Could not write {len(batch)} scan history records: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def query(self, query: HistoryQuery) -> tuple[list[ScanRecord], Optional[str]]:
+        return await self.backend.query(query)
+
+    async def stop(self):
+        """
+        Flushes buffered records, then stops the writer.
+        """
+        if self._queue is not None:
+            await self._queue.join()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._queue, self._task = None, None
+        await self.backend.close()
+
+
+# Shared history used by the scan endpoints
+scan_history = ScanHistory()
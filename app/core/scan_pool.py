@@ -0,0 +1,222 @@
+import os
+import time
+import socket
+import struct
+import asyncio
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Optional
+from dotenv import load_dotenv
+from app.core.clamd import ClamdError, ClamdUnavailableError, ClamdTimeoutError, parse_reply, CLAMD_SOCKET, CLAMD_HOST, CLAMD_PORT, CLAMD_TIMEOUT, CLAMD_CHUNK_SIZE
+
+# Load scan pool settings
+load_dotenv(dotenv_path="app/.env")
+
+SCAN_POOL_WORKERS = int(os.getenv("SCAN_POOL_WORKERS", str(os.cpu_count() or 1)))  # 0 scans on the event loop
+SCAN_POOL_LARGE_WORKERS = int(os.getenv("SCAN_POOL_LARGE_WORKERS", str(max(1, SCAN_POOL_WORKERS // 2))))
+SCAN_POOL_SMALL_FILE_SIZE = int(os.getenv("SCAN_POOL_SMALL_FILE_SIZE", str(8 * 1024 * 1024)))
+SCAN_POOL_MAX_TASKS = int(os.getenv("SCAN_POOL_MAX_TASKS", "500"))  # Recycle a worker after this many jobs
+SCAN_POOL_TIMEOUT = float(os.getenv("SCAN_POOL_TIMEOUT", str(CLAMD_TIMEOUT)))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Per-process clamd sessions by target, reused across jobs until the worker is recycled
+_sessions: dict[tuple, socket.socket] = {}
+
+
+def _open_session(socket_path: Optional[str], host: Optional[str], port: int, timeout: float) -> socket.socket:
+    if host:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+    sock.sendall(b"zIDSESSION\0")
+    return sock
+
+
+def _read_reply(sock: socket.socket) -> str:
+    reply = bytearray()
+    while not reply.endswith(b"\0"):
+        data = sock.recv(4096)
+        if not data:
+            raise EOFError("clamd closed the connection")
+        reply.extend(data)
+    text = reply[:-1].decode("utf-8", "replace").strip()
+    request_id, sep, rest = text.partition(": ")
+    return rest if sep and request_id.isdigit() else text
+
+
+def _instream(sock: socket.socket, path: str, chunk_size: int, deadline: float) -> str:
+    sock.sendall(b"zINSTREAM\0")
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            if time.monotonic() > deadline:
+                raise TimeoutError("scan exceeded its deadline")
+            sock.sendall(struct.pack("!L", len(chunk)) + chunk)
+    sock.sendall(struct.pack("!L", 0))
+    return _read_reply(sock)
+
+
+def hash_path(path: str) -> str:
+    """
+    Runs in a pool worker: SHA-256 of the file at `path`.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_path(
+    path: str,
+    socket_path: Optional[str] = CLAMD_SOCKET,
+    host: Optional[str] = CLAMD_HOST,
+    port: int = CLAMD_PORT,
+    timeout: float = SCAN_POOL_TIMEOUT,
+    chunk_size: int = CLAMD_CHUNK_SIZE,
+) -> tuple[bool, Optional[str]]:
+    """
+    Runs in a pool worker: streams the file at `path` to clamd (INSTREAM).
+    The worker reads the file itself, so only the path crosses the process boundary.
+    """
+    target = (socket_path, host, port)
+    deadline = time.monotonic() + timeout
+    for attempt in range(2):
+        try:
+            if target not in _sessions:
+                _sessions[target] = _open_session(socket_path, host, port, timeout)
+            reply = _instream(_sessions[target], path, chunk_size, deadline)
+            return parse_reply(reply)
+        except (OSError, EOFError) as e:
+            # The session may have idled out on clamd's side; retry once on a fresh one
+            session = _sessions.pop(target, None)
+            if session is not None:
+                session.close()
+            if isinstance(e, TimeoutError):
+                raise ClamdTimeoutError(f"clamd did not answer in time: {e!r}") from None
+            if attempt:
+                raise ClamdUnavailableError(f"clamd unavailable: {e!r}") from None
+    raise ClamdError("unreachable")
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def shareable_path(fileobj: BinaryIO) -> Optional[str]:
+    """
+    A path another process can open to read `fileobj`, or None when it only
+    lives in memory. Anonymous spool files are reached through /proc.
+    """
+    if isinstance(fileobj, tempfile.SpooledTemporaryFile) and fileobj.name is None:
+        # Still in memory; fileno() would roll it over to disk just to hand it off
+        return None
+    name = getattr(fileobj, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    try:
+        fd = fileobj.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+    proc_path = f"/proc/{os.getpid()}/fd/{fd}"
+    return proc_path if os.path.exists(proc_path) else None
+
+
+class ScanPool:
+    """
+    Hashes and scans files in worker processes so the event loop only waits.
+
+    Files are handed over by path and never pickled. Small and large files
+    go to separate process pools, so a few huge uploads can only occupy
+    the large lane while small files keep flowing. Workers are recycled
+    after max_tasks jobs, every job has a deadline, and close() lets
+    queued jobs finish before the pools shut down.
+    """
+
+    def __init__(
+        self,
+        workers: int = SCAN_POOL_WORKERS,
+        large_workers: int = SCAN_POOL_LARGE_WORKERS,
+        small_file_size: int = SCAN_POOL_SMALL_FILE_SIZE,
+        max_tasks: int = SCAN_POOL_MAX_TASKS,
+        timeout: float = SCAN_POOL_TIMEOUT,
+    ):
+        self.workers = workers
+        self.large_workers = min(large_workers, workers)
+        self.small_file_size = small_file_size
+        self.max_tasks = max_tasks
+        self.timeout = timeout
+        self.stats = {"small": 0, "large": 0, "in_flight": 0, "timeouts": 0, "broken": 0}
+        self._pools: dict[str, ProcessPoolExecutor] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _pool(self, lane: str) -> ProcessPoolExecutor:
+        pool = self._pools.get(lane)
+        if pool is None:
+            size = self.large_workers if lane == "large" else max(1, self.workers - self.large_workers)
+            # spawn: workers start clean instead of inheriting the server's sockets and threads
+            pool = self._pools[lane] = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=self.max_tasks,
+            )
+        return pool
+
+    def _lane(self, path: str) -> str:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        return "small" if size <= self.small_file_size else "large"
+
+    async def _submit(self, lane: str, func, *args):
+        self.stats[lane] += 1
+        self.stats["in_flight"] += 1
+        try:
+            future = self._pool(lane).submit(func, *args)
+            # Workers enforce the deadline themselves; the grace period covers queueing
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout * 2)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise ClamdTimeoutError(f"Scan did not finish within {self.timeout * 2:.0f}s")
+        except BrokenProcessPool as e:
+            # A worker died (OOM, segfault); start a fresh pool for the next job
+            self.stats["broken"] += 1
+            self._pools.pop(lane, None)
+            raise ClamdError(f"Scan worker crashed: {e}")
+        finally:
+            self.stats["in_flight"] -= 1
+
+    async def start(self):
+        """
+        Spawns the workers up front so the first scans don't pay for it.
+        """
+        if self.enabled:
+            await asyncio.gather(*(self._submit(lane, _warm_up) for lane in ("small", "large")))
+
+    async def hash(self, path: str) -> str:
+        return await self._submit(self._lane(path), hash_path, path)
+
+    async def scan(
+        self, path: str, socket_path: Optional[str] = CLAMD_SOCKET, host: Optional[str] = CLAMD_HOST, port: int = CLAMD_PORT
+    ) -> tuple[bool, Optional[str]]:
+        return await self._submit(self._lane(path), scan_path, path, socket_path, host, port, self.timeout)
+
+    async def close(self):
+        pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            await asyncio.to_thread(pool.shutdown, wait=True)
+        logging.info(f"Scan pool drained ({self.stats['small'] + self.stats['large']} jobs)")
+
+
+# Shared pool used by scan_file
+scan_pool = ScanPool()
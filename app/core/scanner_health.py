@@ -0,0 +1,382 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Optional, Sequence, TypeVar
+from dotenv import load_dotenv
+from app.core.clamd import (
+    ClamdClient, ClamdConnection, ClamdUnavailableError, ClamdTimeoutError, client_from_address, scanner
+)
+from app.core.scan_cache import scan_cache, signature_version_from
+
+# Load scanner health settings
+load_dotenv(dotenv_path="app/.env")
+
+SCANNER_PROBE_INTERVAL = float(os.getenv("SCANNER_PROBE_INTERVAL", "5"))
+SCANNER_PROBE_TIMEOUT = float(os.getenv("SCANNER_PROBE_TIMEOUT", "2"))
+SCANNER_RECHECK_DELAY = float(os.getenv("SCANNER_RECHECK_DELAY", "0.5"))  # Probe again this soon after a failure
+SCANNER_WAIT_TIMEOUT = float(os.getenv("SCANNER_WAIT_TIMEOUT", "15"))  # How long a scan queues for a scanner
+SCANNER_RETRY_AFTER = int(os.getenv("SCANNER_RETRY_AFTER", "10"))  # Retry-After on 503s when none came back
+# Comma-separated clamd nodes to balance over (unix:/path or host:port); defaults to CLAMD_SOCKET/CLAMD_HOST
+CLAMD_NODES = os.getenv("CLAMD_NODES", "")
+# Optional second clamd (e.g. a sidecar that reloads signatures at another time) used while every node is down
+CLAMD_STANDBY_SOCKET = os.getenv("CLAMD_STANDBY_SOCKET")
+CLAMD_STANDBY_HOST = os.getenv("CLAMD_STANDBY_HOST")
+CLAMD_STANDBY_PORT = int(os.getenv("CLAMD_STANDBY_PORT", "3310"))
+# A scan's hash stays on its preferred node unless that node is this many scans behind the least busy one
+SCANNER_AFFINITY_SLACK = int(os.getenv("SCANNER_AFFINITY_SLACK", "2"))
+SCANNER_HEDGE_AFTER = float(os.getenv("SCANNER_HEDGE_AFTER", "2"))  # Seconds before a slow scan is raced on another node; 0 disables
+SCANNER_HEDGE_BUDGET = float(os.getenv("SCANNER_HEDGE_BUDGET", "0.1"))  # Max hedged scans as a fraction of all scans
+
+T = TypeVar("T")
+
+
+class ScannerState:
+    """
+    Result of the latest probes against one clamd, plus the scans it is running.
+    """
+
+    def __init__(self, name: str, client: ClamdClient, standby: bool = False):
+        self.name = name
+        self.client = client
+        self.standby = standby
+        self.available: Optional[bool] = None  # None until the first probe
+        self.failures = 0
+        self.version: Optional[str] = None
+        self.checked_at = 0.0
+        self.latency_ms = 0.0
+        self.error: Optional[str] = None
+        self.outstanding = 0
+        self.scans = 0
+        self.scan_seconds = 0.0  # Moving average
+
+    def observe(self, seconds: float):
+        self.scans += 1
+        self.scan_seconds = seconds if self.scans == 1 else 0.8 * self.scan_seconds + 0.2 * seconds
+
+    def expected_wait(self, unmeasured: float) -> float:
+        # Outstanding scans weighted by how long this node takes, so a slow node gets fewer.
+        # A node without a finished scan yet counts as the slowest known one rather than as free
+        return (self.outstanding + 1) * (self.scan_seconds if self.scans else unmeasured)
+
+    def snapshot(self) -> dict:
+        return {
+            "available": self.available,
+            "standby": self.standby,
+            "signature_version": self.version,
+            "consecutive_failures": self.failures,
+            "probe_latency_ms": round(self.latency_ms, 2),
+            "checked_seconds_ago": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+            "error": self.error,
+            "outstanding": self.outstanding,
+            "scans": self.scans,
+            "avg_scan_ms": round(self.scan_seconds * 1000, 2),
+        }
+
+
+def affinity(key: str, name: str) -> int:
+    # Rendezvous hashing: adding or ejecting a node only moves the keys that belonged to it
+    return int.from_bytes(hashlib.blake2b(f"{key}|{name}".encode(), digest_size=8).digest(), "big")
+
+
+class ScannerMonitor:
+    """
+    Routes scans over one or more clamd nodes and keeps track of their health.
+
+    Each node is probed (PING + VERSION on a short-lived connection, never
+    on the scan pool) every interval, and sooner after a scan loses its
+    connection or times out, which also ejects the node until a probe
+    succeeds. Health endpoints read the cached state, so a load balancer's
+    checks never reach clamd. The first node's signature version keys the
+    verdict cache; a new version clears it.
+
+    run() sends a scan to the node with the shortest expected wait
+    (outstanding scans times its average scan time), preferring the node
+    the file's hash maps to (rendezvous hashing) while it is not much
+    busier, so repeat files hit the same clamd. A scan still
+    running after hedge_after seconds is raced on a second node, within a
+    budget; dropped connections and timeouts are retried once elsewhere.
+    With every node down, the standby is used, else scans wait up to
+    wait_timeout for one to come back.
+    """
+
+    def __init__(
+        self,
+        nodes: Sequence[ClamdClient] = (scanner,),
+        standby: Optional[ClamdClient] = None,
+        interval: float = SCANNER_PROBE_INTERVAL,
+        probe_timeout: float = SCANNER_PROBE_TIMEOUT,
+        wait_timeout: float = SCANNER_WAIT_TIMEOUT,
+        hedge_after: float = SCANNER_HEDGE_AFTER,
+        hedge_budget: float = SCANNER_HEDGE_BUDGET,
+        affinity_slack: int = SCANNER_AFFINITY_SLACK,
+    ):
+        self.states = [ScannerState(client.target, client) for client in nodes]
+        if standby is not None:
+            self.states.append(ScannerState("standby", standby, standby=True))
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.wait_timeout = wait_timeout
+        self.hedge_after = hedge_after
+        self.hedge_budget = hedge_budget
+        self.affinity_slack = affinity_slack
+        self.stats = {
+            "probes": 0, "probe_failures": 0, "reloads": 0, "waits": 0, "wait_timeouts": 0, "retries": 0,
+            "standby_scans": 0, "scans": 0, "hedges": 0, "hedge_wins": 0,
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._available: Optional[asyncio.Event] = None
+
+    @property
+    def primary(self) -> ClamdClient:
+        return self.states[0].client
+
+    def _events(self):
+        if self._wake is None:
+            self._wake, self._available = asyncio.Event(), asyncio.Event()
+            self._update_available()
+
+    def _update_available(self):
+        if self.choose() is not None:
+            self._available.set()
+        else:
+            self._available.clear()
+
+    async def _probe_once(self, client: ClamdClient) -> str:
+        conn = await ClamdConnection.open(client.socket_path, client.host, client.port)
+        try:
+            if await conn.command(b"PING") != "PONG":
+                raise ClamdUnavailableError("clamd did not answer PING")
+            return await conn.command(b"VERSION")
+        finally:
+            conn.close()
+
+    async def probe(self, state: ScannerState):
+        self.stats["probes"] += 1
+        started = time.monotonic()
+        try:
+            version = signature_version_from(await asyncio.wait_for(self._probe_once(state.client), self.probe_timeout))
+        except Exception as e:
+            self.stats["probe_failures"] += 1
+            state.failures += 1
+            state.error = repr(e)
+            if state.available is not False:
+                logging.warning(f"Scanner {state.name} ({state.client!r}) is unavailable: {e!r}")
+            state.available = False
+        else:
+            if state.available is False:
+                logging.info(f"Scanner {state.name} is available again after {state.failures} failed probes")
+            if state.version is not None and version != state.version:
+                self.stats["reloads"] += 1
+                logging.info(f"Scanner {state.name} loaded signatures {version} (was {state.version})")
+            state.available, state.failures, state.error, state.version = True, 0, None, version
+            if state is self.states[0]:
+                await scan_cache.set_signature_version(version)
+        state.latency_ms = (time.monotonic() - started) * 1000
+        state.checked_at = time.monotonic()
+        self._update_available()
+
+    async def probe_all(self):
+        self._events()
+        await asyncio.gather(*(self.probe(state) for state in self.states))
+
+    async def _loop(self):
+        while True:
+            await self.probe_all()
+            down = any(state.available is False for state in self.states)
+            try:
+                await asyncio.wait_for(self._wake.wait(), SCANNER_RECHECK_DELAY if down else self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def ensure_started(self):
+        if self._task is None:
+            self._events()
+            self._task = asyncio.create_task(self._loop())
+
+    async def start(self):
+        """
+        Probes once so readiness is known before the first request, then keeps probing.
+        """
+        await self.probe_all()
+        self.ensure_started()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def close(self):
+        """
+        Closes the idle connections of every node.
+        """
+        await asyncio.gather(*(state.client.close() for state in self.states))
+
+    def choose(self, key: Optional[str] = None, exclude: Sequence[ScannerState] = ()) -> Optional[ScannerState]:
+        """
+        The node a scan should go to now, or None when every node outside `exclude` is down.
+        """
+        # Not probed yet counts as available, so nothing waits before the first probe
+        up = [state for state in self.states if state.available is not False and state not in exclude]
+        candidates = [state for state in up if not state.standby] or up
+        if not candidates:
+            return None
+        unmeasured = max(state.scan_seconds for state in candidates)
+        least = min(candidates, key=lambda state: (state.expected_wait(unmeasured), state.outstanding))
+        if key is None or len(candidates) == 1:
+            return least
+        preferred = max(candidates, key=lambda state: affinity(key, state.name))
+        if (
+            preferred.outstanding <= least.outstanding + self.affinity_slack
+            and preferred.expected_wait(unmeasured)
+            <= least.expected_wait(unmeasured) + self.affinity_slack * least.scan_seconds
+        ):
+            return preferred
+        return least
+
+    def ready(self) -> bool:
+        return any(state.available for state in self.states)
+
+    async def acquire(self, key: Optional[str] = None, exclude: Sequence[ScannerState] = ()) -> ScannerState:
+        """
+        The node scans should use now, waiting up to wait_timeout while none is available.
+        Nodes in `exclude` are only used when nothing else is up.
+        """
+        self.ensure_started()
+        state = self.choose(key, exclude) or self.choose(key)
+        if state is None:
+            self.stats["waits"] += 1
+            deadline = time.monotonic() + self.wait_timeout
+            while state is None:
+                try:
+                    await asyncio.wait_for(self._available.wait(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    self.stats["wait_timeouts"] += 1
+                    raise ClamdUnavailableError(f"No scanner became available within {self.wait_timeout:.0f}s") from None
+                state = self.choose(key, exclude) or self.choose(key)
+        if state.standby:
+            self.stats["standby_scans"] += 1
+        return state
+
+    @contextmanager
+    def busy(self, state: ScannerState):
+        """
+        Counts a scan as outstanding on `state` while the block runs.
+        """
+        state.outstanding += 1
+        try:
+            yield state.client
+        finally:
+            state.outstanding -= 1
+
+    def report_failure(self, client: ClamdClient):
+        """
+        Called when a scan loses its clamd connection or times out: stop
+        routing to that node and probe right away instead of at the next interval.
+        """
+        for state in self.states:
+            if state.client is client:
+                state.available = False
+        self._events()
+        self._update_available()
+        self._wake.set()
+
+    async def _call(self, state: ScannerState, scan: Callable[[ClamdClient], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        with self.busy(state) as client:
+            try:
+                return await scan(client)
+            except (ClamdUnavailableError, ClamdTimeoutError):
+                self.report_failure(client)
+                raise
+            finally:
+                # Also for scans a hedge cancelled: their time so far is a lower bound worth counting
+                state.observe(time.monotonic() - started)
+
+    def _hedge_allowed(self) -> bool:
+        # A few hedges are allowed before the budget has scans to be a fraction of
+        return self.hedge_after > 0 and self.stats["hedges"] < self.hedge_budget * self.stats["scans"] + 5
+
+    async def _hedged(
+        self, state: ScannerState, scan: Callable[[ClamdClient], Awaitable[T]], key: Optional[str],
+        tried: list[ScannerState]
+    ) -> T:
+        first = asyncio.create_task(self._call(state, scan))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+            backup = None if done or not self._hedge_allowed() else self.choose(key, tried)
+            if backup is None:
+                return await first
+        except BaseException:
+            first.cancel()
+            raise
+        tried.append(backup)
+        self.stats["hedges"] += 1
+        logging.info(f"Scan on {state.name} is slow; hedging on {backup.name}")
+        pending = {first, asyncio.create_task(self._call(backup, scan))}
+        errors = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def run(
+        self, scan: Callable[[ClamdClient], Awaitable[T]], key: Optional[str] = None, hedge: bool = False
+    ) -> T:
+        """
+        Runs scan(client) on the node chosen for `key` (usually the file's
+        SHA-256). Pass hedge=True only when scan can safely run twice at
+        once, e.g. it reads a file by path.
+        """
+        self.stats["scans"] += 1
+        tried: list[ScannerState] = []
+        for attempt in range(2):
+            state = await self.acquire(key, tried)
+            tried.append(state)
+            try:
+                if hedge:
+                    return await self._hedged(state, scan, key, tried)
+                return await self._call(state, scan)
+            except (ClamdUnavailableError, ClamdTimeoutError) as e:
+                if attempt:
+                    raise
+                self.stats["retries"] += 1
+                logging.warning(f"Scan on {state.name} failed, retrying on another scanner: {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready(),
+            "scanners": {state.name: state.snapshot() for state in self.states},
+            **self.stats,
+        }
+
+
+def nodes_from_settings() -> list[ClamdClient]:
+    if CLAMD_NODES.strip():
+        return [client_from_address(address) for address in CLAMD_NODES.split(",") if address.strip()]
+    return [scanner]
+
+
+def standby_from_settings() -> Optional[ClamdClient]:
+    if CLAMD_STANDBY_SOCKET or CLAMD_STANDBY_HOST:
+        return ClamdClient(socket_path=CLAMD_STANDBY_SOCKET, host=CLAMD_STANDBY_HOST, port=CLAMD_STANDBY_PORT)
+    return None
+
+
+# Shared monitor used by scan_file, the streaming scan and the health endpoints
+scanner_monitor = ScannerMonitor(nodes_from_settings(), standby_from_settings())
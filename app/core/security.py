@@ -1,14 +1,30 @@
+import os
+import time
+import calendar
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Depends, HTTPException, status
-from jose import JWTError, jwt
+from jose import JWTError, ExpiredSignatureError, jwt
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
-from typing import List
+from typing import List, Optional
 from app.models import TokenData, User, UserInDB
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from app.core.config import SECRET_KEY, ALGORITHM
-from app.core.config import get_user_from_db  # 👉 Import the real DB fetch
+from app.core.config import SECRET_KEY, VERIFY_KEYS, ALGORITHM
+from app.core.user_repository import user_repository  # 👉 Real DB access
+from app.core.principal_cache import principal_cache
+from app.core.revocation import revocation_list, revoked_since, AUTH_STATELESS
+from app.core.metrics import password_seconds
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "4"))  # Max concurrent bcrypt calls
+
+# Hashes with fewer rounds than BCRYPT_ROUNDS are flagged for rehash on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+password_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+password_stats = {"calls": 0, "in_flight": 0, "queue_seconds": 0.0, "max_queue_seconds": 0.0, "hash_seconds": 0.0}
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -16,11 +32,50 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-# 🔄 Replaced fake db access with a real DB call
-def get_user(username: str):
-    user_dict = get_user_from_db(username)
+async def _run_password_job(func, *args):
+    submitted = time.perf_counter()
+    password_stats["calls"] += 1
+    password_stats["in_flight"] += 1
+
+    def timed():
+        started = time.perf_counter()
+        return func(*args), started, time.perf_counter()
+
+    try:
+        result, started, finished = await asyncio.get_running_loop().run_in_executor(password_executor, timed)
+    finally:
+        password_stats["in_flight"] -= 1
+    # Stats are only touched from the event loop thread, so no lock is needed
+    queued = started - submitted
+    password_stats["queue_seconds"] += queued
+    password_stats["max_queue_seconds"] = max(password_stats["max_queue_seconds"], queued)
+    password_stats["hash_seconds"] += finished - started
+    password_seconds.labels("queue").observe(queued)
+    password_seconds.labels("hash").observe(finished - started)
+    return result
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(pwd_context.hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Returns (valid, new_hash); new_hash is set when the stored hash uses outdated rounds.
+    """
+    return await _run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+# 🔄 Real DB call, fronted by the in-process principal cache
+async def get_user(username: str):
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+    user_dict = await user_repository.get_by_username(username)
     if user_dict:
-        return UserInDB(**user_dict)
+        user = UserInDB(**user_dict)
+        principal_cache.put(user)
+        return user
     return None
 
 def create_access_token(data: dict, duration: str):
@@ -36,22 +91,56 @@ def create_access_token(data: dict, duration: str):
 
     expires_delta = duration_mapping[duration]
     to_encode = data.copy()
-    expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    issued = datetime.utcnow()
+    expire = issued + expires_delta
+    # `iat` is encoded in whole seconds; iat_us keeps the exact issue time so a
+    # revocation in the same second only rejects the tokens issued before it
+    to_encode.update({"exp": expire, "iat": issued, "iat_us": epoch_microseconds(issued)})
     
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     remaining_time = int((expire - datetime.utcnow()).total_seconds() / 60)  # Convert to minutes
     
     return encoded_jwt, remaining_time
 
-def get_current_user(token: str = Depends(OAuth2PasswordBearer(tokenUrl="token"))):
+def epoch_microseconds(value: datetime) -> int:
+    return calendar.timegm(value.timetuple()) * 1_000_000 + value.microsecond
+
+def issued_at(payload: dict) -> float:
+    """
+    Exact issue time of a decoded token in epoch seconds. Tokens minted
+    before iat_us existed only have the whole-second `iat`, so one issued
+    in the same second as a later revocation is rejected too.
+    """
+    if "iat_us" in payload:
+        return payload["iat_us"] / 1_000_000
+    return payload.get("iat", 0)
+
+def decode_token(token: str) -> dict:
+    """
+    Verifies the token against the current key, then any keys being rotated out.
+    """
+    for key in VERIFY_KEYS[:-1]:
+        try:
+            return jwt.decode(token, key, algorithms=[ALGORITHM])
+        except ExpiredSignatureError:
+            raise
+        except JWTError:
+            continue
+    return jwt.decode(token, VERIFY_KEYS[-1], algorithms=[ALGORITHM])
+
+async def get_current_user(token: str = Depends(OAuth2PasswordBearer(tokenUrl="token"))):
+    """
+    With AUTH_STATELESS the principal comes from the token claims and the
+    cached revocation list, so no request waits on DynamoDB. Otherwise the
+    user record is loaded (through the principal cache) and checked.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         roles: List[str] = payload.get("roles", [])
         if username is None:
@@ -60,9 +149,16 @@ def get_current_user(token: str = Depends(OAuth2PasswordBearer(tokenUrl="token")
     except JWTError:
         raise credentials_exception
 
+    issued = issued_at(payload)
+    if AUTH_STATELESS:
+        revocation_list.ensure_started()
+        if revocation_list.is_revoked(token_data.username, issued):
+            raise credentials_exception
+        return User(username=token_data.username, roles=token_data.roles)
+
     # ✅ Now fetch from real DB
-    user = get_user(username=token_data.username)
-    if user is None:
+    user = await get_user(username=token_data.username)
+    if user is None or user.disabled or issued < revoked_since(user.tokens_revoked_at):
         raise credentials_exception
     return user
 
@@ -0,0 +1,49 @@
+import json
+from typing import Any, Optional
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ModuleNotFoundError:  # Optional speed-up (`pip install orjson`); stdlib json is the fallback
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON. Values JSON can't represent (datetimes, Decimals
+    from DynamoDB, ...) are written with str().
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=str)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    # orjson.JSONDecodeError subclasses ValueError, same as json's
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when it's installed. For hand-built
+    dict responses; routes with a response_model are already serialized
+    by pydantic-core and don't need it.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(
+    model: BaseModel, status_code: int = 200, headers: Optional[dict[str, str]] = None
+) -> Response:
+    """
+    Serializes a model straight to JSON bytes with its compiled pydantic-core
+    serializer, skipping the model_dump() dict and a second encoding pass.
+    """
+    return Response(
+        content=model.model_dump_json(), status_code=status_code, headers=headers, media_type="application/json"
+    )
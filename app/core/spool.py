@@ -0,0 +1,267 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+from typing import Optional
+from fastapi import HTTPException, Request, Response, UploadFile
+from fastapi.routing import APIRoute
+from dotenv import load_dotenv
+from app.core.mime import detector, SNIFF_BYTES
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+# Load upload settings
+load_dotenv(dotenv_path="app/.env")
+
+SPOOL_DIR = os.getenv("SPOOL_DIR")  # e.g. /dev/shm for tmpfs; defaults to the system temp dir
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(2 * 1024 * 1024 * 1024)))
+# Received bytes buffered before they are hashed and written to the spool on a worker thread
+SPOOL_FLUSH_BYTES = int(os.getenv("SPOOL_FLUSH_BYTES", str(1024 * 1024)))
+
+# Documents the upload body for endpoints that parse it themselves
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            },
+            "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload grows past MAX_UPLOAD_SIZE."""
+
+
+class SpooledUpload:
+    """
+    An upload written chunk by chunk to an anonymous file in SPOOL_DIR.
+
+    tempfile.TemporaryFile uses O_TMPFILE on Linux, so the spool never has a
+    name and its space is released as soon as it is closed, even on a crash.
+
+    write() only counts and buffers the bytes. drain() hands the buffer to
+    a worker thread once SPOOL_FLUSH_BYTES have piled up (or as soon as
+    the first SNIFF_BYTES are in, for the MIME sniff), where it is hashed,
+    written and flushed, so neither SHA-256 nor disk I/O runs on the
+    event loop and at most one buffer per upload is held in memory.
+    `written` is how much of the upload is already in the file.
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str],
+        max_size: int = MAX_UPLOAD_SIZE,
+        spool_dir: Optional[str] = SPOOL_DIR,
+        flush_bytes: int = SPOOL_FLUSH_BYTES,
+    ):
+        self.filename = filename
+        self.max_size = max_size
+        self.flush_bytes = flush_bytes
+        self.file = tempfile.TemporaryFile(dir=spool_dir)
+        self.size = 0
+        self.written = 0
+        self.sha256: Optional[str] = None
+        self.mime_type: Optional[str] = None
+        self._digest = hashlib.sha256()
+        self._head = bytearray()
+        self._pending: list[bytes] = []
+
+    def write(self, data: bytes):
+        """
+        Buffers the next chunk; call drain() after each one. Raises UploadTooLargeError past max_size.
+        """
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadTooLargeError(f"Upload exceeds {self.max_size} bytes")
+        if data:
+            self._pending.append(bytes(data))
+
+    def _write_through(self, data: bytes):
+        # Runs on a worker thread; drain() never overlaps two of these
+        self._digest.update(data)
+        self.file.write(data)
+        self.file.flush()
+        if self.mime_type is None:
+            self._head.extend(data[:SNIFF_BYTES - len(self._head)])
+            if len(self._head) >= SNIFF_BYTES:
+                self.mime_type = detector.detect(bytes(self._head))
+        self.written += len(data)
+
+    async def drain(self, force: bool = False):
+        """
+        Hashes and writes the buffered bytes off the event loop once enough have built up.
+        """
+        pending = self.size - self.written
+        if not pending:
+            return
+        sniff_due = self.mime_type is None and self.size >= SNIFF_BYTES
+        if force or sniff_due or pending >= self.flush_bytes:
+            data, self._pending = b"".join(self._pending), []
+            await asyncio.to_thread(self._write_through, data)
+
+    async def finish(self):
+        await self.drain(force=True)
+        self.file.seek(0)
+        self.sha256 = self._digest.hexdigest()
+        if self.mime_type is None:
+            self.mime_type = detector.detect(bytes(self._head))
+        self._head = bytearray()
+
+    def as_upload_file(self) -> UploadFile:
+        return UploadFile(file=self.file, filename=self.filename, size=self.size)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def check_content_length(request: Request, max_size: int = MAX_UPLOAD_SIZE):
+    """
+    Rejects oversized uploads before a single body byte is read.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_size} bytes")
+
+
+async def receive_upload(request: Request, field: str = "file", max_size: int = MAX_UPLOAD_SIZE) -> SpooledUpload:
+    """
+    Streams the `field` part of a multipart body into a SpooledUpload.
+    The caller owns the returned upload and must close it.
+    """
+    check_content_length(request, max_size)
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    state = {"header_field": b"", "header_value": b"", "disposition": b"", "target": None}
+    uploads: list[SpooledUpload] = []
+
+    def on_part_begin():
+        state["disposition"] = b""
+        state["target"] = None
+
+    def on_header_field(data: bytes, start: int, end: int):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_field"].lower() == b"content-disposition":
+            state["disposition"] = state["header_value"]
+        state["header_field"] = state["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["disposition"])
+        if options.get(b"name", b"").decode("latin-1") == field and b"filename" in options and not uploads:
+            upload = SpooledUpload(options[b"filename"].decode("utf-8", "replace"), max_size)
+            uploads.append(upload)
+            state["target"] = upload
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if state["target"] is not None:
+            state["target"].write(data[start:end])
+
+    parser = multipart.MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for upload in uploads:
+                await upload.drain()
+        parser.finalize()
+        if uploads:
+            await uploads[0].finish()
+    except BaseException as e:
+        for upload in uploads:
+            upload.close()
+        if isinstance(e, UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=str(e))
+        if isinstance(e, multipart.exceptions.FormParserError):
+            raise HTTPException(status_code=400, detail="Invalid multipart data")
+        raise
+
+    if not uploads:
+        raise HTTPException(status_code=422, detail=f"Missing file field '{field}'")
+    return uploads[0]
+
+
+def is_raw_upload(request: Request) -> bool:
+    content_type, _ = parse_options_header(request.headers.get("content-type", ""))
+    return content_type == b"application/octet-stream"
+
+
+async def receive_raw_upload(request: Request, filename: Optional[str], max_size: int = MAX_UPLOAD_SIZE) -> SpooledUpload:
+    """
+    Streams a raw application/octet-stream body into a SpooledUpload.
+    The caller owns the returned upload and must close it.
+    """
+    check_content_length(request, max_size)
+    upload = SpooledUpload(filename, max_size)
+    try:
+        async for chunk in request.stream():
+            upload.write(chunk)
+            await upload.drain()
+        await upload.finish()
+    except BaseException as e:
+        upload.close()
+        if isinstance(e, UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=str(e))
+        raise
+    return upload
+
+
+class LimitedUploadRoute(APIRoute):
+    """
+    Route class for endpoints that leave multipart parsing to FastAPI
+    (File(...) parameters). The body is refused with 413 past
+    MAX_UPLOAD_SIZE, by Content-Length before it is read or while the
+    form parser is still reading it.
+    """
+
+    max_size = MAX_UPLOAD_SIZE
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            max_size = self.max_size
+            check_content_length(request, max_size)
+            received = 0
+
+            async def receive():
+                nonlocal received
+                message = await request.receive()
+                received += len(message.get("body", b""))
+                if received > max_size:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_size} bytes")
+                return message
+
+            return await handler(Request(request.scope, receive))
+
+        return limited_handler
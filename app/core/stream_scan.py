@@ -0,0 +1,179 @@
+import os
+import math
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+from dotenv import load_dotenv
+from app.core.clamd import ClamdClient, ClamdTimeoutError, ClamdUnavailableError
+from app.core.spool import SpooledUpload
+
+# Load streaming scan settings
+load_dotenv(dotenv_path="app/.env")
+
+# First prefix rescanned for an early verdict; doubles up to the limit. 0 disables early detection
+STREAM_SCAN_CHECKPOINT = int(os.getenv("STREAM_SCAN_CHECKPOINT", str(1024 * 1024)))
+STREAM_SCAN_CHECKPOINT_LIMIT = int(os.getenv("STREAM_SCAN_CHECKPOINT_LIMIT", str(64 * 1024 * 1024)))
+STREAM_SCAN_QUEUE = int(os.getenv("STREAM_SCAN_QUEUE", "16"))  # Chunks buffered ahead of clamd
+# Longest wait for the next body chunk while a clamd connection is held; keep below clamd's ReadTimeout (120s)
+STREAM_SCAN_IDLE_TIMEOUT = float(os.getenv("STREAM_SCAN_IDLE_TIMEOUT", "30"))
+
+PREFIX_READ_SIZE = 1024 * 1024
+
+
+class UploadStalledError(Exception):
+    """Raised when the client sends no body data for the idle timeout."""
+
+
+async def idle_limited(chunks: AsyncIterator[bytes], timeout: float = STREAM_SCAN_IDLE_TIMEOUT) -> AsyncIterator[bytes]:
+    """
+    Yields from `chunks`, raising UploadStalledError when the next one takes longer than `timeout`.
+    """
+    iterator = chunks.__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(iterator.__anext__(), timeout)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise UploadStalledError(f"No data received for {timeout:.0f}s") from None
+        yield chunk
+
+
+async def iter_prefix(fileobj, size: int) -> AsyncIterator[bytes]:
+    """
+    Yields the first `size` bytes of a file that is still being appended to.
+    """
+    fd, offset = fileobj.fileno(), 0
+    while offset < size:
+        chunk = await asyncio.to_thread(os.pread, fd, min(PREFIX_READ_SIZE, size - offset), offset)
+        if not chunk:
+            return
+        offset += len(chunk)
+        yield chunk
+
+
+class StreamScan:
+    """
+    Scans an upload while its body arrives.
+
+    Every chunk is spooled (for the hash, the MIME sniff and a fallback
+    scan) and fed to one INSTREAM, so the verdict is ready right after the
+    last byte. clamd only answers INSTREAM once the stream ends, so early
+    detection comes from rescanning the prefix received so far on a second
+    connection at doubling sizes (checkpoint, 2x, 4x ... up to
+    checkpoint_limit): a payload at offset N is reported by the time about
+    2N bytes have arrived, and the caller can stop reading the body.
+
+    The live pass has no overall deadline, since a large body may take a
+    while; the caller reads the body through idle_limited() instead, so a
+    stalled client can't hold the connection, and finish() waits at most
+    the client's timeout for the reply.
+    """
+
+    def __init__(
+        self,
+        upload: SpooledUpload,
+        client: ClamdClient,
+        checkpoint: int = STREAM_SCAN_CHECKPOINT,
+        checkpoint_limit: int = STREAM_SCAN_CHECKPOINT_LIMIT,
+    ):
+        self.upload = upload
+        self.client = client
+        self.next_checkpoint = checkpoint if checkpoint > 0 else math.inf
+        self.checkpoint_limit = checkpoint_limit
+        self.checkpoints = 0
+        self.detection: Optional[str] = None
+        self.scanning = True
+        self._queue: asyncio.Queue = asyncio.Queue(STREAM_SCAN_QUEUE)
+        self._live = asyncio.create_task(client.instream(self._chunks(), timeout=math.inf))
+        self._checkpoint: Optional[asyncio.Task] = None
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        while (chunk := await self._queue.get()) is not None:
+            yield chunk
+
+    def _collect_checkpoint(self):
+        task = self._checkpoint
+        if task is None or not task.done():
+            return
+        self._checkpoint = None
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # The live pass still decides; a failed rescan only loses the early verdict
+            logging.debug(f"Checkpoint scan of {self.upload.filename} failed: {task.exception()!r}")
+            return
+        infected, virus_name = task.result()
+        if infected:
+            self.detection = virus_name
+
+    def _start_checkpoint(self):
+        # Only what drain() has already written and flushed can be reread
+        size = self.upload.written
+        self._checkpoint = asyncio.create_task(self.client.instream(iter_prefix(self.upload.file, size)))
+        self.checkpoints += 1
+        self.next_checkpoint = size * 2 if size * 2 <= self.checkpoint_limit else math.inf
+
+    async def feed(self, chunk: bytes) -> Optional[str]:
+        """
+        Spools and scans the next chunk. Returns the virus name once a checkpoint has found one.
+        Raises UploadTooLargeError past the upload's max size.
+        """
+        self.upload.write(chunk)
+        await self.upload.drain()
+        if not self.scanning:
+            return None
+        if not self._live.done():
+            try:
+                await asyncio.wait_for(self._queue.put(chunk), self.client.timeout)
+            except asyncio.TimeoutError:
+                # clamd stopped reading; finish() falls back to scanning the spool
+                self._live.cancel()
+        self._collect_checkpoint()
+        if self.detection is None and self._checkpoint is None and self.upload.size >= self.next_checkpoint:
+            # The prefix is reread from the spool, so write out what drain() is still holding back
+            await self.upload.drain(force=True)
+            self._start_checkpoint()
+        return self.detection
+
+    async def finish(self) -> Optional[tuple[bool, Optional[str]]]:
+        """
+        Ends the stream and returns (infected, virus_name), or None when the
+        live pass was lost and the spooled upload needs a regular scan.
+        """
+        await self.upload.finish()
+        self._collect_checkpoint()
+        if self.detection is not None:
+            await self.stop()
+            return True, self.detection
+        await self._cancel(self._checkpoint)
+        if self._live.done():
+            if self._live.cancelled():
+                return None
+        else:
+            try:
+                await asyncio.wait_for(self._queue.put(None), self.client.timeout)
+            except asyncio.TimeoutError:
+                await self._cancel(self._live)
+                return None
+        try:
+            return await asyncio.wait_for(self._live, self.client.timeout)
+        except asyncio.TimeoutError as e:
+            raise ClamdTimeoutError(f"clamd at {self.client!r} did not answer within {self.client.timeout:.0f}s") from e
+        except ClamdUnavailableError as e:
+            logging.warning(f"Lost clamd while streaming {self.upload.filename}: {e}")
+            return None
+
+    async def stop(self):
+        """
+        Stops scanning; later chunks are only spooled.
+        """
+        self.scanning = False
+        await self._cancel(self._checkpoint)
+        await self._cancel(self._live)
+
+    @staticmethod
+    async def _cancel(task: Optional[asyncio.Task]):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,79 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+from dotenv import load_dotenv
+from app.core.user_repository import user_repository, token_metadata_updates
+
+# Load token metadata settings
+load_dotenv(dotenv_path="app/.env")
+
+# Seconds between metadata flushes; 0 writes on the login request path
+TOKEN_METADATA_FLUSH_INTERVAL = float(os.getenv("TOKEN_METADATA_FLUSH_INTERVAL", "5"))
+
+
+class TokenMetadataWriter:
+    """
+    Coalesces token metadata updates (last used, created, expiry, failed
+    count) per user and writes them in the background. A burst of logins
+    for one user becomes a single UpdateItem per flush; failed attempts
+    keep accumulating on top of the pending value.
+    """
+
+    def __init__(self, repository=None, interval: float = TOKEN_METADATA_FLUSH_INTERVAL):
+        self.repository = repository or user_repository
+        self.interval = interval
+        self.stats = {"recorded": 0, "written": 0, "failed": 0}
+        self._pending: dict[str, tuple[str, dict]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    async def record(self, user: dict, success: bool, expire_time: str = ""):
+        self.stats["recorded"] += 1
+        username = user["username"]
+        if self.interval <= 0:
+            await self.repository.update(user["id"], username, token_metadata_updates(user, success, expire_time))
+            self.stats["written"] += 1
+            return
+        _, pending = self._pending.get(username, (user["id"], {}))
+        updates = token_metadata_updates({**user, **pending}, success, expire_time)
+        self._pending[username] = (user["id"], {**pending, **updates})
+        if self._task is None:
+            self._task = asyncio.create_task(self._flusher())
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        results = await asyncio.gather(
+            *(self.repository.update(user_id, username, updates) for username, (user_id, updates) in pending.items()),
+            return_exceptions=True,
+        )
+        for (username, entry), result in zip(pending.items(), results):
+            if isinstance(result, Exception):
+                self.stats["failed"] += 1
+                logging.warning(f"Could not write token metadata for {username}: {result}")
+                # Retry next flush unless a newer update already replaced it
+                self._pending.setdefault(username, entry)
+            else:
+                self.stats["written"] += 1
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def stop(self):
+        """
+        Stops the background writer and flushes what is still pending.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pending:
+            await self.flush()
+
+
+# Shared writer used by the login endpoint
+token_metadata = TokenMetadataWriter()
@@ -0,0 +1,234 @@
+import os
+import time
+import asyncio
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from dotenv import load_dotenv
+from app.core.aws import aws_session
+from app.core.principal_cache import principal_cache
+from app.core.metrics import dynamodb_call_seconds
+
+# Load AWS settings
+load_dotenv(dotenv_path="app/.env")
+
+DYNAMODB_USERS_TABLE = os.getenv("DYNAMODB_USERS_TABLE", "users")
+# GSI keyed on username (projection ALL); create it with `python -m app.core.migrate_users`
+USERNAME_INDEX = os.getenv("DYNAMODB_USERNAME_INDEX", "username-index")
+DYNAMODB_ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL")  # e.g. dynamodb-local
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "50"))
+DYNAMODB_MAX_ATTEMPTS = int(os.getenv("DYNAMODB_MAX_ATTEMPTS", "5"))
+# Username-index queries in flight at once when checking a batch of usernames
+USERNAME_LOOKUP_CONCURRENCY = int(os.getenv("USERNAME_LOOKUP_CONCURRENCY", "25"))
+
+
+def token_metadata_updates(user: dict, success: bool, expire_time: str = "") -> dict:
+    updates = {
+        "token_last_used": datetime.utcnow().isoformat()
+    }
+    if success:
+        updates["token_created"] = datetime.utcnow().isoformat()
+        updates["token_expiration"] = expire_time
+        updates["token_failed"] = 0
+    else:
+        updates["token_failed"] = int(user.get("token_failed", 0)) + 1
+    return updates
+
+
+class UserRepository:
+    """
+    Async access to user records in DynamoDB.
+
+    boto3 is blocking, so every call runs on a dedicated thread pool sized
+    to the HTTP connection pool. The resource is created lazily on first
+    use from the shared session and retries with botocore's adaptive mode
+    (backoff plus client-side rate limiting).
+    """
+
+    def __init__(
+        self,
+        table_name: str = DYNAMODB_USERS_TABLE,
+        username_index: str = USERNAME_INDEX,
+        endpoint_url: Optional[str] = DYNAMODB_ENDPOINT_URL,
+        max_pool_connections: int = DYNAMODB_MAX_POOL_CONNECTIONS,
+        max_attempts: int = DYNAMODB_MAX_ATTEMPTS,
+    ):
+        self.table_name = table_name
+        self.username_index = username_index
+        self.endpoint_url = endpoint_url
+        self.max_pool_connections = max_pool_connections
+        self.max_attempts = max_attempts
+        self._table = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_pool_connections, thread_name_prefix="dynamodb")
+
+    @property
+    def table(self):
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    from botocore.config import Config
+
+                    resource = aws_session().resource(
+                        "dynamodb",
+                        endpoint_url=self.endpoint_url,
+                        config=Config(
+                            max_pool_connections=self.max_pool_connections,
+                            retries={"mode": "adaptive", "max_attempts": self.max_attempts},
+                        ),
+                    )
+                    self._table = resource.Table(self.table_name)
+        return self._table
+
+    @table.setter
+    def table(self, table):
+        self._table = table
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+        finally:
+            # Includes time queued for a pool thread, which is what callers wait on
+            dynamodb_call_seconds.labels(func.__name__.lstrip("_")).observe(time.perf_counter() - start)
+
+    def _get_by_username(self, username: str) -> Optional[dict]:
+        from boto3.dynamodb.conditions import Key
+
+        response = self.table.query(
+            IndexName=self.username_index,
+            KeyConditionExpression=Key("username").eq(username),
+            Limit=1
+        )
+        items = response.get("Items", [])
+        return items[0] if items else None
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        return await self._run(self._get_by_username, username)
+
+    async def create(self, item: dict):
+        await self._run(self.table.put_item, Item=item)
+        principal_cache.invalidate(item["username"])
+
+    def _username_exists(self, username: str) -> bool:
+        from boto3.dynamodb.conditions import Key
+
+        response = self.table.query(
+            IndexName=self.username_index,
+            KeyConditionExpression=Key("username").eq(username),
+            Select="COUNT",
+            Limit=1
+        )
+        return response["Count"] > 0
+
+    async def existing_usernames(self, usernames: set[str]) -> set[str]:
+        """
+        The subset of `usernames` that already exist. One index query per
+        name, USERNAME_LOOKUP_CONCURRENCY at a time, so the cost follows the
+        batch size rather than the size of the table.
+        """
+        names = list(usernames)
+        found = set()
+        for start in range(0, len(names), USERNAME_LOOKUP_CONCURRENCY):
+            chunk = names[start:start + USERNAME_LOOKUP_CONCURRENCY]
+            exists = await asyncio.gather(*(self._run(self._username_exists, name) for name in chunk))
+            found.update(name for name, hit in zip(chunk, exists) if hit)
+        return found
+
+    def _create_many(self, items: list[dict]):
+        # batch_writer groups puts into BatchWriteItem calls of 25 and resends unprocessed items
+        with self.table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+    async def create_many(self, items: list[dict]):
+        await self._run(self._create_many, items)
+        for item in items:
+            principal_cache.invalidate(item["username"])
+
+    async def update(self, user_id: str, username: str, updates: dict):
+        await self._run(
+            self.table.update_item,
+            Key={"id": user_id},  # Assumes 'id' is the partition key
+            # Names go through placeholders so reserved words (roles, name, ...) can be set too
+            UpdateExpression="SET " + ", ".join(f"#{k} = :{k}" for k in updates),
+            ExpressionAttributeNames={f"#{k}": k for k in updates},
+            ExpressionAttributeValues={f":{k}": v for k, v in updates.items()}
+        )
+        principal_cache.invalidate(username)
+
+    def _revoked_users(self) -> list[dict]:
+        # Paginated scan that only returns (and projects) users with a revocation marker
+        kwargs = {
+            "ProjectionExpression": "#u, #d, #r",
+            "FilterExpression": "#d = :true OR attribute_exists(#r)",
+            "ExpressionAttributeNames": {"#u": "username", "#d": "disabled", "#r": "tokens_revoked_at"},
+            "ExpressionAttributeValues": {":true": True},
+        }
+        items = []
+        while True:
+            page = self.table.scan(**kwargs)
+            items.extend(page.get("Items", []))
+            if "LastEvaluatedKey" not in page:
+                return items
+            kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+    async def revoked_users(self) -> list[dict]:
+        """
+        Disabled users and users whose tokens were revoked: username, disabled, tokens_revoked_at.
+        """
+        return await self._run(self._revoked_users)
+
+    async def update_token_metadata(self, username: str, success: bool, expire_time: str = "", user: Optional[dict] = None):
+        user = user or await self.get_by_username(username)
+        if not user:
+            return
+        await self.update(user["id"], username, token_metadata_updates(user, success, expire_time))
+
+    async def update_password_hash(self, user_id: str, username: str, hashed_password: str):
+        await self.update(user_id, username, {"password": hashed_password})
+
+
+class InMemoryUserRepository(UserRepository):
+    """
+    Local stand-in with the same async interface, for tests and benchmarks.
+    """
+
+    def __init__(self, users: Optional[list[dict]] = None):
+        self.items: dict[str, dict] = {}
+        for item in users or []:
+            self.items[item["id"]] = dict(item)
+
+    async def get_by_username(self, username: str) -> Optional[dict]:
+        for item in self.items.values():
+            if item.get("username") == username:
+                return dict(item)
+        return None
+
+    async def create(self, item: dict):
+        self.items[item["id"]] = dict(item)
+        principal_cache.invalidate(item["username"])
+
+    async def existing_usernames(self, usernames: set[str]) -> set[str]:
+        return {item["username"] for item in self.items.values() if item.get("username") in usernames}
+
+    async def create_many(self, items: list[dict]):
+        for item in items:
+            await self.create(item)
+
+    async def update(self, user_id: str, username: str, updates: dict):
+        self.items[user_id].update(updates)
+        principal_cache.invalidate(username)
+
+    async def revoked_users(self) -> list[dict]:
+        return [
+            {key: item[key] for key in ("username", "disabled", "tokens_revoked_at") if key in item}
+            for item in self.items.values()
+            if item.get("disabled") or item.get("tokens_revoked_at")
+        ]
+
+
+# Shared repository used by the API
+user_repository = UserRepository()
@@ -1,5 +1,94 @@
 # core/rate_limit.py
+import os
+from fastapi import Request
+from jose import JWTError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from dotenv import load_dotenv
+from app.core.security import decode_token
 
-limiter = Limiter(key_func=get_remote_address)
+# Load rate limit settings
+load_dotenv(dotenv_path="app/.env")
+
+# Shared storage so limits hold across workers and pods, e.g. redis://redis:6379/0
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+# sliding-window-counter, moving-window or fixed-window
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter")
+RATE_LIMIT_POOL_SIZE = int(os.getenv("RATE_LIMIT_POOL_SIZE", "50"))
+RATE_LIMIT_TIMEOUT = float(os.getenv("RATE_LIMIT_TIMEOUT", "0.1"))  # Seconds per storage call
+# Per-route overrides by route name, e.g. "scan=20/minute,scan_batch=5/minute,login=10/minute"
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")
+# Only enable behind a proxy that sets X-Forwarded-For; otherwise clients can spoof it
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+# How many proxies in front of the app append to X-Forwarded-For; the client is that many entries from the right
+RATE_LIMIT_TRUSTED_PROXIES = max(int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "1")), 1)
+
+
+def parse_route_limits(spec: str) -> dict[str, str]:
+    limits = {}
+    for item in spec.split(","):
+        name, _, limit = item.partition("=")
+        if name.strip() and limit.strip():
+            limits[name.strip()] = limit.strip()
+    return limits
+
+
+ROUTE_LIMITS = parse_route_limits(RATE_LIMITS)
+
+
+def route_limit(name: str, default: str) -> str:
+    return ROUTE_LIMITS.get(name, default)
+
+
+def client_address(request: Request) -> str:
+    """
+    Each proxy appends the address it saw, so only the rightmost entries
+    are trustworthy; anything to their left came from the client. Take the
+    entry written by the outermost trusted proxy.
+    """
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = [entry.strip() for entry in request.headers.get("x-forwarded-for", "").split(",")]
+        forwarded = [entry for entry in forwarded if entry]
+        if forwarded:
+            return forwarded[max(len(forwarded) - RATE_LIMIT_TRUSTED_PROXIES, 0)]
+    return get_remote_address(request)
+
+
+def rate_limit_key(request: Request) -> str:
+    """
+    Authenticated requests are limited per user (the JWT `sub`), so clients
+    behind one NAT or load balancer don't share a bucket; anonymous ones
+    fall back to the client address.
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = decode_token(token).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    return f"ip:{client_address(request)}"
+
+
+def storage_options(uri: str = RATE_LIMIT_STORAGE_URI) -> dict:
+    # Redis clients share one connection pool; each check is a single scripted round trip
+    if uri.startswith(("redis", "valkey", "rediss")):
+        return {
+            "max_connections": RATE_LIMIT_POOL_SIZE,
+            "socket_timeout": RATE_LIMIT_TIMEOUT,
+            "socket_connect_timeout": RATE_LIMIT_TIMEOUT,
+        }
+    return {}
+
+
+limiter = Limiter(
+    key_func=rate_limit_key,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    storage_options=storage_options(),
+    strategy=RATE_LIMIT_STRATEGY,
+    key_prefix="filescan",
+    # If the shared storage goes away, keep limiting per process instead of failing requests
+    in_memory_fallback_enabled=True,
+)
@@ -1,179 +1,92 @@
 import os
-import time
 import logging
-import boto3
-import json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
 import warnings
 from logging import StreamHandler
 from dotenv import load_dotenv
-import botocore.exceptions
 from slowapi.middleware import SlowAPIMiddleware
 from app.core.utils import limiter
+from app.core.cloudwatch import CloudWatchLoggingHandler
+from app.core.middleware import LoggingMiddleware, MetricsMiddleware
+from app.core.metrics import rate_limit_rejections, route_label
 from slowapi.errors import RateLimitExceeded
-from fastapi.responses import JSONResponse
+from app.core.serialization import FastJSONResponse
 
 # Load environment variables from .env file
 load_dotenv(dotenv_path="app/.env")
 
-# AWS CloudWatch setup
-cloudwatch_logs = boto3.client(
-    'logs',
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
-
+# AWS CloudWatch setup (the client is created and the stream provisioned in the background at startup)
 log_group = "/EC2-Cloud-Watch"
 log_stream = "EC2-Cloud-Watch-Log"
 
-# Create CloudWatch Log Group
-try:
-    cloudwatch_logs.create_log_group(logGroupName=log_group)
-except cloudwatch_logs.exceptions.ResourceAlreadyExistsException:
-    pass
-
-# Create CloudWatch Log Stream
-try:
-    cloudwatch_logs.create_log_stream(logGroupName=log_group, logStreamName=log_stream)
-except cloudwatch_logs.exceptions.ResourceAlreadyExistsException:
-    pass
-
-class CloudWatchLoggingHandler(logging.Handler):
-    def __init__(self):
-        super().__init__()
-        self.sequence_token = None
-
-    def emit(self, record):
-        log_entry = self.format(record)
-        timestamp = int(round(time.time() * 1000))
-        try:
-            kwargs = {
-                'logGroupName': log_group,
-                'logStreamName': log_stream,
-                'logEvents': [{
-                    'timestamp': timestamp,
-                    'message': log_entry
-                }]
-            }
-            if self.sequence_token:
-                kwargs['sequenceToken'] = self.sequence_token
-
-            response = cloudwatch_logs.put_log_events(**kwargs)
-            self.sequence_token = response.get('nextSequenceToken')
-        except botocore.exceptions.ClientError as e:
-            print(f"Failed to send log to CloudWatch: {e}")
-
 # Set up local logging
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE_PATH = os.path.join(LOG_DIR, "app.log")
 
+cloudwatch_handler = CloudWatchLoggingHandler(
+    None,
+    log_group,
+    log_stream,
+    spill_path=os.path.join(LOG_DIR, "cloudwatch_spill.log"),
+    provision=True
+)
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
     handlers=[
         logging.FileHandler(LOG_FILE_PATH),
         logging.StreamHandler(),
-        CloudWatchLoggingHandler()
+        cloudwatch_handler
     ]
 )
 
 logging.info("✅ Logging system initialized.")
 
-app = FastAPI()
-
-SENSITIVE_KEYS = {"password", "token", "access_token", "refresh_token", "secret", "authorization"}
-
-def redact_sensitive(data):
-    if isinstance(data, dict):
-        return {
-            k: ("***REDACTED***" if k.lower() in SENSITIVE_KEYS else redact_sensitive(v))
-            for k, v in data.items()
-        }
-    elif isinstance(data, list):
-        return [redact_sensitive(item) for item in data]
-    else:
-        return data
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        print("🛡️ LoggingMiddleware triggered")
-        start_time = time.time()
-
-        body = await request.body()
-        request_body = body.decode("utf-8") if body else None
-
-        async def receive():
-            return {"type": "http.request", "body": body}
-        request._receive = receive
-
-        response = await call_next(request)
-
-        response_body = b""
-        async for chunk in response.body_iterator:
-            response_body += chunk
-        response_content = response_body.decode("utf-8") if response_body else None
-
-        final_response = Response(
-            content=response_body,
-            status_code=response.status_code,
-            headers=dict(response.headers),
-            media_type=response.media_type
-        )
-
-        # Redact sensitive headers
-        headers = {
-            k: ("***REDACTED***" if k.lower() in SENSITIVE_KEYS else v)
-            for k, v in dict(request.headers).items()
-        }
-
-        # Redact sensitive body
-        content_type = request.headers.get("content-type", "")
-        if "multipart/form-data" in content_type:
-            redacted_request = "***REDACTED MULTIPART FORM DATA***"
-        else:
-            try:
-                parsed_request = json.loads(request_body) if request_body else None
-                redacted_request = redact_sensitive(parsed_request)
-            except Exception:
-                redacted_request = request_body
-
-        # Redact sensitive response body
-        try:
-            parsed_response = json.loads(response_content) if response_content else None
-            redacted_response = redact_sensitive(parsed_response)
-        except Exception:
-            redacted_response = response_content
-
-        log_details = {
-            "method": request.method,
-            "url": str(request.url),
-            "headers": headers,
-            "query_params": dict(request.query_params),
-            "path_params": request.path_params,
-            "body": redacted_request,
-            "status_code": response.status_code,
-            "response_body": redacted_response,
-            "process_time": f"{(time.time() - start_time):.4f}s",
-        }
-
-        logging.info(f"📋 Full API Call Log: {json.dumps(log_details, indent=2)}")
-        return final_response
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 🚀 Nothing external is contacted at import; CloudWatch connects from its own thread
+    cloudwatch_handler.start()
+    await scan_pool.start()
+    await scanner_monitor.start()
+    if AUTH_STATELESS:
+        await revocation_list.start()
+    yield
+    # 🛑 Drain background work before the process exits
+    await job_queue.stop()
+    await scan_history.stop()
+    await token_metadata.stop()
+    await revocation_list.stop()
+    await scanner_monitor.stop()
+    await scan_pool.close()
+    await scanner_monitor.close()
+    await scanner.close()
+    cloudwatch_handler.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add middleware
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
 
 # Include all API routers
 from app.api.routes import router as api_router
+from app.api.scan import job_queue
+from app.core.clamd import scanner
+from app.core.scan_pool import scan_pool
+from app.core.scanner_health import scanner_monitor
+from app.core.scan_history import scan_history
+from app.core.token_metadata import token_metadata
+from app.core.revocation import revocation_list, AUTH_STATELESS
 app.include_router(api_router)
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
-    return JSONResponse(
+    rate_limit_rejections.labels(route_label(request.scope)).inc()
+    return FastJSONResponse(
         status_code=429,
         content={"detail": "Rate limit exceeded. Please try again in a moment."},
     )
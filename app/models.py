@@ -32,6 +32,7 @@ class UserInDB(User):
     token_expiration: Optional[str] = None
     token_failed: Optional[int] = 0
     token_last_used: Optional[str] = None
+    tokens_revoked_at: Optional[str] = None  # Tokens issued before this are rejected
 
 
 # Model for login request
@@ -41,11 +42,19 @@ class Login(BaseModel):
     duration: str  # e.g., '30m' or '1h'
 
 
+# Infected member of an archive that was scanned member by member
+class InfectedMember(BaseModel):
+    name: str
+    infected_by: Optional[str] = None
+
+
 # Model used to represent a scan record
 class Scan(BaseModel):
     time: str  # You may want to convert this to datetime
     is_infected: bool
     infected_by: Optional[str] = None
+    infected_members: Optional[List[InfectedMember]] = None  # Set when an archive was unpacked
+    aborted_at: Optional[int] = None  # Bytes received when an early detection stopped a streamed upload
 
 
 # Token response used by the API
@@ -61,4 +70,56 @@ class RegisteredUserResponse(BaseModel):
     token_created: Optional[str]
     token_expiration: Optional[str]
     token_failed: int
-    token_last_used: Optional[str]
\ No newline at end of file
+    token_last_used: Optional[str]
+
+# Per-row outcome of /users/register/bulk, streamed as NDJSON
+class BulkRegisterResult(BaseModel):
+    row: int  # 1-based, in input order
+    username: Optional[str] = None
+    status: str  # created, exists, duplicate, invalid or error
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+# Per-file outcome of a batch scan (result or error)
+class BatchScanItem(BaseModel):
+    filename: str
+    result: Optional[Scan] = None
+    error: Optional[str] = None
+
+
+class BatchScanResponse(BaseModel):
+    results: List[BatchScanItem]
+
+
+# Asynchronous scan job, returned by /scan/?async=true and GET /scan/jobs/{id}
+class ScanJob(BaseModel):
+    id: str
+    status: str  # queued | running | done | failed
+    filename: Optional[str] = None
+    size: int
+    owner: str
+    submitted_at: str
+    finished_at: Optional[str] = None
+    result: Optional[Scan] = None
+    error: Optional[str] = None
+    callback_url: Optional[str] = None
+
+
+# One verdict in the scan history store, returned by GET /scan/history
+class ScanRecord(BaseModel):
+    id: str
+    scanned_at: str  # UTC ISO 8601, sorts lexicographically
+    username: Optional[str] = None
+    filename: Optional[str] = None
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    mime_type: Optional[str] = None
+    is_infected: bool
+    infected_by: Optional[str] = None
+    duration_ms: int
+    signature_version: Optional[str] = None
+
+
+class ScanHistoryPage(BaseModel):
+    items: List[ScanRecord]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
@@ -0,0 +1,93 @@
+"""
+Repeated near-identical archives: whole-archive scans vs per-member dedup.
+
+Uploads the same zip --rounds times with one member changed each round
+and scans it two ways against a fake clamd that takes --delay seconds
+per scan plus --per-mb seconds per MB received (real clamd time grows
+with the bytes it unpacks). "whole" sends the archive to clamd as one
+stream, as /scan/ did before; "members" runs scan_archive, which only
+sends the members whose hash has no cached verdict.
+
+    python -m benchmarks.bench_archive --members 50 --size 262144 --rounds 20
+"""
+import io
+import os
+import time
+import asyncio
+import hashlib
+import zipfile
+import argparse
+import tempfile
+
+from fastapi import UploadFile
+
+from app.api import scan
+from app.core.clamd import scanner
+from app.core.scan_cache import ScanCache
+from benchmarks.fake_clamd import FakeClamd
+
+
+class SizedFakeClamd(FakeClamd):
+    def __init__(self, delay: float, per_mb: float):
+        super().__init__(delay=delay)
+        self.per_mb = per_mb
+        self.bytes = 0
+
+    async def _instream(self, reader: asyncio.StreamReader) -> bytes:
+        data = await super()._instream(reader)
+        self.bytes += len(data)
+        await asyncio.sleep(len(data) / (1024 * 1024) * self.per_mb)
+        return data
+
+
+def make_archive(members: list[bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i, payload in enumerate(members):
+            archive.writestr(f"dir/member-{i}.bin", payload)
+    return buffer.getvalue()
+
+
+async def run(mode: str, fake: SizedFakeClamd, archives: list[bytes]) -> float:
+    scan.scan_cache = ScanCache(disk_path=None)
+    start = time.perf_counter()
+    for i, payload in enumerate(archives):
+        upload = UploadFile(file=io.BytesIO(payload), filename=f"bundle-{i}.zip")
+        sha256 = hashlib.sha256(payload).hexdigest()
+        if mode == "whole":
+            await scan.scan_file(upload, sha256)
+        else:
+            await scan.scan_archive(upload, sha256)
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=50)
+    parser.add_argument("--size", type=int, default=256 * 1024, help="bytes per member")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.005, help="Simulated clamd time per scan (s)")
+    parser.add_argument("--per-mb", type=float, default=0.02, help="Simulated clamd time per MB (s)")
+    args = parser.parse_args()
+
+    members = [os.urandom(args.size) for _ in range(args.members)]
+    archives = []
+    for round_ in range(args.rounds):
+        members[round_ % args.members] = os.urandom(args.size)
+        archives.append(make_archive(members))
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"fake-clamd-{os.getpid()}.sock")
+    scanner.socket_path, scanner.host = socket_path, None
+    scan.scan_pool.workers = 0  # Keep both legs on the event loop; only the scanned bytes differ
+
+    for mode in ("whole", "members"):
+        fake = await SizedFakeClamd(args.delay, args.per_mb).start_unix(socket_path)
+        elapsed = await run(mode, fake, archives)
+        print(f"{mode:8} {args.rounds / elapsed:7.1f} archives/s | clamd scans {fake.commands:6} "
+              f"| {fake.bytes / (1024 * 1024):9.1f} MB sent to clamd")
+        await scanner.close()
+        await fake.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
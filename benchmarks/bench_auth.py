@@ -0,0 +1,99 @@
+"""
+Per-request auth cost: DB-backed get_current_user vs stateless validation.
+
+A stub repository sleeps --latency seconds per lookup to stand in for
+the DynamoDB round trip. "db" is the default mode with the principal
+cache off (every request reads the user), "db+cache" turns the cache on
+(one read per user per TTL), "stateless" checks the JWT claims against
+the revocation list only. Also reports how many metadata writes
+--logins logins produce with and without coalescing.
+
+    python -m benchmarks.bench_auth --requests 2000 --users 50 --latency 0.005
+"""
+import time
+import asyncio
+import argparse
+
+from app.core import security
+from app.core.principal_cache import principal_cache
+from app.core.revocation import RevocationList
+from app.core.token_metadata import TokenMetadataWriter
+from app.core.user_repository import InMemoryUserRepository
+
+
+class SlowRepository(InMemoryUserRepository):
+    def __init__(self, users: list[dict], latency: float):
+        super().__init__(users)
+        self.latency = latency
+        self.calls = 0
+
+    async def get_by_username(self, username: str):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return await super().get_by_username(username)
+
+    async def update(self, user_id: str, username: str, updates: dict):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        await super().update(user_id, username, updates)
+
+
+async def run_auth(mode: str, tokens: list[str], repository: SlowRepository, concurrency: int) -> tuple[float, int]:
+    security.AUTH_STATELESS = mode == "stateless"
+    principal_cache.ttl = 30 if mode == "db+cache" else 0
+    principal_cache.clear()
+    repository.calls = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(token: str):
+        async with semaphore:
+            await security.get_current_user(token)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(token) for token in tokens))
+    return len(tokens) / (time.perf_counter() - start), repository.calls
+
+
+async def run_logins(interval: float, users: list[dict], repository: SlowRepository, logins: int) -> int:
+    writer = TokenMetadataWriter(repository, interval=interval)
+    repository.calls = 0
+    for i in range(logins):
+        await writer.record(users[i % len(users)], success=i % 4 != 0, expire_time="2030-01-01T00:00:00")
+    await writer.stop()
+    return repository.calls
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="Simulated DynamoDB latency (s)")
+    parser.add_argument("--logins", type=int, default=1000)
+    args = parser.parse_args()
+
+    users = [
+        {"id": str(i), "username": f"user{i}", "password": "x", "roles": ["user"], "token_failed": 0}
+        for i in range(args.users)
+    ]
+    repository = SlowRepository(users, args.latency)
+    security.user_repository = repository
+    security.revocation_list = RevocationList(repository)
+    await security.revocation_list.refresh()
+    tokens = [
+        security.create_access_token({"sub": users[i % args.users]["username"], "roles": ["user"]}, "1d")[0]
+        for i in range(args.requests)
+    ]
+
+    for mode in ("db", "db+cache", "stateless"):
+        rate, calls = await run_auth(mode, tokens, repository, args.concurrency)
+        print(f"{mode:10} {rate:10,.0f} auths/s | {calls:6} DB reads")
+    await security.revocation_list.stop()
+
+    inline = await run_logins(0, users, repository, args.logins)
+    coalesced = await run_logins(3600, users, repository, args.logins)
+    print(f"token metadata for {args.logins} logins: {inline} writes inline, {coalesced} coalesced")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Aggregate throughput: /scan/batch fan-out vs one scan_file call per file.
+
+Runs the scan layer against a fake clamd with a simulated per-file scan
+time. HTTP round trips of the single-file path are not included, so the
+real-world gap is larger than reported here.
+
+    python -m benchmarks.bench_batch --files 30 --delay 0.02
+"""
+import io
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from fastapi import UploadFile
+
+from app.api import scan
+from app.core.clamd import scanner
+from benchmarks.fake_clamd import FakeClamd
+
+
+def make_uploads(count: int, size: int) -> list[UploadFile]:
+    return [UploadFile(file=io.BytesIO(os.urandom(size)), filename=f"part-{i}.bin") for i in range(count)]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--size", type=int, default=256 * 1024)
+    parser.add_argument("--delay", type=float, default=0.02, help="Simulated clamd scan time (s)")
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"fake-clamd-{os.getpid()}.sock")
+    fake = await FakeClamd(delay=args.delay).start_unix(socket_path)
+    scanner.socket_path, scanner.host = socket_path, None
+
+    # Fresh random payloads for each leg so the verdict cache never hits
+    uploads = make_uploads(args.files, args.size)
+    start = time.perf_counter()
+    for upload in uploads:
+        await scan.scan_file(upload)
+    sequential = args.files / (time.perf_counter() - start)
+
+    uploads = make_uploads(args.files, args.size)
+    start = time.perf_counter()
+    await asyncio.gather(*(scan.scan_batch_item(upload, "bench") for upload in uploads))
+    batch = args.files / (time.perf_counter() - start)
+
+    print(f"Sequential single-file: {sequential:,.1f} files/s")
+    print(f"Batch fan-out (concurrency={scan.BATCH_CONCURRENCY}): {batch:,.1f} files/s")
+    print(f"Speed-up: {batch / sequential:.1f}x")
+
+    await scanner.close()
+    await fake.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
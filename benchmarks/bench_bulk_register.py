@@ -0,0 +1,91 @@
+"""
+Provisioning time: one /users/register call per user vs /users/register/bulk.
+
+Runs the users router in-process against a stub repository that sleeps
+--latency seconds per DynamoDB call: an index query per lookup, a
+PutItem per create, and one per 25-item BatchWriteItem. Bulk username
+checks are one index query per name, 25 in flight at a time. bcrypt cost follows BCRYPT_ROUNDS, so set it low to
+keep the run short.
+
+    BCRYPT_ROUNDS=8 python -m benchmarks.bench_bulk_register --users 500 --latency 0.005
+"""
+import time
+import asyncio
+import argparse
+
+import httpx
+from fastapi import FastAPI
+
+from app.api import users
+from app.core.security import get_current_user, BCRYPT_ROUNDS, BCRYPT_WORKERS
+from app.core.user_repository import InMemoryUserRepository
+from app.models import User
+
+
+class SlowRepository(InMemoryUserRepository):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    async def _call(self, count: int = 1):
+        self.calls += count
+        await asyncio.sleep(self.latency * count)
+
+    async def get_by_username(self, username: str):
+        await self._call()
+        return await super().get_by_username(username)
+
+    async def create(self, item: dict):
+        await self._call()
+        await super().create(item)
+
+    async def existing_usernames(self, usernames: set[str]) -> set[str]:
+        self.calls += len(usernames)
+        await asyncio.sleep(self.latency * -(-len(usernames) // 25))
+        return await super().existing_usernames(usernames)
+
+    async def create_many(self, items: list[dict]):
+        await self._call(-(-len(items) // 25))
+        for item in items:
+            await super().create(item)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(users.router, prefix="/users")
+    app.dependency_overrides[get_current_user] = lambda: User(username="bench", roles=["admin"])
+    return app
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005, help="Simulated DynamoDB latency (s)")
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        users.user_repository = SlowRepository(args.latency)
+        start = time.perf_counter()
+        for i in range(args.users):
+            response = await client.post("/users/register", json={"username": f"single{i}", "password": "pw"})
+            assert response.status_code == 201, response.text
+        single = time.perf_counter() - start
+        single_calls = users.user_repository.calls
+
+        users.user_repository = SlowRepository(args.latency)
+        body = "username,password\n" + "".join(f"bulk{i},pw\n" for i in range(args.users))
+        start = time.perf_counter()
+        response = await client.post("/users/register/bulk", content=body, headers={"content-type": "text/csv"})
+        created = response.text.count('"created"')
+        bulk = time.perf_counter() - start
+        assert created == args.users, response.text[:500]
+
+    print(f"bcrypt rounds={BCRYPT_ROUNDS}, workers={BCRYPT_WORKERS}")
+    print(f"one call per user: {single:7.2f} s | {args.users / single:8.1f} users/s | {single_calls:5} DB calls")
+    print(f"bulk:              {bulk:7.2f} s | {args.users / bulk:8.1f} users/s | {users.user_repository.calls:5} DB calls")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
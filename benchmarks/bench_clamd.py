@@ -0,0 +1,90 @@
+"""
+Files/second: per-request `clamdscan` subprocess vs pooled async INSTREAM.
+
+Both paths talk to the same fake clamd, so the difference is the
+fork+exec+temp-file overhead and the blocked event loop.
+
+    python -m benchmarks.bench_clamd --files 500 --size 65536 --concurrency 10
+"""
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from app.core.clamd import ClamdClient
+from benchmarks.fake_clamd import FakeClamd
+
+
+def scan_with_subprocess(payload: bytes, config_file: str) -> bool:
+    # Mirrors the old scan_file_endpoint: temp file in /tmp + clamdscan per upload
+    file_location = os.path.join("/tmp", f"{uuid.uuid4().hex}_bench")
+    try:
+        with open(file_location, "wb") as f:
+            f.write(payload)
+        result = subprocess.run(
+            ["clamdscan", "--config-file", config_file, "--no-summary", file_location],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        return result.returncode == 1
+    finally:
+        os.remove(file_location)
+
+
+async def bench_subprocess(payloads: list[bytes], socket_path: str) -> float:
+    with tempfile.NamedTemporaryFile("w", suffix=".conf", delete=False) as conf:
+        conf.write(f"LocalSocket {socket_path}\n")
+    start = time.perf_counter()
+    for payload in payloads:
+        # The old endpoint ran this inline, so requests were effectively serialized
+        scan_with_subprocess(payload, conf.name)
+    elapsed = time.perf_counter() - start
+    os.remove(conf.name)
+    return len(payloads) / elapsed
+
+
+async def bench_instream(payloads: list[bytes], socket_path: str, concurrency: int) -> float:
+    client = ClamdClient(socket_path=socket_path, host=None, pool_size=concurrency)
+
+    async def chunks(payload: bytes):
+        yield payload
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client.instream(chunks(p)) for p in payloads))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return len(payloads) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.0, help="Simulated clamd scan time (s)")
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"fake-clamd-{os.getpid()}.sock")
+    fake = await FakeClamd(delay=args.delay).start_unix(socket_path)
+    payloads = [os.urandom(args.size) for _ in range(args.files)]
+
+    instream_rate = await bench_instream(payloads, socket_path, args.concurrency)
+    print(f"INSTREAM pool (concurrency={args.concurrency}): {instream_rate:,.1f} files/s")
+
+    if shutil.which("clamdscan"):
+        subprocess_rate = await bench_subprocess(payloads, socket_path)
+        print(f"clamdscan subprocess:              {subprocess_rate:,.1f} files/s")
+        print(f"Speed-up: {instream_rate / subprocess_rate:.1f}x")
+    else:
+        print("clamdscan not installed; skipping the subprocess baseline")
+
+    await fake.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
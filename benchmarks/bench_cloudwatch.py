@@ -0,0 +1,80 @@
+"""
+Per-record logging latency with a slow CloudWatch sink.
+
+A stubbed logs client sleeps for --sink-latency on every PutLogEvents call.
+The "inline" leg calls it once per record, like the old handler did on
+the request path. The "shipper" leg uses CloudWatchLoggingHandler, so
+logging.info() latency no longer depends on the sink.
+
+    python -m benchmarks.bench_cloudwatch --records 200 --sink-latency 0.02
+"""
+import time
+import logging
+import argparse
+import statistics
+
+from app.core.cloudwatch import CloudWatchLoggingHandler
+
+
+class StubLogsClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.events = 0
+
+    def put_log_events(self, **kwargs):
+        time.sleep(self.latency)
+        self.calls += 1
+        self.events += len(kwargs["logEvents"])
+        return {"nextSequenceToken": str(self.calls)}
+
+
+class InlineHandler(logging.Handler):
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def emit(self, record):
+        self.client.put_log_events(
+            logGroupName="bench",
+            logStreamName="bench",
+            logEvents=[{"timestamp": int(record.created * 1000), "message": self.format(record)}],
+        )
+
+
+def measure(handler: logging.Handler, records: int) -> list[float]:
+    logger = logging.getLogger(f"bench.{type(handler).__name__}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    samples = []
+    for i in range(records):
+        start = time.perf_counter()
+        logger.info(f"request {i} handled")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name: str, samples: list[float]):
+    p99 = statistics.quantiles(samples, n=100)[98]
+    print(f"{name:8} p50={statistics.median(samples) * 1e6:9.1f}us  p99={p99 * 1e6:9.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--sink-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    report("inline", measure(InlineHandler(StubLogsClient(args.sink_latency)), args.records))
+
+    client = StubLogsClient(args.sink_latency)
+    shipper = CloudWatchLoggingHandler(client, "bench", "bench", flush_interval=0.5)
+    shipper.start()
+    report("shipper", measure(shipper, args.records))
+    shipper.close()
+    print(f"shipper sent {client.events} events in {client.calls} PutLogEvents calls, stats={shipper.stats}")
+
+
+if __name__ == "__main__":
+    main()
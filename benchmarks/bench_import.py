@@ -0,0 +1,63 @@
+"""
+Cold start: time to import app.main and to serve the first request.
+
+Each run is a fresh interpreter with AWS pointed at an unroutable
+endpoint, so any network call made during import or startup shows up as
+a stall (or a crash). "import" is `import app.main`; "first request"
+adds the lifespan startup and one GET /healthcheck/.
+
+    python -m benchmarks.bench_import --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+CHILD = """
+import time, json, asyncio
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter() - start
+
+async def first_request():
+    import httpx
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            (await client.get("/healthcheck/")).raise_for_status()
+        return time.perf_counter() - start
+
+print(json.dumps({"import": imported, "first_request": asyncio.run(first_request())}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        AWS_REGION="us-east-1",
+        AWS_ACCESS_KEY_ID="bench",
+        AWS_SECRET_ACCESS_KEY="bench",
+        AWS_EC2_METADATA_DISABLED="true",
+        AWS_ENDPOINT_URL="http://127.0.0.1:9",  # Nothing listens here
+        DYNAMODB_USERS_TABLE=os.environ.get("DYNAMODB_USERS_TABLE", "users"),
+        CLOUDWATCH_MAX_RETRIES="0",
+    )
+    samples = {"import": [], "first_request": []}
+    for _ in range(args.runs):
+        output = subprocess.check_output([sys.executable, "-c", CHILD], env=env, text=True, stderr=subprocess.DEVNULL)
+        result = next(line for line in reversed(output.splitlines()) if line.startswith("{"))
+        for key, value in json.loads(result).items():
+            samples[key].append(value)
+
+    for key, values in samples.items():
+        print(f"{key:14} median {statistics.median(values) * 1000:8.1f}ms  max {max(values) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Requests/s on the hottest routes: the previous JSON handling vs the fast path.
+
+Drives /healthcheck/ and a /scan/ verdict-cache hit serially through raw
+ASGI calls, behind the same LoggingMiddleware, MetricsMiddleware and
+SlowAPIMiddleware stack as app.main, with log records going to a
+NullHandler. "stdlib" puts back trimmed copies of the previous code:
+a health route returning a dict (jsonable_encoder + json.dumps per
+call), and a logger that parses every JSON body with json, walks it for
+redaction and writes the line with json.dumps. "fast" is the current
+code, using orjson when it's installed.
+
+    python -m benchmarks.bench_json_responses --requests 5000
+"""
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+
+from fastapi import FastAPI
+from slowapi.middleware import SlowAPIMiddleware
+
+from app.api import scan, healthcheck
+from app.core import middleware, serialization
+from app.core.middleware import LoggingMiddleware, MetricsMiddleware, redact_sensitive
+from app.core.scan_cache import scan_cache
+from app.core.security import get_current_user
+from app.core.utils import limiter
+from app.models import User
+
+BOUNDARY = b"bench"
+
+
+def legacy_summarize_body(captured: bytes, total: int, content_type: str):
+    if not captured:
+        return None
+    if total > len(captured):
+        return {"truncated": True, "size": total, "prefix": captured.decode("utf-8", "replace")}
+    text = captured.decode("utf-8", "replace")
+    if "json" in content_type:
+        try:
+            return redact_sensitive(json.loads(text))
+        except ValueError:
+            pass
+    return text
+
+
+def legacy_dumps(content) -> bytes:
+    return json.dumps(content, separators=(",", ":"), default=str).encode()
+
+
+async def legacy_health_check():
+    return {"status": "ok"}
+
+
+def build_app(leg: str) -> FastAPI:
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(SlowAPIMiddleware)
+    if leg == "stdlib":
+        app.add_api_route("/healthcheck/", legacy_health_check)
+    app.include_router(healthcheck.router, prefix="/healthcheck")
+    app.include_router(scan.router, prefix="/scan")
+    app.dependency_overrides[get_current_user] = lambda: User(username="bench", roles=["user"])
+    return app
+
+
+def multipart(payload: bytes) -> bytes:
+    return (
+        b"--" + BOUNDARY + b'\r\nContent-Disposition: form-data; name="file"; filename="bench.txt"\r\n'
+        b"Content-Type: text/plain\r\n\r\n" + payload + b"\r\n--" + BOUNDARY + b"--\r\n"
+    )
+
+
+async def call(app, method: str, path: str, body: bytes = b"", content_type: bytes = b"") -> int:
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "scheme": "http",
+        "headers": [(b"host", b"bench"), (b"content-type", content_type), (b"content-length", str(len(body)).encode())],
+        "server": ("bench", 80), "client": ("127.0.0.1", 1234), "app": app, "state": {},
+    }
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def rate(app, requests: int, *request) -> float:
+    for _ in range(min(requests, 200)):
+        assert await call(app, *request) == 200
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, *request)
+    return requests / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=4 * 1024, help="Upload size for the cached scan")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+    limiter.enabled = False
+    payload = b"a" * args.size
+    await scan_cache.put(hashlib.sha256(payload).hexdigest(), False, None)
+    upload = ("POST", "/scan/", multipart(payload), b"multipart/form-data; boundary=" + BOUNDARY)
+
+    print(f"orjson: {serialization.orjson.__version__ if serialization.orjson else 'not installed'}")
+    current = (middleware.summarize_body, middleware.dumps)
+    for leg in ("stdlib", "fast"):
+        if leg == "stdlib":
+            middleware.summarize_body, middleware.dumps = legacy_summarize_body, legacy_dumps
+        else:
+            middleware.summarize_body, middleware.dumps = current
+        app = build_app(leg)
+        health = await rate(app, args.requests, "GET", "/healthcheck/")
+        cached = await rate(app, args.requests // 5, *upload)
+        print(f"{leg:7} /healthcheck/ {health:8.1f} req/s | /scan/ cached hit {cached:7.1f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
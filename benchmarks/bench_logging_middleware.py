@@ -0,0 +1,126 @@
+"""
+Peak RSS and latency of the logging middleware for large uploads.
+
+Each leg runs in a fresh subprocess so ru_maxrss reflects only that
+middleware. "buffering" is a trimmed copy of the previous
+BaseHTTPMiddleware implementation, which read the whole body into memory.
+"asgi" is app.core.middleware.LoggingMiddleware.
+
+    python -m benchmarks.bench_logging_middleware --size-mb 100 --requests 5
+"""
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+import statistics
+import subprocess
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from app.core.middleware import LoggingMiddleware, redact_sensitive
+
+CHUNK = 1024 * 1024
+
+
+class BufferingLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        body = await request.body()
+
+        async def receive():
+            return {"type": "http.request", "body": body}
+        request._receive = receive
+
+        response = await call_next(request)
+        response_body = b""
+        async for chunk in response.body_iterator:
+            response_body += chunk
+        final_response = Response(
+            content=response_body,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            media_type=response.media_type,
+        )
+        log_details = {
+            "body": body.decode("utf-8", "replace"),
+            "response_body": redact_sensitive(json.loads(response_body)),
+            "process_time": f"{(time.time() - start_time):.4f}s",
+        }
+        logging.info(json.dumps(log_details, indent=2))
+        return final_response
+
+
+async def upload(request: Request):
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+    return JSONResponse({"received": received})
+
+
+async def run_leg(name: str, size_mb: int, requests: int) -> dict:
+    app = Starlette(routes=[Route("/upload", upload, methods=["POST"])])
+    middleware = BufferingLoggingMiddleware if name == "buffering" else LoggingMiddleware
+    app.add_middleware(middleware)
+    asgi = app.build_middleware_stack()
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    latencies = []
+    for _ in range(requests):
+        remaining = size_mb
+        chunk = b"x" * CHUNK
+
+        async def receive():
+            nonlocal remaining
+            remaining -= 1
+            return {"type": "http.request", "body": chunk, "more_body": remaining > 0}
+
+        async def send(message):
+            pass
+
+        scope = {
+            "type": "http", "method": "POST", "path": "/upload", "query_string": b"",
+            "headers": [(b"content-type", b"application/octet-stream")], "root_path": "",
+        }
+        start = time.perf_counter()
+        await asgi(scope, receive, send)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "middleware": name,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": max(latencies) * 1000 if len(latencies) < 100 else statistics.quantiles(latencies, n=100)[98] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--leg", choices=["buffering", "asgi"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.leg:
+        print(json.dumps(asyncio.run(run_leg(args.leg, args.size_mb, args.requests))))
+        return
+
+    for leg in ("buffering", "asgi"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_logging_middleware", "--leg", leg,
+             "--size-mb", str(args.size_mb), "--requests", str(args.requests)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{leg:10} peak RSS {result['peak_rss_mb']:8.1f} MB   "
+              f"p50 {result['p50_ms']:8.1f} ms   p99 {result['p99_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Health-check latency during a burst of logins.
+
+Fires --logins concurrent bcrypt verifications while polling /healthcheck/.
+The "inline" leg verifies on the event loop, as login did before. The
+"executor" leg uses verify_password_async. Health-check latency stays
+flat only when bcrypt is off the loop.
+
+    python -m benchmarks.bench_login_burst --logins 200 --rounds 10
+"""
+import os
+import time
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("DYNAMODB_USERS_TABLE", "users")
+
+import httpx
+from fastapi import FastAPI
+from passlib.context import CryptContext
+
+from app.api import healthcheck
+from app.core import security
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    # Latency is measured from when the probe was due, so event-loop stalls count
+    samples = []
+    due = time.perf_counter()
+    while True:
+        await client.get("/healthcheck/")
+        samples.append(time.perf_counter() - due)
+        if stop.is_set():
+            return samples
+        due = time.perf_counter() + 0.005
+        await asyncio.sleep(0.005)
+
+
+async def run_leg(name: str, logins: int, hashed: str) -> tuple[list[float], float]:
+    app = FastAPI()
+    app.include_router(healthcheck.router, prefix="/healthcheck")
+
+    async def login():
+        if name == "inline":
+            return security.verify_password("secret", hashed)
+        return await security.verify_password_async("secret", hashed)
+
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        prober = asyncio.create_task(probe(client, stop))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        return await prober, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    security.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds)
+    hashed = security.pwd_context.hash("secret")
+
+    for leg in ("inline", "executor"):
+        samples, elapsed = await run_leg(leg, args.logins, hashed)
+        p99 = max(samples) if len(samples) < 100 else statistics.quantiles(samples, n=100)[98]
+        print(f"{leg:9} {args.logins} logins in {elapsed:6.2f}s | healthcheck n={len(samples):5} "
+              f"p50={statistics.median(samples) * 1000:8.2f}ms p99={p99 * 1000:8.2f}ms")
+    print(f"executor stats: {security.password_stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
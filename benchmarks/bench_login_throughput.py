@@ -0,0 +1,67 @@
+"""
+Login data-access throughput: blocking boto3 calls vs UserRepository.
+
+A stub table sleeps --latency seconds per call to stand in for the
+DynamoDB round trip. Each simulated login does a username lookup plus a
+token-metadata update (bcrypt is left out). "blocking" makes those calls
+inline from the coroutine, as the endpoints used to. "repository" awaits
+UserRepository, which runs them on its connection-sized thread pool.
+
+    python -m benchmarks.bench_login_throughput --logins 500 --latency 0.01
+"""
+import time
+import asyncio
+import argparse
+
+from app.core.user_repository import UserRepository, token_metadata_updates
+
+
+class StubTable:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.user = {"id": "1", "username": "alice", "password": "x", "roles": ["user"], "token_failed": 0}
+
+    def query(self, **kwargs):
+        time.sleep(self.latency)
+        return {"Items": [dict(self.user)]}
+
+    def update_item(self, **kwargs):
+        time.sleep(self.latency)
+        return {}
+
+
+async def blocking_login(table: StubTable):
+    user = table.query()["Items"][0]
+    updates = token_metadata_updates(user, success=True)
+    table.update_item(Key={"id": user["id"]}, Updates=updates)
+
+
+async def repository_login(repository: UserRepository):
+    user = await repository.get_by_username("alice")
+    await repository.update_token_metadata("alice", success=True, user=user)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--pool", type=int, default=50)
+    args = parser.parse_args()
+
+    table = StubTable(args.latency)
+    start = time.perf_counter()
+    await asyncio.gather(*(blocking_login(table) for _ in range(args.logins)))
+    blocking = args.logins / (time.perf_counter() - start)
+
+    repository = UserRepository(max_pool_connections=args.pool)
+    repository.table = table
+    start = time.perf_counter()
+    await asyncio.gather(*(repository_login(repository) for _ in range(args.logins)))
+    pooled = args.logins / (time.perf_counter() - start)
+
+    print(f"blocking boto3:          {blocking:8.1f} logins/s")
+    print(f"UserRepository (pool={args.pool}): {pooled:8.1f} logins/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
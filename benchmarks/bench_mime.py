@@ -0,0 +1,66 @@
+"""
+MIME detections per second: a fresh libmagic handle per request vs MimeDetector.
+
+"per-request file" is the original code path: magic.Magic(mime=True) then
+from_file on the saved upload. "per-request buffer" keeps the fresh handle
+but classifies the first 2 KB. "pooled" reuses one handle per thread and
+classifies the header bytes. Each leg runs --threads worker threads.
+
+    python -m benchmarks.bench_mime --detections 2000 --threads 4
+"""
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import magic
+
+from app.core.mime import MimeDetector, SNIFF_BYTES
+
+SAMPLES = [
+    b"%PDF-1.7\n" + b"0" * 4096,
+    b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096,
+    b"PK\x03\x04" + b"\x00" * 4096,
+    b"MZ\x90\x00" + b"\x00" * 4096,
+    b"hello world, plain text\n" * 200,
+]
+
+
+def run(label: str, detections: int, threads: int, detect):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(detect, range(detections)))
+    rate = detections / (time.perf_counter() - start)
+    print(f"{label:20} {rate:10.0f} detections/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detections", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    paths = []
+    for sample in SAMPLES:
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(sample)
+            paths.append(f.name)
+
+    detector = MimeDetector()
+    try:
+        baseline = run("per-request file", args.detections, args.threads,
+                       lambda i: magic.Magic(mime=True).from_file(paths[i % len(paths)]))
+        run("per-request buffer", args.detections, args.threads,
+            lambda i: magic.Magic(mime=True).from_buffer(SAMPLES[i % len(SAMPLES)][:SNIFF_BYTES]))
+        pooled = run("pooled", args.detections, args.threads,
+                     lambda i: detector.detect(SAMPLES[i % len(SAMPLES)]))
+        print(f"speedup vs per-request file: {pooled / baseline:.1f}x")
+    finally:
+        for path in paths:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
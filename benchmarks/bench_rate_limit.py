@@ -0,0 +1,59 @@
+"""
+Per-check latency of the rate limiter for each strategy.
+
+Runs --checks limit checks spread over --keys users against the storage
+the API would use. Without --storage-uri the Redis leg uses fakeredis
+(pip install fakeredis lupa), which measures the client and script
+overhead but not the network hop; point it at a real Redis to see that.
+
+    python -m benchmarks.bench_rate_limit --storage-uri redis://localhost:6379/0
+"""
+import time
+import argparse
+import statistics
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+from app.core.utils import storage_options
+
+
+def make_storage(uri: str):
+    if uri != "fakeredis://":
+        return storage_from_string(uri, **storage_options(uri))
+    import redis
+    import fakeredis
+
+    pool = redis.ConnectionPool(connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer())
+    return storage_from_string("redis://localhost", connection_pool=pool)
+
+
+def run(storage, strategy: str, checks: int, keys: int) -> list[float]:
+    limiter = STRATEGIES[strategy](storage)
+    limit = parse("1000/minute")
+    samples = []
+    for i in range(checks):
+        start = time.perf_counter()
+        limiter.hit(limit, strategy, f"user:{i % keys}")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storage-uri", default="fakeredis://")
+    parser.add_argument("--checks", type=int, default=5000)
+    parser.add_argument("--keys", type=int, default=100)
+    args = parser.parse_args()
+
+    for uri in ("memory://", args.storage_uri):
+        storage = make_storage(uri)
+        for strategy in STRATEGIES:
+            samples = run(storage, strategy, args.checks, args.keys)
+            p99 = statistics.quantiles(samples, n=100)[98]
+            print(f"{uri:24} {strategy:24} p50={statistics.median(samples) * 1000:7.3f}ms p99={p99 * 1000:7.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
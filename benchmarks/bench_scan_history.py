@@ -0,0 +1,85 @@
+"""
+Scan history store: batched write throughput and indexed query latency.
+
+Fills a fresh SQLite history file with --records records spread over
+--users users through ScanHistory (the same batching the API uses), then
+times first and deep pages for each query shape. Deep pages follow the
+keyset cursor, so they should cost about the same as the first.
+
+    python -m benchmarks.bench_scan_history --records 200000 --users 500
+"""
+import os
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+from app.core.scan_history import ScanHistory, SQLiteScanHistoryBackend, HistoryQuery
+from app.models import ScanRecord
+
+
+def make_record(rng: random.Random, users: int, start: datetime, i: int) -> ScanRecord:
+    return ScanRecord(
+        id=uuid.uuid4().hex,
+        scanned_at=(start + timedelta(seconds=i)).isoformat(timespec="microseconds"),
+        username=f"user-{rng.randrange(users)}",
+        filename=f"file-{i}.bin",
+        sha256=f"{rng.randrange(users * 10):064x}",
+        size=rng.randrange(1, 10**7),
+        mime_type="application/octet-stream",
+        is_infected=rng.random() < 0.01,
+        duration_ms=rng.randrange(1, 500),
+        signature_version="1.0.0/27000",
+    )
+
+
+async def time_pages(history: ScanHistory, query: HistoryQuery, pages: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(pages):
+        start = time.perf_counter()
+        _, query.cursor = await history.query(query)
+        samples.append(time.perf_counter() - start)
+        if query.cursor is None:
+            break
+    return samples[0] * 1000, statistics.mean(samples[1:] or samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    start_time = datetime(2026, 1, 1)
+    with tempfile.TemporaryDirectory(prefix="filescan-bench-") as workdir:
+        history = ScanHistory(SQLiteScanHistoryBackend(os.path.join(workdir, "history.db")), max_queued=args.records)
+        records = [make_record(rng, args.users, start_time, i) for i in range(args.records)]
+        start = time.perf_counter()
+        for record in records:
+            history.record(record)
+        record_cost = (time.perf_counter() - start) / args.records
+        await history._queue.join()
+        elapsed = time.perf_counter() - start
+        print(f"write   {args.records / elapsed:10,.0f} records/s | record() {record_cost * 1e6:.2f}µs each")
+
+        middle = (start_time + timedelta(seconds=args.records // 2)).isoformat()
+        shapes = {
+            "user": HistoryQuery(username="user-7"),
+            "sha256": HistoryQuery(sha256=f"{7:064x}"),
+            "range": HistoryQuery(since=middle, until=(start_time + timedelta(seconds=args.records)).isoformat()),
+            "user+range": HistoryQuery(username="user-7", since=middle),
+        }
+        for name, query in shapes.items():
+            first, deep = await time_pages(history, query, args.pages)
+            print(f"{name:10} first page {first:7.3f}ms | next pages {deep:7.3f}ms")
+        await history.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
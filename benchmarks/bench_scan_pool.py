@@ -0,0 +1,107 @@
+"""
+Files/second and event-loop lag: in-loop scanning vs the ScanPool.
+
+"inline" is the path scan_file takes with SCAN_POOL_WORKERS=0: hash in a
+thread, then stream the file to clamd from the event loop. "pool" hands
+the path to ScanPool workers for both. A ticker coroutine measures how
+late the loop wakes up while --concurrency scans run, which is what
+every other request on the server would feel. The fake clamd runs on its
+own thread so it doesn't share the loop being measured.
+
+    python -m benchmarks.bench_scan_pool --files 200 --size 4194304 --concurrency 16
+"""
+import os
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+
+from app.core.clamd import ClamdClient
+from app.core.scan_pool import ScanPool
+from benchmarks.fake_clamd import FakeClamd
+
+CHUNK = 64 * 1024
+
+
+def start_fake_clamd(socket_path: str):
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="fake-clamd", daemon=True).start()
+    asyncio.run_coroutine_threadsafe(FakeClamd().start_unix(socket_path), loop).result()
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def file_chunks(path: str):
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK):
+            yield chunk
+
+
+async def ticker(stop: asyncio.Event, lags: list[float], interval: float = 0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(mode: str, paths: list[str], socket_path: str, concurrency: int, workers: int) -> tuple[float, float, float]:
+    client = ClamdClient(socket_path=socket_path, host=None)
+    pool = ScanPool(workers=workers, large_workers=max(1, workers // 2))
+    if mode == "pool":
+        await pool.start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scan(path: str):
+        async with semaphore:
+            if mode == "pool":
+                await pool.hash(path)
+                await pool.scan(path, socket_path, None, 0)
+            else:
+                await asyncio.to_thread(sha256_file, path)
+                await client.instream(file_chunks(path))
+
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(scan(path) for path in paths))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    await client.close()
+    await pool.close()
+    lags.sort()
+    return len(paths) / elapsed, lags[len(lags) // 2] * 1000, lags[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="filescan-bench-") as workdir:
+        socket_path = os.path.join(workdir, "clamd.sock")
+        start_fake_clamd(socket_path)
+        paths = []
+        for i in range(args.files):
+            paths.append(os.path.join(workdir, f"{i}.bin"))
+            with open(paths[-1], "wb") as f:
+                f.write(os.urandom(args.size))
+
+        for mode in ("inline", "pool"):
+            rate, lag_p50, lag_max = asyncio.run(run(mode, paths, socket_path, args.concurrency, args.workers))
+            print(f"{mode:7} {rate:8.1f} files/s | loop lag p50 {lag_p50:7.2f}ms max {lag_max:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
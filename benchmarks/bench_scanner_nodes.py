@@ -0,0 +1,105 @@
+"""
+Scan throughput and tail latency over several clamd nodes.
+
+Starts fake clamd servers that each run --threads scans at a time, like
+clamd's MaxThreads, and pushes --scans scans through ScannerMonitor.run
+at --concurrency. Compares one node, --nodes nodes, and --nodes nodes
+where one of them is --slow times slower, with and without hedging.
+Payloads repeat from a pool of --distinct files. The "affinity" column
+is the share of repeats that landed on the node that scanned the file
+first, which is what keeps a clamd's own clean-file cache warm.
+
+    python -m benchmarks.bench_scanner_nodes --nodes 3 --scans 600 --concurrency 24
+"""
+import os
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+
+from app.core.clamd import ClamdClient
+from app.core.scanner_health import ScannerMonitor
+from benchmarks.fake_clamd import FakeClamd
+
+
+async def chunks(data: bytes):
+    yield data
+
+
+async def run(label: str, delays: list[float], args, workdir: str, hedge_after: float):
+    servers, clients = [], []
+    for i, delay in enumerate(delays):
+        path = os.path.join(workdir, f"clamd-{i}.sock")
+        servers.append(await FakeClamd(delay=delay, max_threads=args.threads).start_unix(path))
+        clients.append(ClamdClient(socket_path=path, host=None, pool_size=args.concurrency))
+    monitor = ScannerMonitor(clients, hedge_after=hedge_after, hedge_budget=args.hedge_budget)
+    await monitor.start()
+
+    payloads = [os.urandom(args.size) for _ in range(args.distinct)]
+    keys = [hashlib.sha256(data).hexdigest() for data in payloads]
+    first_node: dict[str, str] = {}
+    repeats = same_node = 0
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        nonlocal repeats, same_node
+        data, key = payloads[i % args.distinct], keys[i % args.distinct]
+        used = []
+
+        async def scan(client: ClamdClient):
+            used.append(client.target)
+            return await client.instream(chunks(data))
+
+        async with semaphore:
+            started = time.perf_counter()
+            await monitor.run(scan, key, hedge=hedge_after > 0)
+            latencies.append(time.perf_counter() - started)
+        if key in first_node:
+            repeats += 1
+            same_node += used[0] == first_node[key]
+        else:
+            first_node[key] = used[0]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.scans)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+    print(
+        f"{label:24} {args.scans / elapsed:8.1f} scans/s | p50 {p50 * 1000:7.1f} ms | p99 {p99 * 1000:7.1f} ms | "
+        f"affinity {same_node / max(repeats, 1):5.0%} | hedges {monitor.stats['hedges']:4} "
+        f"(won {monitor.stats['hedge_wins']})"
+    )
+
+    await monitor.stop()
+    await monitor.close()
+    for server in servers:
+        await server.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--scans", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=24)
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent scans per fake clamd")
+    parser.add_argument("--delay", type=float, default=0.02, help="Simulated clamd scan time (s)")
+    parser.add_argument("--slow", type=float, default=20.0, help="How much slower the slow node is")
+    parser.add_argument("--hedge-after", type=float, default=0.1)
+    parser.add_argument("--hedge-budget", type=float, default=0.1)
+    parser.add_argument("--size", type=int, default=16 * 1024)
+    parser.add_argument("--distinct", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        await run("1 node", [args.delay], args, workdir, 0)
+        await run(f"{args.nodes} nodes", [args.delay] * args.nodes, args, workdir, 0)
+        slow = [args.delay * args.slow] + [args.delay] * (args.nodes - 1)
+        await run(f"{args.nodes} nodes, 1 slow", slow, args, workdir, 0)
+        await run(f"{args.nodes} nodes, 1 slow, hedged", slow, args, workdir, args.hedge_after)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Failed scans while clamd restarts (e.g. a signature reload): direct vs monitored.
+
+A fake clamd is stopped after --outage-after seconds and started again
+--outage seconds later while --concurrency scans keep arriving. "direct"
+streams each upload to the shared ClamdClient the way scan_file did
+before the monitor; "monitored" goes through scan_on_available_scanner,
+which queues while no scanner answers and retries dropped connections.
+Reports scans completed, failed, and the slowest scan.
+
+    python -m benchmarks.bench_scanner_reload --duration 6 --outage-after 2 --outage 1.5
+"""
+import io
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+from starlette.datastructures import UploadFile
+
+from app.api import scan
+from app.core.clamd import ClamdClient
+from app.core.scanner_health import ScannerMonitor
+from benchmarks.fake_clamd import FakeClamd
+
+
+async def outage(socket_path: str, server: FakeClamd, after: float, length: float) -> FakeClamd:
+    await asyncio.sleep(after)
+    await server.close()
+    os.unlink(socket_path)
+    await asyncio.sleep(length)
+    return await FakeClamd(version="ClamAV 1.0.0/27001/Fri Jan  2 00:00:00 2026").start_unix(socket_path)
+
+
+async def run(mode: str, args, socket_path: str) -> tuple[int, int, float]:
+    server = await FakeClamd(delay=args.delay).start_unix(socket_path)
+    client = ClamdClient(socket_path=socket_path)
+    scan.scanner_monitor = ScannerMonitor([client], interval=1.0)
+    restart = asyncio.create_task(outage(socket_path, server, args.outage_after, args.outage))
+    done = failed = 0
+    slowest = 0.0
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        nonlocal done, failed, slowest
+        while time.perf_counter() < deadline:
+            upload = UploadFile(io.BytesIO(os.urandom(args.size)), filename="f.bin")
+            started = time.perf_counter()
+            try:
+                if mode == "monitored":
+                    await scan.scan_on_available_scanner(upload, None)
+                else:
+                    await client.instream(scan.iter_upload(upload))
+                done += 1
+            except Exception:
+                failed += 1
+                await asyncio.sleep(0.01)
+            slowest = max(slowest, time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    server = await restart
+    await scan.scanner_monitor.stop()
+    await client.close()
+    await server.close()
+    os.unlink(socket_path)
+    return done, failed, slowest
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=6.0)
+    parser.add_argument("--outage-after", type=float, default=2.0)
+    parser.add_argument("--outage", type=float, default=1.5, help="Seconds clamd is down")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--delay", type=float, default=0.005, help="Simulated clamd scan time (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        socket_path = os.path.join(workdir, "clamd.sock")
+        for mode in ("direct", "monitored"):
+            done, failed, slowest = await run(mode, args, socket_path)
+            print(f"{mode:10} {done:6} scanned | {failed:6} failed | slowest {slowest * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
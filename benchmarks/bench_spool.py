@@ -0,0 +1,93 @@
+"""
+Receiving one multipart upload: Starlette form parsing vs receive_upload.
+
+Each run happens in a fresh subprocess that feeds a synthetic multipart
+body in 64 KB chunks and reports wall time and ru_maxrss. "form" is the
+old path: request.form(), a 2 KB MIME read, then a second pass to hash
+the spool. "spool" streams the part into a SpooledUpload, hashing on the
+way. Peak RSS should stay flat for both; the spool leg skips the re-read.
+
+    python -m benchmarks.bench_spool --sizes 1 64 512
+"""
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+
+CHUNK = 64 * 1024
+BOUNDARY = b"benchboundary"
+
+
+def body_chunks(size: int):
+    yield (b"--" + BOUNDARY + b"\r\n"
+           b'Content-Disposition: form-data; name="file"; filename="bench.bin"\r\n'
+           b"Content-Type: application/octet-stream\r\n\r\n")
+    block = b"\xab" * CHUNK
+    sent = 0
+    while sent < size:
+        yield block[:min(CHUNK, size - sent)]
+        sent += CHUNK
+    yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+
+def make_request(size: int):
+    from starlette.requests import Request
+
+    chunks = body_chunks(size)
+
+    async def receive():
+        chunk = next(chunks, None)
+        return {"type": "http.request", "body": chunk or b"", "more_body": chunk is not None}
+
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+async def run_one(mode: str, size: int):
+    import magic
+    from app.core.spool import receive_upload
+    from app.api.scan import sha256_of
+
+    request = make_request(size)
+    if mode == "form":
+        form = await request.form(max_part_size=size + 1)
+        magic.Magic(mime=True).from_buffer(await form["file"].read(2048))
+        sha256_of(form["file"].file)
+        await form.close()
+    else:
+        upload = await receive_upload(request, max_size=size + 1)
+        upload.close()
+
+
+def measure(mode: str, size_mb: int) -> tuple[float, float]:
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.bench_spool", "--child", mode, str(size_mb)], text=True
+    )
+    elapsed, peak = output.split()
+    return float(elapsed), float(peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 64, 512], help="upload sizes in MB")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, size_mb = args.child[0], int(args.child[1])
+        import app.api.scan  # noqa: F401 - keep import time out of the measurement
+        start = time.perf_counter()
+        asyncio.run(run_one(mode, size_mb * 1024 * 1024))
+        print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        return
+
+    for size_mb in args.sizes:
+        for mode in ("form", "spool"):
+            elapsed, peak = measure(mode, size_mb)
+            print(f"{size_mb:6} MB {mode:5} | {elapsed * 1000:9.1f} ms | peak RSS {peak:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
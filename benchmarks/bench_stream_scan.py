@@ -0,0 +1,116 @@
+"""
+Time to verdict and bytes received: multipart upload vs streamed octet-stream.
+
+Posts --size byte bodies to /scan/ through the ASGI app, paced at
+--bandwidth MB/s to stand in for the client's link. "multipart" is the
+spool-then-scan path; "stream" sends the same bytes as
+application/octet-stream, scanned while they arrive. Infected samples
+carry the EICAR string at --offset; clean ones have none. Reports the
+mean time to verdict and how much of each body the server read.
+
+    python -m benchmarks.bench_stream_scan --size 33554432 --offset 2097152 --bandwidth 100
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+import httpx
+from fastapi import FastAPI
+
+from app.api import scan
+from app.core.clamd import scanner
+from app.core.security import get_current_user
+from app.core.utils import limiter
+from app.models import User
+from benchmarks.fake_clamd import FakeClamd, EICAR
+
+BOUNDARY = "bench-boundary"
+CHUNK = 64 * 1024
+
+
+def build_app() -> FastAPI:
+    limiter.enabled = False
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(scan.router, prefix="/scan")
+    app.dependency_overrides[get_current_user] = lambda: User(username="bench", roles=["user"])
+    return app
+
+
+class PacedBody:
+    """
+    Yields a random body in CHUNK pieces at a fixed rate and counts what the server pulled.
+    """
+
+    def __init__(self, size: int, offset: int | None, bandwidth: float, multipart: bool):
+        self.size = size
+        self.offset = offset
+        self.delay = CHUNK / (bandwidth * 1024 * 1024)
+        self.multipart = multipart
+        self.sent = 0
+
+    async def __aiter__(self):
+        if self.multipart:
+            yield (
+                f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="sample.bin"\r\n'
+                f"Content-Type: application/octet-stream\r\n\r\n"
+            ).encode()
+        for start in range(0, self.size, CHUNK):
+            chunk = bytearray(os.urandom(min(CHUNK, self.size - start)))
+            if self.offset is not None and start <= self.offset < start + len(chunk):
+                at = min(self.offset - start, len(chunk) - len(EICAR))
+                chunk[at:at + len(EICAR)] = EICAR
+            await asyncio.sleep(self.delay)
+            self.sent += len(chunk)
+            yield bytes(chunk)
+        if self.multipart:
+            yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def run(client: httpx.AsyncClient, mode: str, args, infected: bool) -> tuple[float, float]:
+    elapsed = received = 0.0
+    for _ in range(args.repeat):
+        body = PacedBody(args.size, args.offset if infected else None, args.bandwidth, mode == "multipart")
+        if mode == "multipart":
+            headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+        else:
+            headers = {"content-type": "application/octet-stream"}
+        start = time.perf_counter()
+        response = await client.post("/scan/", params={"filename": "sample.bin"}, content=body, headers=headers)
+        elapsed += time.perf_counter() - start
+        received += body.sent
+        assert response.json()["is_infected"] == infected, response.text
+    return elapsed / args.repeat, received / args.repeat
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=32 * 1024 * 1024)
+    parser.add_argument("--offset", type=int, default=2 * 1024 * 1024, help="Where the EICAR string sits")
+    parser.add_argument("--bandwidth", type=float, default=100.0, help="Client upload rate (MB/s)")
+    parser.add_argument("--delay", type=float, default=0.02, help="Simulated clamd scan time (s)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.gettempdir(), f"fake-clamd-{os.getpid()}.sock")
+    fake = await FakeClamd(delay=args.delay).start_unix(socket_path)
+    scanner.socket_path, scanner.host = socket_path, None
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for infected in (False, True):
+            for mode in ("multipart", "stream"):
+                seconds, received = await run(client, mode, args, infected)
+                label = "infected" if infected else "clean"
+                print(
+                    f"{label:8} {mode:9} {seconds * 1000:8.0f} ms to verdict | "
+                    f"{received / 1024 / 1024:7.1f} MB of {args.size / 1024 / 1024:.1f} MB received"
+                )
+
+    await scanner.close()
+    await fake.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
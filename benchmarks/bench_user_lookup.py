@@ -0,0 +1,110 @@
+"""
+Username lookup cost as the users table grows.
+
+Compares the GSI query used by UserRepository.get_by_username with the previous
+FilterExpression scan. The scan is paginated so it actually finds users
+past the first 1 MB page. Items read per lookup (ScannedCount) is the
+metric that maps to DynamoDB latency and RCUs. moto emulates GSI queries
+with a linear search, so use --endpoint-url with dynamodb-local to see
+real wall-clock behaviour.
+
+    python -m benchmarks.bench_user_lookup --sizes 1000,10000,100000
+    python -m benchmarks.bench_user_lookup --endpoint-url http://localhost:8000
+"""
+import os
+import time
+import uuid
+import random
+import argparse
+import contextlib
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from app.core.user_repository import USERNAME_INDEX
+
+
+def query_lookup(table, username: str) -> int:
+    page = table.query(IndexName=USERNAME_INDEX, KeyConditionExpression=Key("username").eq(username), Limit=1)
+    assert page["Items"]
+    return page["ScannedCount"]
+
+
+def scan_lookup(table, username: str) -> int:
+    kwargs = {"FilterExpression": "username = :u", "ExpressionAttributeValues": {":u": username}}
+    scanned = 0
+    while True:
+        page = table.scan(**kwargs)
+        scanned += page["ScannedCount"]
+        if page.get("Items"):
+            return scanned
+        assert "LastEvaluatedKey" in page
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def measure(lookup, table, names: list[str]) -> tuple[float, float]:
+    scanned = 0
+    start = time.perf_counter()
+    for name in names:
+        scanned += lookup(table, name)
+    return (time.perf_counter() - start) / len(names) * 1000, scanned / len(names)
+
+
+def create_table(dynamodb, name: str):
+    return dynamodb.create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "username", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": USERNAME_INDEX,
+            "KeySchema": [{"AttributeName": "username", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--scan-lookups", type=int, default=3)
+    parser.add_argument("--endpoint-url", help="dynamodb-local endpoint; moto is used when omitted")
+    args = parser.parse_args()
+
+    if args.endpoint_url:
+        backend = contextlib.nullcontext()
+    else:
+        from moto import mock_aws
+        backend = mock_aws()
+
+    with backend:
+        dynamodb = boto3.resource("dynamodb", endpoint_url=args.endpoint_url)
+        table = create_table(dynamodb, f"bench-users-{uuid.uuid4().hex[:8]}")
+
+        usernames: list[str] = []
+        for size in map(int, args.sizes.split(",")):
+            with table.batch_writer() as batch:
+                while len(usernames) < size:
+                    name = f"user{len(usernames)}"
+                    usernames.append(name)
+                    batch.put_item(Item={"id": str(uuid.uuid4()), "username": name, "password": "x", "roles": ["user"]})
+
+            query_ms, query_items = measure(query_lookup, table, random.sample(usernames, args.lookups))
+            scan_ms, scan_items = measure(scan_lookup, table, random.sample(usernames, args.scan_lookups))
+            print(f"{size:>8} users | GSI query {query_ms:8.2f} ms, {query_items:8.0f} items read "
+                  f"| table scan {scan_ms:10.2f} ms, {scan_items:8.0f} items read")
+
+        if args.endpoint_url:
+            table.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Minimal in-process clamd stand-in for tests and benchmarks.
+
+Speaks the subset of the clamd protocol the API uses: PING, VERSION,
+INSTREAM, SCAN/CONTSCAN (path based, used by clamdscan) and IDSESSION/END.
+Anything containing the EICAR test string is reported as infected.
+
+    python -m benchmarks.fake_clamd --socket /tmp/fake-clamd.sock
+"""
+import os
+import struct
+import asyncio
+import argparse
+from typing import Optional
+
+EICAR = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+VIRUS_NAME = "Eicar-Test-Signature"
+
+
+class FakeClamd:
+    def __init__(
+        self, version: str = "ClamAV 1.0.0/27000/Thu Jan  1 00:00:00 2026", delay: float = 0.0,
+        max_threads: Optional[int] = None,
+    ):
+        self.version = version
+        self.delay = delay  # Simulated scan time per command
+        # Like clamd's MaxThreads: scans beyond this many queue
+        self._threads = asyncio.Semaphore(max_threads) if max_threads else None
+        self.commands = 0
+        self._handlers: set[asyncio.Task] = set()
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start_unix(self, path: str) -> "FakeClamd":
+        if os.path.exists(path):
+            os.remove(path)
+        self.server = await asyncio.start_unix_server(self._handle, path)
+        return self
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> "FakeClamd":
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        # Give clients a moment to send END before tearing sessions down
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=1)
+        for task in self._handlers:
+            task.cancel()
+        await self.server.wait_closed()
+
+    def _verdict(self, data: bytes, name: str = "stream") -> str:
+        return f"{name}: {VIRUS_NAME} FOUND" if EICAR in data else f"{name}: OK"
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> str:
+        prefix = await reader.readexactly(1)
+        terminator = b"\0" if prefix == b"z" else b"\n"
+        return (await reader.readuntil(terminator))[:-1].decode()
+
+    async def _instream(self, reader: asyncio.StreamReader) -> bytes:
+        data = bytearray()
+        while True:
+            (size,) = struct.unpack("!L", await reader.readexactly(4))
+            if size == 0:
+                return bytes(data)
+            data += await reader.readexactly(size)
+
+    async def _scan_time(self):
+        if self._threads is None:
+            await asyncio.sleep(self.delay)
+            return
+        async with self._threads:
+            await asyncio.sleep(self.delay)
+
+    async def _reply(self, command: str, reader: asyncio.StreamReader) -> str:
+        self.commands += 1
+        if command == "PING":
+            return "PONG"
+        if command == "VERSION":
+            return self.version
+        if command == "INSTREAM":
+            data = await self._instream(reader)
+            await self._scan_time()
+            return self._verdict(data)
+        if command.startswith(("SCAN ", "CONTSCAN ", "MULTISCAN ")):
+            path = command.split(" ", 1)[1]
+            with open(path, "rb") as f:
+                data = f.read()
+            await self._scan_time()
+            return self._verdict(data, path)
+        return "UNKNOWN COMMAND"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = False
+        request_id = 0
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command == "IDSESSION":
+                    session = True
+                    continue
+                if command == "END":
+                    break
+                reply = await self._reply(command, reader)
+                if session:
+                    request_id += 1
+                    reply = f"{request_id}: {reply}"
+                writer.write(reply.encode() + b"\0")
+                await writer.drain()
+                if not session:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Cancelled by close() while a scan was still queued for a thread
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Run a fake clamd server")
+    parser.add_argument("--socket", default="/tmp/fake-clamd.sock")
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = await FakeClamd(delay=args.delay).start_unix(args.socket)
+    print(f"Fake clamd listening on {args.socket}")
+    await fake.server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,258 @@
+"""
+Load test for the full FastAPI app with a JSON baseline.
+
+Each scenario runs in a fresh subprocess that imports app.main with
+CloudWatch and DynamoDB stubbed out, points the scanner at a fake clamd
+on its own thread, and drives the app in-process over httpx's ASGI
+transport with --concurrency workers for --duration seconds. Rate
+limiting is disabled so the limiter doesn't cap the numbers.
+
+Reports throughput, p50/p95/p99 latency, error count and peak RSS per
+scenario. RSS includes the in-process client, which holds each request
+body in memory, so scan_large reads high. --save-baseline writes the
+results; --compare fails (exit 1) when throughput drops or p99 grows by
+more than --tolerance. Baselines are machine specific: regenerate one on
+the machine you compare on.
+
+    python -m benchmarks.load
+    python -m benchmarks.load --scenarios scan_small batch --duration 5
+    python -m benchmarks.load --compare benchmarks/baseline.json
+    python -m benchmarks.load --save-baseline benchmarks/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import statistics
+import subprocess
+from types import SimpleNamespace
+
+USERNAME, PASSWORD = "bench", "bench-password"
+SMALL_FILE = 4 * 1024
+LARGE_FILE = 8 * 1024 * 1024
+BATCH_FILES = 10
+
+# name -> [(weight, request kind)]
+SCENARIOS = {
+    "healthcheck": [(1, "healthcheck")],
+    "login": [(1, "login")],
+    "scan_small": [(1, "scan_small")],
+    "scan_large": [(1, "scan_large")],
+    "batch": [(1, "batch")],
+    "mixed": [(4, "healthcheck"), (1, "login"), (4, "scan_small"), (1, "scan_large"), (1, "batch")],
+}
+
+
+class StubLogsClient:
+    """Accepts CloudWatch Logs calls without leaving the process."""
+
+    exceptions = SimpleNamespace(ResourceAlreadyExistsException=type("ResourceAlreadyExistsException", (Exception,), {}))
+
+    def create_log_group(self, **kwargs):
+        return {}
+
+    def create_log_stream(self, **kwargs):
+        return {}
+
+    def put_log_events(self, **kwargs):
+        return {"nextSequenceToken": "0"}
+
+
+def start_fake_clamd(socket_path: str):
+    from benchmarks.fake_clamd import FakeClamd
+
+    # Own thread and loop, so the fake server doesn't compete with the app's event loop
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="fake-clamd", daemon=True).start()
+    asyncio.run_coroutine_threadsafe(FakeClamd().start_unix(socket_path), loop).result()
+
+
+def load_app(workdir: str, verbose_logging: bool):
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ.setdefault("DYNAMODB_USERS_TABLE", "users")
+    os.environ["CLAMD_SOCKET"] = os.path.join(workdir, "clamd.sock")
+    os.environ["SPOOL_DIR"] = workdir
+    os.environ["JOB_SPOOL_DIR"] = workdir
+    os.environ["SCAN_HISTORY_PATH"] = os.path.join(workdir, "scan_history.db")
+    start_fake_clamd(os.environ["CLAMD_SOCKET"])
+
+    from app.main import app, cloudwatch_handler
+
+    # Set before the lifespan starts the shipper, so it never creates a real client
+    cloudwatch_handler.client = StubLogsClient()
+
+    from app.api import auth, users
+    from app.core import security
+    from app.core.utils import limiter
+    from app.core.user_repository import InMemoryUserRepository
+    from app.core.token_metadata import token_metadata
+
+    repository = InMemoryUserRepository([{
+        "id": "1", "username": USERNAME, "password": security.hash_password(PASSWORD),
+        "roles": ["user"], "token_failed": 0,
+    }])
+    for module in (auth, users, security):
+        module.user_repository = repository
+    token_metadata.repository = repository
+    limiter.enabled = False
+    if not verbose_logging:
+        import logging
+        logging.getLogger().setLevel(logging.WARNING)
+    return app
+
+
+def percentile(samples: list[float], pct: int) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100)[pct - 1]
+
+
+async def drive(app, scenario: str, duration: float, concurrency: int, seed: int) -> dict:
+    import httpx
+
+    rng = random.Random(seed)
+    kinds, weights = zip(*[(kind, weight) for weight, kind in SCENARIOS[scenario]])
+    small, large = os.urandom(SMALL_FILE), os.urandom(LARGE_FILE)
+    counter = iter(range(10**12))
+    latencies: list[float] = []
+    errors = {"count": 0}
+
+    def unique(base: bytes) -> bytes:
+        # Distinct content per request so every scan misses the verdict cache
+        return base + next(counter).to_bytes(8, "big")
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            login = {"username": USERNAME, "password": PASSWORD, "duration": "1d"}
+            token = (await client.post("/auth/token", json=login)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            async def send(kind: str):
+                if kind == "healthcheck":
+                    return await client.get("/healthcheck/")
+                if kind == "login":
+                    return await client.post("/auth/token", json=login)
+                if kind == "scan_small":
+                    return await client.post("/scan/", headers=headers, files={"file": ("small.bin", unique(small))})
+                if kind == "scan_large":
+                    return await client.post("/scan/", headers=headers, files={"file": ("large.bin", unique(large))})
+                files = [("files", (f"part{i}.bin", unique(small))) for i in range(BATCH_FILES)]
+                return await client.post("/scan/batch?expand_archives=false", headers=headers, files=files)
+
+            async def worker(deadline: float):
+                while time.perf_counter() < deadline:
+                    kind = rng.choices(kinds, weights)[0]
+                    start = time.perf_counter()
+                    response = await send(kind)
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code >= 400:
+                        errors["count"] += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors["count"],
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_child(args):
+    with tempfile.TemporaryDirectory(prefix="filescan-bench-") as workdir:
+        app = load_app(workdir, args.log)
+        result = asyncio.run(drive(app, args.child, args.duration, args.concurrency, args.seed))
+    print(json.dumps(result))
+
+
+def run_scenario(scenario: str, args) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.load", "--child", scenario,
+        "--duration", str(args.duration), "--concurrency", str(args.concurrency), "--seed", str(args.seed),
+    ]
+    if args.log:
+        command.append("--log")
+    output = subprocess.check_output(command, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for scenario, result in results.items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{scenario}: throughput {result['throughput_rps']} < baseline {base['throughput_rps']}")
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{scenario}: p99 {result['p99_ms']}ms > baseline {base['p99_ms']}ms")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{scenario}: {result['errors']} errors > baseline {base['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--log", action="store_true", help="keep INFO logging on (slower, closer to production)")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    results = {}
+    for scenario in args.scenarios:
+        results[scenario] = result = run_scenario(scenario, args)
+        print(f"{scenario:12} {result['throughput_rps']:9.1f} req/s | p50 {result['p50_ms']:9.2f}ms "
+              f"p95 {result['p95_ms']:9.2f}ms p99 {result['p99_ms']:9.2f}ms | "
+              f"errors {result['errors']:4} | peak RSS {result['peak_rss_mb']:7.1f} MB")
+
+    if args.save_baseline:
+        baseline = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "duration": args.duration,
+                "concurrency": args.concurrency,
+            },
+            "scenarios": results,
+        }
+        with open(args.save_baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"💾 Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"⚠️ {regression}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
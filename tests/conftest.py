@@ -0,0 +1,14 @@
+import os
+
+# Settings read at import time by app modules; set before any test imports them
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("DYNAMODB_USERS_TABLE", "users")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("SCAN_POOL_WORKERS", "0")
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
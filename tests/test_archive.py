@@ -0,0 +1,130 @@
+import io
+import tarfile
+import zipfile
+import tempfile
+
+import pytest
+from fastapi import UploadFile
+
+from app.core.archive import is_archive, expand_archive, unpack_archive, ArchiveLimitError
+
+
+def zip_file(members: dict[str, bytes]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def tar_file(members: dict[str, bytes], mode: str = "w:gz") -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+def test_plain_archives_are_unpacked():
+    assert is_archive(zip_file({"a.txt": b"a", "dir/b.txt": b"b"}))
+    assert is_archive(tar_file({"a.txt": b"a"}))
+    assert is_archive(tar_file({"a.txt": b"a"}, mode="w"))
+
+
+@pytest.mark.parametrize("marker", ["[Content_Types].xml", "mimetype", "META-INF/MANIFEST.MF", "AndroidManifest.xml"])
+def test_zip_containers_are_not_unpacked(marker):
+    assert not is_archive(zip_file({marker: b"x", "content.bin": b"payload"}))
+
+
+def test_non_archives():
+    assert not is_archive(io.BytesIO(b"just some text"))
+    assert not is_archive(io.BytesIO(b""))
+
+
+def test_nested_containers_stay_whole():
+    inner = zip_file({"META-INF/MANIFEST.MF": b"Manifest-Version: 1.0\n", "A.class": b"\xca\xfe\xba\xbe"}).getvalue()
+    nested = zip_file({"lib/inner.zip": zip_file({"x.txt": b"x"}).getvalue()}).getvalue()
+    unpacked = unpack_archive(zip_file({"app.jar": inner, "bundle.zip": nested}), "upload.zip", lambda digest: None)
+    try:
+        assert sorted(member.name for member in unpacked.members) == ["upload.zip/app.jar", "upload.zip/bundle.zip/lib/inner.zip/x.txt"]
+    finally:
+        for member in unpacked.members:
+            member.file.close()
+
+
+def test_entry_limit(monkeypatch):
+    from app.core import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_ENTRIES", 2)
+    with pytest.raises(ArchiveLimitError):
+        unpack_archive(zip_file({"a": b"a", "b": b"b", "c": b"c"}), "many.zip", lambda digest: None)
+
+
+def deflated_zip(members: dict[str, bytes]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def spools(monkeypatch):
+    from app.core import archive
+
+    opened = []
+    real = tempfile.SpooledTemporaryFile
+
+    def spool(*args, **kwargs):
+        opened.append(real(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(archive.tempfile, "SpooledTemporaryFile", spool)
+    return opened
+
+
+def test_compression_ratio_limit(monkeypatch, spools):
+    from app.core import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_RATIO", 10)
+    bomb = deflated_zip({"zeros.bin": bytes(4 * archive.SPOOL_MEMORY_SIZE)})
+    assert archive.unpack_budget(bomb) == archive.SPOOL_MEMORY_SIZE
+    with pytest.raises(ArchiveLimitError):
+        unpack_archive(bomb, "bomb.zip", lambda digest: None)
+    assert spools and all(spool.closed for spool in spools)
+
+
+def test_total_budget_is_shared_by_nested_archives(monkeypatch, spools):
+    from app.core import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_TOTAL_SIZE", 1000)
+    inner = zip_file({"a.bin": b"a" * 400, "b.bin": b"b" * 400}).getvalue()
+    with pytest.raises(ArchiveLimitError):
+        unpack_archive(zip_file({"first.bin": b"x" * 300, "inner.zip": inner}), "nested.zip", lambda digest: None)
+    assert all(spool.closed for spool in spools)
+
+
+def test_member_size_limit(monkeypatch):
+    from app.core import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_MEMBER_SIZE", 100)
+    unpacked = unpack_archive(zip_file({"small.bin": b"s" * 100}), "ok.zip", lambda digest: None)
+    unpacked.members[0].file.close()
+    with pytest.raises(ArchiveLimitError):
+        unpack_archive(zip_file({"big.bin": b"b" * 101}), "big.zip", lambda digest: None)
+
+
+def test_expand_archive_closes_the_spool_that_hit_the_limit(monkeypatch, spools):
+    from app.core import archive
+
+    monkeypatch.setattr(archive, "ARCHIVE_MAX_TOTAL_SIZE", 500)
+    upload = UploadFile(file=zip_file({"a.bin": b"a" * 300, "b.bin": b"b" * 300}), filename="two.zip")
+    with pytest.raises(ArchiveLimitError):
+        expand_archive(upload)
+    assert len(spools) == 2
+    assert all(spool.closed for spool in spools)
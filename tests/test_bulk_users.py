@@ -0,0 +1,170 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from app.api import users
+from app.core import security
+from app.core.security import get_current_user
+from app.core.user_repository import InMemoryUserRepository
+
+
+class RecordingRepository(InMemoryUserRepository):
+    def __init__(self, users=None):
+        super().__init__(users)
+        self.batches = []
+        self.lookups = []
+        self.fail_batch = None
+
+    async def existing_usernames(self, usernames):
+        self.lookups.append(set(usernames))
+        return await super().existing_usernames(usernames)
+
+    async def create_many(self, items):
+        self.batches.append([item["username"] for item in items])
+        if len(self.batches) == self.fail_batch:
+            raise RuntimeError("ProvisionedThroughputExceededException")
+        await super().create_many(items)
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    repository = RecordingRepository([{"id": "0", "username": "taken", "password": "h", "roles": ["user"]}])
+    monkeypatch.setattr(users, "user_repository", repository)
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+    return repository
+
+
+@pytest.fixture
+def principal():
+    return SimpleNamespace(username="root", roles=["admin"])
+
+
+@pytest.fixture
+def client(repository, principal):
+    app = FastAPI()
+    app.include_router(users.router, prefix="/users")
+    app.dependency_overrides[get_current_user] = lambda: principal
+    return TestClient(app)
+
+
+def register(client, body, content_type: str):
+    response = client.post("/users/register/bulk", content=body, headers={"Content-Type": content_type})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return {line["row"]: line for line in map(orjson.loads, response.text.splitlines())}
+
+
+def by_status(results: dict) -> dict:
+    statuses = {}
+    for row, result in results.items():
+        statuses.setdefault(result["status"], []).append(row)
+    return statuses
+
+
+@pytest.mark.parametrize("content_type,body", [
+    ("text/csv", "username,password\nalice,pw1\nbob,pw2\nalice,pw3\ntaken,pw4\n,pw5\n"),
+    ("application/x-ndjson", "\n".join(orjson.dumps(row).decode() for row in [
+        {"username": "alice", "password": "pw1"}, {"username": "bob", "password": "pw2"},
+        {"username": "alice", "password": "pw3"}, {"username": "taken", "password": "pw4"}, "not-an-object",
+    ])),
+    ("application/json", orjson.dumps([
+        {"username": "alice", "password": "pw1"}, {"username": "bob", "password": "pw2"},
+        {"username": "alice", "password": "pw3"}, {"username": "taken", "password": "pw4"}, {"username": "eve"},
+    ])),
+])
+def test_every_row_gets_a_result(client, repository, content_type, body):
+    results = register(client, body, content_type)
+    assert by_status(results) == {"created": [1, 2], "duplicate": [3], "exists": [4], "invalid": [5]}
+    assert results[5]["error"] == "Username and password are required."
+
+    created = {item["username"]: item for item in repository.items.values()}
+    assert created["alice"]["id"] == results[1]["id"] and created["alice"]["roles"] == ["user"]
+    assert security.verify_password("pw1", created["alice"]["password"])
+    # Duplicates keep the first row's password
+    assert not security.verify_password("pw3", created["alice"]["password"])
+    # One existence check for the distinct names, not one per row
+    assert repository.lookups == [{"alice", "bob", "taken"}]
+
+
+def test_users_are_written_in_chunks(client, repository, monkeypatch):
+    monkeypatch.setattr(users, "BULK_REGISTER_CHUNK", 2)
+    body = "username,password\n" + "".join(f"user{i},pw\n" for i in range(5))
+    results = register(client, body, "text/csv")
+    assert by_status(results) == {"created": [1, 2, 3, 4, 5]}
+    assert repository.batches == [["user0", "user1"], ["user2", "user3"], ["user4"]]
+
+
+def test_a_failed_write_fails_only_its_chunk(client, repository, monkeypatch):
+    monkeypatch.setattr(users, "BULK_REGISTER_CHUNK", 2)
+    repository.fail_batch = 2
+    body = "username,password\n" + "".join(f"user{i},pw\n" for i in range(5))
+    results = register(client, body, "text/csv")
+    assert by_status(results) == {"created": [1, 2, 5], "error": [3, 4]}
+    assert results[3]["error"] == "Could not write user."
+    assert {item["username"] for item in repository.items.values()} == {"taken", "user0", "user1", "user4"}
+
+
+def test_hashing_holds_at_most_the_bulk_share_of_bcrypt(client, monkeypatch):
+    monkeypatch.setattr(users, "BULK_HASH_CONCURRENCY", 2)
+    running, peak = 0, 0
+
+    async def hash_password_async(password):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "hashed-" + password
+
+    monkeypatch.setattr(users, "hash_password_async", hash_password_async)
+    body = "username,password\n" + "".join(f"user{i},pw\n" for i in range(8))
+    assert by_status(register(client, body, "text/csv")) == {"created": list(range(1, 9))}
+    assert peak == 2
+
+
+def test_bulk_register_is_admin_only(client, principal):
+    principal.roles = ["user"]
+    response = client.post("/users/register/bulk", content="username,password\nalice,pw\n",
+                           headers={"Content-Type": "text/csv"})
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("content_type,body,status", [
+    ("text/plain", "alice,pw", 415),
+    ("application/json", '{"username": "alice"}', 400),
+    ("application/json", "[{", 400),
+    ("text/csv", b"username,password\n\xff\xfe,pw\n", 400),
+])
+def test_unparseable_bodies_are_rejected(client, repository, content_type, body, status):
+    response = client.post("/users/register/bulk", content=body, headers={"Content-Type": content_type})
+    assert response.status_code == status
+    assert repository.batches == []
+
+
+def test_oversized_uploads_are_refused(client, repository, monkeypatch):
+    from app.core import bulk_users
+
+    monkeypatch.setattr(bulk_users, "BULK_REGISTER_MAX_ROWS", 3)
+    body = "username,password\n" + "".join(f"user{i},pw\n" for i in range(4))
+    response = client.post("/users/register/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 413
+
+    # read_body's default was bound at import, so patch the limit where it is applied
+    real_read_body = bulk_users.read_body
+    monkeypatch.setattr(users, "read_body", lambda request: real_read_body(request, max_bytes=16))
+
+    def chunked():
+        yield b"username,password\n"
+        yield b"alice,pw\n"
+
+    response = client.post("/users/register/bulk", content=chunked(), headers={"Content-Type": "text/csv"})
+    assert response.status_code == 413
+    assert "split the import" in response.json()["detail"]
+    response = client.post("/users/register/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 413
+    assert repository.batches == []
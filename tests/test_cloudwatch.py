@@ -0,0 +1,195 @@
+import time
+import logging
+import threading
+
+import pytest
+import botocore.exceptions
+
+from app.core import cloudwatch
+from app.core.cloudwatch import CloudWatchLoggingHandler
+
+
+class StubLogsClient:
+    """PutLogEvents stand-in that can be slow and can fail a number of calls first."""
+
+    def __init__(self, latency: float = 0.0, failures: int = 0, error: Exception = None):
+        self.latency = latency
+        self.failures = failures
+        self.error = error or botocore.exceptions.EndpointConnectionError(endpoint_url="https://logs")
+        self.calls = []
+        self.lock = threading.Lock()
+
+    @property
+    def events(self) -> list[str]:
+        return [event["message"] for call in self.calls for event in call["logEvents"]]
+
+    def put_log_events(self, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise self.error
+            self.calls.append(kwargs)
+            return {"nextSequenceToken": str(len(self.calls))}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # Retries keep their count; only the jittered sleep between them goes
+    monkeypatch.setattr(cloudwatch.random, "uniform", lambda low, high: 0.0)
+
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"test.cloudwatch.{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+
+def spilled_lines(path) -> list[str]:
+    return path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+
+
+def test_emit_does_not_wait_for_a_slow_sink():
+    client = StubLogsClient(latency=0.2)
+    handler = CloudWatchLoggingHandler(client, "group", "stream", flush_interval=0.05)
+    handler.start()
+    logger = make_logger(handler)
+
+    start = time.perf_counter()
+    for i in range(50):
+        logger.info(f"record {i}")
+    elapsed = time.perf_counter() - start
+    handler.close()
+
+    assert elapsed < 0.2
+    assert client.events == [f"record {i}" for i in range(50)]
+
+
+def test_close_drains_the_queue_without_waiting_for_the_flush_interval():
+    client = StubLogsClient()
+    handler = CloudWatchLoggingHandler(client, "group", "stream", flush_interval=60)
+    handler.start()
+    logger = make_logger(handler)
+    for i in range(10):
+        logger.info(f"record {i}")
+
+    start = time.perf_counter()
+    handler.close()
+
+    assert time.perf_counter() - start < 5
+    assert len(client.events) == 10
+    assert handler.stats["sent"] == 10
+
+
+def test_full_queue_spills_to_file(tmp_path):
+    spill = tmp_path / "spill.log"
+    handler = CloudWatchLoggingHandler(StubLogsClient(), "group", "stream", queue_size=2, spill_path=str(spill))
+    logger = make_logger(handler)
+    for i in range(5):
+        logger.info(f"record {i}")
+
+    assert handler.stats["spilled"] == 3
+    assert [line.split(" ", 1)[1] for line in spilled_lines(spill)] == ["record 2", "record 3", "record 4"]
+
+    # Never started: close keeps the queued records in the spill file too
+    handler.close()
+    assert handler.stats["spilled"] == 5
+    assert len(spilled_lines(spill)) == 5
+
+
+def test_full_queue_without_spill_file_drops():
+    handler = CloudWatchLoggingHandler(StubLogsClient(), "group", "stream", queue_size=1)
+    logger = make_logger(handler)
+    for i in range(4):
+        logger.info(f"record {i}")
+    assert handler.stats["dropped"] == 3
+    handler.close()
+
+
+def test_transient_failures_are_retried():
+    client = StubLogsClient(failures=2)
+    handler = CloudWatchLoggingHandler(client, "group", "stream", flush_interval=0.05, max_retries=3)
+    handler.start()
+    make_logger(handler).info("survives two failures")
+    handler.close()
+
+    assert client.events == ["survives two failures"]
+    assert handler.stats["retries"] == 2
+
+
+def test_events_spill_once_retries_run_out(tmp_path):
+    spill = tmp_path / "spill.log"
+    client = StubLogsClient(failures=100)
+    handler = CloudWatchLoggingHandler(
+        client, "group", "stream", flush_interval=0.05, max_retries=2, spill_path=str(spill)
+    )
+    handler.start()
+    make_logger(handler).info("never delivered")
+    handler.close()
+
+    assert client.events == []
+    assert handler.stats["retries"] == 2
+    assert [line.split(" ", 1)[1] for line in spilled_lines(spill)] == ["never delivered"]
+
+
+def test_invalid_sequence_token_is_replaced_and_retried():
+    error = botocore.exceptions.ClientError(
+        {"Error": {"Code": "InvalidSequenceTokenException", "Message": "bad token"}, "expectedSequenceToken": "42"},
+        "PutLogEvents",
+    )
+    client = StubLogsClient(failures=1, error=error)
+    handler = CloudWatchLoggingHandler(client, "group", "stream", flush_interval=0.05, max_retries=2)
+    handler.start()
+    make_logger(handler).info("after token refresh")
+    handler.close()
+
+    assert client.calls[0]["sequenceToken"] == "42"
+    assert client.events == ["after token refresh"]
+
+
+def batch_bytes(call: dict) -> int:
+    return sum(len(event["message"].encode("utf-8")) + cloudwatch.EVENT_OVERHEAD for event in call["logEvents"])
+
+
+def test_batches_stay_within_the_byte_limit_including_the_carried_event():
+    client = StubLogsClient()
+    handler = CloudWatchLoggingHandler(client, "group", "stream", flush_interval=0.5)
+    logger = make_logger(handler)
+    for i in range(12):
+        logger.info(f"{i:02d}" + "x" * 200_000)
+    handler.start()
+    handler.close()
+
+    assert len(client.events) == 12
+    assert len(client.calls) > 2
+    assert all(batch_bytes(call) <= cloudwatch.MAX_BATCH_BYTES for call in client.calls)
+
+
+def test_batches_stay_within_the_event_limit(monkeypatch):
+    monkeypatch.setattr(cloudwatch, "MAX_BATCH_EVENTS", 5)
+    client = StubLogsClient()
+    handler = CloudWatchLoggingHandler(client, "group", "stream", flush_interval=0.5)
+    logger = make_logger(handler)
+    for i in range(12):
+        logger.info(f"record {i}")
+    handler.start()
+    handler.close()
+
+    assert client.events == [f"record {i}" for i in range(12)]
+    assert all(len(call["logEvents"]) <= 5 for call in client.calls)
+
+
+def test_counters_are_exact_under_concurrent_emits():
+    handler = CloudWatchLoggingHandler(StubLogsClient(), "group", "stream", queue_size=1)
+    logger = make_logger(handler)
+    threads = [
+        threading.Thread(target=lambda: [logger.info("x") for _ in range(2000)]) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert handler.stats["dropped"] == 8 * 2000 - 1
+    handler.close()
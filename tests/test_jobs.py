@@ -0,0 +1,212 @@
+import os
+import asyncio
+import socket
+import threading
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core import jobs
+from app.core.jobs import (
+    JobBackend, JobQueue, QueueFullError, CallbackNotAllowedError, check_callback_url, public_address,
+)
+from app.models import ScanJob
+
+pytestmark = pytest.mark.anyio
+
+ALLOWED = ["hooks.example.com", "*.ci.example.com"]
+
+
+def make_job(job_id: str, size: int = 10, callback_url=None) -> ScanJob:
+    return ScanJob(id=job_id, status="queued", filename=f"{job_id}.bin", size=size, owner="tester",
+                   submitted_at="2026-01-01 00:00:00", callback_url=callback_url)
+
+
+def spool(tmp_path, name: str) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"payload")
+    return str(path)
+
+
+def test_job_backend_is_abstract():
+    with pytest.raises(TypeError):
+        JobBackend()
+
+
+@pytest.mark.parametrize("url", [
+    "https://hooks.example.com/done",
+    "http://hooks.example.com:8080/done?job=1",
+    "https://build.ci.example.com/hook",
+])
+def test_allowed_callback_urls(url):
+    scheme, host, port = check_callback_url(url, ALLOWED)
+    assert scheme in ("http", "https") and host.endswith("example.com") and port
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://hooks.example.com/done",
+    "file:///etc/passwd",
+    "https://user:pw@hooks.example.com/done",
+    "https://hooks.example.com.evil.test/done",
+    "https://ci.example.com/done",
+    "http://169.254.169.254/latest/meta-data",
+    "https://hooks.example.com:99999/done",
+])
+def test_rejected_callback_urls(url):
+    with pytest.raises(CallbackNotAllowedError):
+        check_callback_url(url, ALLOWED)
+
+
+def test_empty_allowlist_disables_callbacks():
+    with pytest.raises(CallbackNotAllowedError):
+        check_callback_url("https://hooks.example.com/done", [])
+
+
+def resolving_to(*addresses):
+    def getaddrinfo(host, port, type=0):
+        family = lambda a: socket.AF_INET6 if ":" in a else socket.AF_INET
+        return [(family(a), socket.SOCK_STREAM, 6, "", (a, port)) for a in addresses]
+    return getaddrinfo
+
+
+@pytest.mark.parametrize("addresses", [
+    ("127.0.0.1",),
+    ("169.254.169.254",),
+    ("10.0.0.5",),
+    ("::1",),
+    ("::ffff:127.0.0.1",),
+    ("93.184.216.34", "192.168.1.1"),
+    ("224.0.0.1",),
+])
+def test_non_public_addresses_are_rejected(monkeypatch, addresses):
+    monkeypatch.setattr(jobs.socket, "getaddrinfo", resolving_to(*addresses))
+    with pytest.raises(CallbackNotAllowedError):
+        public_address("hooks.example.com", 443)
+
+
+def test_public_address_is_returned(monkeypatch):
+    monkeypatch.setattr(jobs.socket, "getaddrinfo", resolving_to("93.184.216.34", "2606:2800:220:1::1"))
+    assert public_address("hooks.example.com", 443) == "93.184.216.34"
+
+
+@pytest.fixture
+def callback_server():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append((self.path, self.headers["Host"], body))
+            if self.path.startswith("/redirect"):
+                self.send_response(302)
+                self.send_header("Location", "http://127.0.0.1/elsewhere")
+            else:
+                self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1], received
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def pinned_callbacks(monkeypatch):
+    # hooks.example.com "resolves" to the local test server; the real DNS is never asked
+    checked = []
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_HOSTS", "hooks.example.com")
+    monkeypatch.setattr(jobs, "public_address", lambda host, port: checked.append(host) or "127.0.0.1")
+    return checked
+
+
+def test_callback_goes_to_the_checked_address(callback_server, pinned_callbacks):
+    port, received = callback_server
+    job = make_job("cb", callback_url=f"http://hooks.example.com:{port}/done?job=cb")
+    jobs._post_callback(job)
+    assert pinned_callbacks == ["hooks.example.com"]
+    [(path, host, body)] = received
+    assert path == "/done?job=cb"
+    assert host == f"hooks.example.com:{port}"
+    assert ScanJob.model_validate_json(body).id == "cb"
+
+
+def test_callback_redirects_are_not_followed(callback_server, pinned_callbacks):
+    port, received = callback_server
+    with pytest.raises(http.client.HTTPException):
+        jobs._post_callback(make_job("r", callback_url=f"http://hooks.example.com:{port}/redirect"))
+    assert [path for path, _, _ in received] == ["/redirect"]
+
+
+def test_callback_to_a_host_off_the_allowlist_is_not_sent(callback_server, pinned_callbacks):
+    port, received = callback_server
+    with pytest.raises(CallbackNotAllowedError):
+        jobs._post_callback(make_job("x", callback_url=f"http://127.0.0.1:{port}/done"))
+    assert received == [] and pinned_callbacks == []
+
+
+async def test_jobs_finish_and_post_their_callback(tmp_path, callback_server, pinned_callbacks):
+    port, received = callback_server
+
+    async def scan(path, job):
+        return True, "Eicar-Signature", None
+
+    queue = JobQueue(scan=scan, workers=2)
+    path = spool(tmp_path, "job1")
+    await queue.submit(make_job("job1", callback_url=f"http://hooks.example.com:{port}/done"), path)
+    await queue.stop()
+    job = await queue.get("job1")
+    assert job.status == "done"
+    assert job.result.is_infected and job.result.infected_by == "Eicar-Signature"
+    assert not os.path.exists(path)
+    assert ScanJob.model_validate_json(received[0][2]).status == "done"
+
+
+async def test_failed_scans_mark_the_job_failed(tmp_path):
+    async def scan(path, job):
+        raise OSError("clamd went away")
+
+    queue = JobQueue(scan=scan, workers=1)
+    await queue.submit(make_job("bad"), spool(tmp_path, "bad"))
+    await queue.stop()
+    job = await queue.get("bad")
+    assert job.status == "failed" and job.error == "clamd went away" and job.finished_at
+
+
+async def test_small_files_jump_the_queue(tmp_path):
+    started, release = asyncio.Event(), asyncio.Event()
+    order = []
+
+    async def scan(path, job):
+        order.append(job.id)
+        if job.id == "first":
+            started.set()
+            await release.wait()
+        return False, None, None
+
+    queue = JobQueue(scan=scan, workers=1, small_file_size=100)
+    await queue.submit(make_job("first", size=1000), spool(tmp_path, "first"))
+    await started.wait()
+    await queue.submit(make_job("large", size=1000), spool(tmp_path, "large"))
+    await queue.submit(make_job("small", size=10), spool(tmp_path, "small"))
+    release.set()
+    await queue.stop()
+    assert order == ["first", "small", "large"]
+
+
+async def test_full_queue_rejects_instead_of_waiting(tmp_path):
+    async def scan(path, job):
+        return False, None, None
+
+    queue = JobQueue(scan=scan, workers=0, max_queued=1)
+    await queue.submit(make_job("queued"), spool(tmp_path, "queued"))
+    with pytest.raises(QueueFullError):
+        await queue.submit(make_job("rejected"), spool(tmp_path, "rejected"))
+    assert (await queue.get("rejected")).status == "failed"
+    assert (await queue.get("queued")).status == "queued"
+
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from app.api import auth
+from app.core import security
+from app.core.token_metadata import TokenMetadataWriter
+from app.core.user_repository import InMemoryUserRepository
+from app.core.utils import limiter
+
+pytestmark = pytest.mark.anyio
+
+PASSWORD = "correct horse"
+
+
+def hashed(rounds: int) -> str:
+    return CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash(PASSWORD)
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    repository = InMemoryUserRepository()
+    # Current cost is 5 rounds; anything lower is outdated
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+    monkeypatch.setattr(auth, "user_repository", repository)
+    monkeypatch.setattr(auth, "token_metadata", TokenMetadataWriter(repository=repository, interval=0))
+    return repository
+
+
+@pytest.fixture
+def client(repository, monkeypatch):
+    monkeypatch.setattr(limiter, "enabled", False)
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(auth.router, prefix="/auth")
+    return TestClient(app)
+
+
+def login(client, password: str = PASSWORD):
+    return client.post("/auth/token", json={"username": "alice", "password": password, "duration": "1d"})
+
+
+def add_alice(repository, password_hash: str):
+    repository.items["1"] = {"id": "1", "username": "alice", "password": password_hash, "roles": ["user"], "token_failed": 0}
+
+
+def test_login_rehashes_an_outdated_hash(client, repository):
+    add_alice(repository, hashed(4))
+    response = login(client)
+    assert response.status_code == 200
+    assert security.decode_token(response.json()["access_token"])["sub"] == "alice"
+    stored = repository.items["1"]["password"]
+    assert stored.startswith("$2b$05$")
+    assert security.verify_password(PASSWORD, stored)
+
+    # The upgraded hash still logs in and is left alone
+    assert login(client).status_code == 200
+    assert repository.items["1"]["password"] == stored
+
+
+def test_current_hash_is_not_rewritten(client, repository):
+    current = hashed(5)
+    add_alice(repository, current)
+    assert login(client).status_code == 200
+    assert repository.items["1"]["password"] == current
+
+
+def test_wrong_password_is_not_rehashed(client, repository):
+    outdated = hashed(4)
+    add_alice(repository, outdated)
+    assert login(client, "wrong").status_code == 401
+    assert repository.items["1"]["password"] == outdated
+    assert repository.items["1"]["token_failed"] == 1
+
+
+async def test_bcrypt_does_not_block_the_event_loop(monkeypatch):
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=10))
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.002)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    calls = security.password_stats["calls"]
+    try:
+        hashes = await asyncio.gather(*(security.hash_password_async(PASSWORD) for _ in range(4)))
+    finally:
+        task.cancel()
+    assert all(security.verify_password(PASSWORD, h) for h in hashes)
+    assert security.password_stats["calls"] == calls + 4
+    assert ticks >= 5
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.metrics import Counter, Gauge, Histogram, Registry, route_label
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Metrics register themselves on the module-level registry when created
+    registry = Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+def test_counter_exposition(registry):
+    counter = Counter("uploads", "Uploads by result", ("result",))
+    counter.labels("clean").inc()
+    counter.labels("clean").inc(2)
+    counter.labels('quote"d\nline').inc()
+    assert registry.render() == (
+        "# HELP uploads Uploads by result\n"
+        "# TYPE uploads counter\n"
+        'uploads_total{result="clean"} 3\n'
+        'uploads_total{result="quote\\"d\\nline"} 1\n'
+    )
+
+
+def test_histogram_exposition_is_cumulative(registry):
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 2.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_gauges_read_their_callback_at_scrape_time(registry):
+    depth = [3]
+    Gauge("queue_depth", "Queued jobs", lambda: depth[0])
+    Gauge("events", "Events by kind", lambda: {("sent",): 5, ("dropped",): 1}, ("kind",), kind="counter")
+    Gauge("broken", "Raises", lambda: 1 / 0)
+    depth[0] = 7
+    lines = registry.render().splitlines()
+    assert "queue_depth 7" in lines
+    assert "# TYPE events counter" in lines
+    assert 'events_total{kind="sent"} 5' in lines and 'events_total{kind="dropped"} 1' in lines
+    # A broken callback drops its own metric, not the scrape
+    assert not any(line.startswith(("broken", "# HELP broken")) for line in lines)
+
+
+def test_label_count_and_duplicate_names_are_checked(registry):
+    counter = Counter("checked", "Checked", ("a", "b"))
+    with pytest.raises(ValueError):
+        counter.labels("only-one")
+    with pytest.raises(ValueError):
+        Counter("checked", "Again")
+
+
+def test_metric_bases_are_abstract():
+    with pytest.raises(TypeError):
+        metrics._Metric("abstract", "Not a metric")
+    with pytest.raises(TypeError):
+        metrics._LabelledMetric("abstract", "Not a metric")
+
+
+def test_updates_from_worker_threads_are_not_lost(registry):
+    histogram = Histogram("threaded_seconds", "Observed from threads")
+    counter = Counter("threaded", "Counted from threads")
+    child = histogram.labels()
+    start = threading.Barrier(8)
+
+    def work():
+        start.wait()
+        for _ in range(20000):
+            child.observe(0.001)
+            counter.inc()
+
+    with ThreadPoolExecutor(8) as pool:
+        for future in [pool.submit(work) for _ in range(8)]:
+            future.result()
+    lines = registry.render().splitlines()
+    assert "threaded_seconds_count 160000" in lines
+    assert "threaded_total 160000" in lines
+
+
+def test_route_label_uses_the_template():
+    scope = {"route": object(), "path": "/scan/jobs/abc123", "path_params": {"job_id": "abc123"}}
+    assert route_label(scope) == "/scan/jobs/{job_id}"
+    assert route_label({"path": "/nope"}) == "unmatched"
+
+
+def test_metrics_endpoint_serves_the_registry(monkeypatch):
+    from app.api import metrics as metrics_api
+
+    app = FastAPI()
+    app.include_router(metrics_api.router, prefix="/metrics")
+    client = TestClient(app)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE scan_phase_duration_seconds histogram" in response.text
+    assert "# TYPE scan_cache_lookups counter" in response.text
+
+    monkeypatch.setattr(metrics_api, "METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-me"}).status_code == 200
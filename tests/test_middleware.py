@@ -0,0 +1,89 @@
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core import middleware
+from app.core.middleware import LoggingMiddleware, summarize_body
+
+SECRET = "SuperSecret1"
+
+
+def test_json_bodies_are_redacted():
+    body = b'{"username":"alice","password":"SuperSecret1","nested":[{"token":"t"}]}'
+    assert summarize_body(body, len(body), "application/json") == {
+        "username": "alice", "password": "***REDACTED***", "nested": [{"token": "***REDACTED***"}]
+    }
+
+
+def test_json_bodies_without_sensitive_keys_are_not_parsed(monkeypatch):
+    def no_parse(data):
+        raise AssertionError("parsed a body with nothing to redact")
+
+    monkeypatch.setattr(middleware, "loads", no_parse)
+    body = b'{"status":"ok","infected":false}'
+    assert summarize_body(body, len(body), "application/json") == body.decode()
+
+
+def test_form_bodies_are_redacted():
+    body = b"username=alice&password=SuperSecret1"
+    assert summarize_body(body, len(body), "application/x-www-form-urlencoded") == {
+        "username": "alice", "password": "***REDACTED***"
+    }
+
+
+def test_unredactable_bodies_log_only_size_and_type():
+    for body, content_type in (
+        (b"username,password\nalice,SuperSecret1\n", "text/csv"),
+        (b'{"username":"a","password":"SuperSecret1"}\n{"username":"b"}\n', "application/x-ndjson"),
+        (b"password SuperSecret1", "text/plain"),
+        (b'{"password": "SuperSecret1"', "application/json"),
+    ):
+        assert summarize_body(body, len(body), content_type) == {
+            "size": len(body), "content_type": content_type, "truncated": False
+        }
+
+
+def test_truncated_bodies_never_log_a_prefix():
+    captured = b'[{"username":"alice","password":"SuperSecret1"},'
+    summary = summarize_body(captured, 10_000, "application/json; charset=utf-8")
+    assert summary == {"size": 10_000, "content_type": "application/json", "truncated": True}
+
+
+def test_request_log_line_has_no_plaintext_passwords(caplog):
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        await request.body()
+        return {"ok": True}
+
+    app.add_middleware(LoggingMiddleware, max_body_bytes=64, default_rate=1.0, sample_rates={})
+    client = TestClient(app)
+    large = "[" + ",".join(f'{{"username":"u{i}","password":"{SECRET}"}}' for i in range(50)) + "]"
+    with caplog.at_level(logging.INFO):
+        client.post("/echo", content=f"username,password\nalice,{SECRET}\n", headers={"content-type": "text/csv"})
+        client.post("/echo", content=large, headers={"content-type": "application/json"})
+        client.post("/echo", data={"username": "alice", "password": SECRET})
+
+    lines = [record.getMessage() for record in caplog.records if "API Call" in record.getMessage()]
+    assert len(lines) == 3
+    assert not any(SECRET in line for line in lines)
+
+
+def test_bulk_register_bodies_are_never_captured(caplog):
+    app = FastAPI()
+
+    @app.post("/users/register/bulk")
+    async def bulk(request: Request):
+        await request.body()
+        return {"ok": True}
+
+    app.add_middleware(LoggingMiddleware, default_rate=1.0, sample_rates={}, skip_body_paths=["/users/register/bulk"])
+    client = TestClient(app)
+    with caplog.at_level(logging.INFO):
+        client.post("/users/register/bulk", json=[{"username": "alice", "password": SECRET}])
+
+    [line] = [record.getMessage() for record in caplog.records if "API Call" in record.getMessage()]
+    assert SECRET not in line
+    assert "***REDACTED REQUEST BODY***" in line
@@ -0,0 +1,29 @@
+from app.core.mime import MimePolicy, detector, DENY, ALLOW, SCAN
+
+PE_HEAD = b"MZ" + b"\x90\x00" * 30
+
+
+def test_extension_alone_never_allows():
+    policy = MimePolicy(allow_extensions=".txt")
+    assert policy.evaluate(detector.detect(PE_HEAD), "payload.txt") == SCAN
+
+
+def test_type_alone_never_allows():
+    policy = MimePolicy(allow="text/plain")
+    assert policy.evaluate("text/plain", "notes.txt") == SCAN
+
+
+def test_allow_needs_type_and_extension():
+    policy = MimePolicy(allow="text/plain,image/*", allow_extensions=".txt,.png")
+    assert policy.evaluate("text/plain", "notes.txt") == ALLOW
+    assert policy.evaluate("image/png", "photo.PNG") == ALLOW
+    # A renamed executable keeps its sniffed type
+    assert policy.evaluate(detector.detect(PE_HEAD), "payload.txt") == SCAN
+    assert policy.evaluate("text/plain", "payload.exe") == SCAN
+
+
+def test_deny_wins_on_type_or_extension():
+    policy = MimePolicy(deny="application/x-dosexec", deny_extensions=".exe", allow="*", allow_extensions=".txt")
+    assert policy.evaluate("application/x-dosexec", "payload.txt") == DENY
+    assert policy.evaluate("text/plain", "payload.exe") == DENY
+    assert policy.snapshot()["totals"] == {DENY: 2, ALLOW: 0, SCAN: 0}
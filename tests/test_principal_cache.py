@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import auth
+from app.core import security
+from app.core.principal_cache import PrincipalCache, principal_cache
+from app.core.revocation import RevocationList
+from app.core.user_repository import InMemoryUserRepository
+from app.models import UserInDB
+
+pytestmark = pytest.mark.anyio
+
+
+class CountingRepository(InMemoryUserRepository):
+    def __init__(self, users):
+        super().__init__(users)
+        self.lookups = 0
+
+    async def get_by_username(self, username: str):
+        self.lookups += 1
+        return await super().get_by_username(username)
+
+
+def user(name: str) -> UserInDB:
+    return UserInDB(id=name, username=name, password="h", roles=["user"])
+
+
+@pytest.fixture
+def repository(monkeypatch):
+    repository = CountingRepository([{"id": "1", "username": "alice", "password": "h", "roles": ["user"]}])
+    monkeypatch.setattr(security, "user_repository", repository)
+    monkeypatch.setattr(auth, "user_repository", repository)
+    return repository
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    # The shared cache, so the repository's write hooks invalidate the same one get_user reads
+    monkeypatch.setattr(principal_cache, "ttl", 0.05)
+    principal_cache.clear()
+    yield principal_cache
+    principal_cache.clear()
+
+
+def token_for(username: str) -> str:
+    return security.create_access_token({"sub": username, "roles": ["user"]}, "1d")[0]
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.core.principal_cache.time.monotonic", lambda: now[0])
+    cache = PrincipalCache(ttl=30, max_entries=10)
+    cache.put(user("alice"))
+    now[0] += 29.9
+    assert cache.get("alice") is not None
+    now[0] += 0.2
+    assert cache.get("alice") is None
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_least_recently_used_user_is_evicted():
+    cache = PrincipalCache(ttl=30, max_entries=2)
+    cache.put(user("alice"))
+    cache.put(user("bob"))
+    assert cache.get("alice") is not None
+    cache.put(user("carl"))
+    assert cache.get("bob") is None
+    assert cache.get("alice") is not None and cache.get("carl") is not None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = PrincipalCache(ttl=0, max_entries=10)
+    cache.put(user("alice"))
+    assert cache.get("alice") is None
+
+
+def test_hit_rate():
+    cache = PrincipalCache(ttl=30, max_entries=10)
+    cache.get("alice")
+    cache.put(user("alice"))
+    for _ in range(3):
+        cache.get("alice")
+    assert cache.snapshot()["hit_rate"] == 0.75
+
+
+async def test_steady_state_requests_skip_the_database(repository, cache):
+    token = token_for("alice")
+    for _ in range(20):
+        assert (await security.get_current_user(token)).username == "alice"
+    assert repository.lookups == 1
+
+    # The staleness bound: once the TTL passes the user is read again
+    await asyncio.sleep(0.06)
+    await security.get_current_user(token)
+    assert repository.lookups == 2
+
+
+async def test_revoking_tokens_takes_effect_before_the_ttl(repository, cache, monkeypatch):
+    monkeypatch.setattr(auth, "revocation_list", RevocationList(repository=repository, interval=3600))
+    monkeypatch.setattr(cache, "ttl", 3600)
+    token = token_for("alice")
+    current = await security.get_current_user(token)
+    assert cache.get("alice") is not None
+
+    await auth.revoke_tokens(username=None, current_user=current)
+    assert cache.get("alice") is None
+    with pytest.raises(HTTPException) as error:
+        await security.get_current_user(token)
+    assert error.value.status_code == 401
+
+    # Tokens issued after the revocation still work
+    assert (await security.get_current_user(token_for("alice"))).username == "alice"
+
+
+async def test_disabling_a_user_takes_effect_before_the_ttl(repository, cache, monkeypatch):
+    monkeypatch.setattr(cache, "ttl", 3600)
+    token = token_for("alice")
+    await security.get_current_user(token)
+    await repository.update("1", "alice", {"disabled": True})
+    with pytest.raises(HTTPException):
+        await security.get_current_user(token)
@@ -0,0 +1,104 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+
+from app.core import security, utils
+from app.core.utils import client_address, parse_route_limits, rate_limit_key
+
+
+def request_from(peer: str, forwarded: str = None, token: str = None) -> Request:
+    headers = []
+    if forwarded is not None:
+        headers.append((b"x-forwarded-for", forwarded.encode()))
+    if token is not None:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (peer, 1234)})
+
+
+def token_for(username: str) -> str:
+    return security.create_access_token({"sub": username, "roles": ["user"]}, "1d")[0]
+
+
+@pytest.fixture
+def trust_forwarded(monkeypatch):
+    monkeypatch.setattr(utils, "RATE_LIMIT_TRUST_FORWARDED", True)
+    monkeypatch.setattr(utils, "RATE_LIMIT_TRUSTED_PROXIES", 1)
+
+
+def test_forwarded_header_is_ignored_unless_trusted():
+    assert client_address(request_from("10.0.0.1", "203.0.113.7")) == "10.0.0.1"
+
+
+def test_rightmost_forwarded_entry_is_the_client(trust_forwarded):
+    assert client_address(request_from("10.0.0.1", "203.0.113.7")) == "203.0.113.7"
+    # Whatever the client puts on the left, the proxy's entry decides the key
+    spoofed = request_from("10.0.0.1", "198.51.100.1, 1.2.3.4, 203.0.113.7")
+    assert client_address(spoofed) == "203.0.113.7"
+    assert rate_limit_key(spoofed) == rate_limit_key(request_from("10.0.0.1", "203.0.113.7")) == "ip:203.0.113.7"
+
+
+def test_trusted_proxy_count_skips_inner_proxies(trust_forwarded, monkeypatch):
+    monkeypatch.setattr(utils, "RATE_LIMIT_TRUSTED_PROXIES", 2)
+    # CDN -> load balancer -> app: the CDN saw the client, the load balancer saw the CDN
+    assert client_address(request_from("10.0.0.1", "6.6.6.6, 203.0.113.7, 192.0.2.10")) == "203.0.113.7"
+    # A chain shorter than the proxy count was written entirely by trusted proxies
+    assert client_address(request_from("10.0.0.1", "203.0.113.7")) == "203.0.113.7"
+
+
+def test_empty_forwarded_header_falls_back_to_the_peer(trust_forwarded):
+    assert client_address(request_from("10.0.0.1", " , ")) == "10.0.0.1"
+
+
+def test_authenticated_requests_are_keyed_per_user(trust_forwarded):
+    alice, bob = token_for("alice"), token_for("bob")
+    # Two users behind one address get separate buckets...
+    assert rate_limit_key(request_from("10.0.0.1", "203.0.113.7", alice)) == "user:alice"
+    assert rate_limit_key(request_from("10.0.0.1", "203.0.113.7", bob)) == "user:bob"
+    # ...and one user keeps their bucket when their address changes
+    assert rate_limit_key(request_from("10.0.0.2", "198.51.100.1", alice)) == "user:alice"
+
+
+def test_bad_tokens_are_keyed_by_address():
+    assert rate_limit_key(request_from("10.0.0.1", token="not-a-jwt")) == "ip:10.0.0.1"
+
+
+def test_route_limit_overrides():
+    assert parse_route_limits("scan=20/minute, login=10/minute,,bad") == {"scan": "20/minute", "login": "10/minute"}
+
+
+def test_redis_storage_gets_a_bounded_pool():
+    assert utils.storage_options("redis://redis:6379/0")["max_connections"] == utils.RATE_LIMIT_POOL_SIZE
+    assert utils.storage_options("memory://") == {}
+
+
+def worker_app(connection_pool) -> TestClient:
+    # One app per worker, each with its own limiter, as in a multi-process deployment
+    limiter = Limiter(key_func=rate_limit_key, storage_uri="redis://localhost", key_prefix="filescan",
+                      storage_options={"connection_pool": connection_pool})
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+    @app.get("/scan")
+    @limiter.limit("3/minute")
+    async def scan(request: Request):
+        return {}
+
+    return TestClient(app)
+
+
+def test_workers_sharing_storage_share_each_users_limit():
+    redis = pytest.importorskip("redis")
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    pool = redis.ConnectionPool(connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer())
+    workers = [worker_app(pool), worker_app(pool)]
+    alice = {"Authorization": f"Bearer {token_for('alice')}"}
+    bob = {"Authorization": f"Bearer {token_for('bob')}"}
+
+    statuses = [workers[i % 2].get("/scan", headers=alice).status_code for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    # Other users have their own bucket, on either worker
+    assert workers[1].get("/scan", headers=bob).status_code == 200
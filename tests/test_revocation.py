@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timezone
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.principal_cache import principal_cache
+from app.core.revocation import RevocationList
+from app.core.user_repository import InMemoryUserRepository
+
+pytestmark = pytest.mark.anyio
+
+
+def token_for(username: str) -> tuple[str, float]:
+    token, _ = security.create_access_token({"sub": username, "roles": ["user"]}, "1d")
+    return token, security.issued_at(security.decode_token(token))
+
+
+def test_issue_time_keeps_sub_second_precision():
+    token, issued = token_for("alice")
+    payload = security.decode_token(token)
+    assert payload["iat"] == int(issued)
+    assert payload["iat_us"] == round(issued * 1_000_000)
+    # Tokens minted before iat_us fall back to whole seconds
+    assert security.issued_at({"iat": 1700000000}) == 1700000000
+
+
+async def test_stateless_revocation_in_the_same_second(monkeypatch):
+    revocations = RevocationList(repository=InMemoryUserRepository(), interval=3600)
+    monkeypatch.setattr(security, "revocation_list", revocations)
+    monkeypatch.setattr(security, "AUTH_STATELESS", True)
+    token, issued = token_for("alice")
+    try:
+        revocations.revoke("alice", at=issued - 0.0001)
+        assert (await security.get_current_user(token)).username == "alice"
+
+        revocations.revoke("alice", at=issued + 0.0001)
+        with pytest.raises(HTTPException):
+            await security.get_current_user(token)
+    finally:
+        await revocations.stop()
+
+
+async def test_stored_revocation_in_the_same_second(monkeypatch):
+    token, issued = token_for("alice")
+
+    def revoked_at(at: float) -> str:
+        return datetime.fromtimestamp(at, timezone.utc).replace(tzinfo=None).isoformat(timespec="microseconds")
+
+    for offset, accepted in ((-0.0001, True), (0.0001, False)):
+        principal_cache.clear()
+        repository = InMemoryUserRepository([{
+            "id": "1", "username": "alice", "password": "h", "roles": ["user"],
+            "tokens_revoked_at": revoked_at(issued + offset),
+        }])
+        monkeypatch.setattr(security, "user_repository", repository)
+        if accepted:
+            assert (await security.get_current_user(token)).username == "alice"
+        else:
+            with pytest.raises(HTTPException):
+                await security.get_current_user(token)
+    principal_cache.clear()
@@ -0,0 +1,314 @@
+import io
+import json
+import time
+import functools
+import hashlib
+import asyncio
+import zipfile
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import scan
+from app.core import jobs
+from app.core.jobs import JobQueue
+from app.core.clamd import ClamdClient, scanner
+from app.core.stream_scan import StreamScan, idle_limited
+from app.core.security import get_current_user
+from app.core.utils import limiter
+from benchmarks.fake_clamd import FakeClamd, EICAR, VIRUS_NAME
+
+
+@pytest.fixture(scope="module")
+def clamd_socket(tmp_path_factory):
+    # Own thread and loop, so the fake server keeps running across the app's event loops
+    path = str(tmp_path_factory.mktemp("clamd") / "clamd.sock")
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="fake-clamd", daemon=True).start()
+    server = asyncio.run_coroutine_threadsafe(FakeClamd().start_unix(path), loop).result()
+    yield path
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+@pytest.fixture(scope="module")
+def client(clamd_socket):
+    previous = scanner.socket_path, scanner.host
+    scanner.socket_path, scanner.host = clamd_socket, None
+    limiter.enabled = False
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(scan.router, prefix="/scan")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="tester", roles=["user"])
+    with TestClient(app) as test_client:
+        yield test_client
+    limiter.enabled = True
+    scanner.socket_path, scanner.host = previous
+
+
+def zip_bytes(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_clamd_client_against_fake_clamd(clamd_socket):
+    async def run():
+        client = ClamdClient(socket_path=clamd_socket, host=None)
+
+        async def chunks(data: bytes):
+            yield data[:5]
+            yield data[5:]
+
+        try:
+            assert await client.ping()
+            assert (await client.version()).startswith("ClamAV 1.0.0/27000")
+            assert await client.instream(chunks(b"harmless bytes")) == (False, None)
+            assert await client.instream(chunks(b"prefix " + EICAR)) == (True, VIRUS_NAME)
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+
+
+def test_scan_clean_and_infected_files(client):
+    response = client.post("/scan/", files={"file": ("clean.txt", b"test_scan clean file")})
+    assert response.status_code == 200
+    assert response.json()["is_infected"] is False
+
+    response = client.post("/scan/", files={"file": ("eicar.com", b"test_scan " + EICAR)})
+    assert response.status_code == 200
+    assert response.json()["is_infected"] is True
+    assert response.json()["infected_by"] == VIRUS_NAME
+
+
+def test_scan_reports_infected_archive_members(client):
+    archive = zip_bytes({"readme.txt": b"test_scan members", "bin/evil.com": EICAR})
+    response = client.post("/scan/", files={"file": ("bundle.zip", archive)})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["is_infected"] is True
+    assert body["infected_members"] == [{"name": "bundle.zip/bin/evil.com", "infected_by": VIRUS_NAME}]
+
+
+def test_batch_scans_unreadable_archives_whole(client):
+    archive = zip_bytes({"a.txt": b"test_scan batch"})
+    corrupt = archive[:-30] + b"\0" * 30
+    encrypted = bytearray(archive)
+    encrypted[6] |= 1  # Encryption flag in the local header...
+    encrypted[encrypted.find(b"PK\x01\x02") + 8] |= 1  # ...and in the central directory
+    response = client.post("/scan/batch", files=[
+        ("files", ("corrupt.zip", corrupt)),
+        ("files", ("encrypted.zip", bytes(encrypted))),
+        ("files", ("plain.txt", b"test_scan plain")),
+    ])
+    assert response.status_code == 200
+    results = {item["filename"]: item for item in response.json()["results"]}
+    assert set(results) == {"corrupt.zip", "encrypted.zip", "plain.txt"}
+    assert all(item["error"] is None and item["result"]["is_infected"] is False for item in results.values())
+
+
+def test_batch_rejects_bodies_over_the_upload_limit(client, monkeypatch):
+    monkeypatch.setattr(scan.LimitedUploadRoute, "max_size", 1024)
+    response = client.post("/scan/batch", files=[("files", ("big.bin", b"A" * 4096))])
+    assert response.status_code == 413
+
+
+def test_repeated_infected_archive_still_lists_members(client):
+    archive = zip_bytes({"readme.txt": b"test_scan repeat", "evil.com": EICAR})
+    first = client.post("/scan/", files={"file": ("again.zip", archive)}).json()
+    second = client.post("/scan/", files={"file": ("again.zip", archive)}).json()
+    assert first["infected_members"] == [{"name": "again.zip/evil.com", "infected_by": VIRUS_NAME}]
+    assert second["infected_members"] == first["infected_members"]
+
+
+def test_zip_containers_are_scanned_whole(client):
+    document = zip_bytes({"[Content_Types].xml": b"<Types/>", "word/document.xml": b"test_scan " + EICAR})
+    body = client.post("/scan/", files={"file": ("report.docx", document)}).json()
+    assert body["is_infected"] is True
+    assert body["infected_members"] is None
+
+
+def test_allowed_stream_upload_is_hashed_for_history(client, monkeypatch):
+    monkeypatch.setattr(scan.mime_policy, "allow", ["text/plain"])
+    monkeypatch.setattr(scan.mime_policy, "allow_extensions", (".txt",))
+    records = []
+    monkeypatch.setattr(scan.scan_history, "record", records.append)
+    body = b"test_scan streamed plain text\n" * 200
+
+    response = client.post(
+        "/scan/?filename=notes.txt", content=body, headers={"content-type": "application/octet-stream"}
+    )
+    assert response.status_code == 200
+    assert response.json()["is_infected"] is False
+    assert records[-1].sha256 == hashlib.sha256(body).hexdigest()
+    assert records[-1].size == len(body)
+
+
+def wait_for_job(client, job_id: str) -> dict:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = client.get(f"/scan/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_async_scan_is_polled_to_completion(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(scan, "JOB_SPOOL_DIR", str(tmp_path))
+    response = client.post("/scan/?async=true", files={"file": ("eicar.com", b"test_scan job " + EICAR)})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.json()["id"])
+    assert job["status"] == "done"
+    assert job["result"]["is_infected"] is True
+    assert job["result"]["infected_by"] == VIRUS_NAME
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_full_job_queue_answers_503_with_retry_after(client, monkeypatch, tmp_path):
+    async def never(path, job):
+        raise AssertionError("no worker should run")
+
+    monkeypatch.setattr(scan, "JOB_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(scan, "job_queue", JobQueue(scan=never, workers=0, max_queued=1))
+    first = client.post("/scan/?async=true", files={"file": ("a.bin", b"test_scan queued a")})
+    second = client.post("/scan/?async=true", files={"file": ("b.bin", b"test_scan queued b")})
+    assert first.status_code == 202
+    assert second.status_code == 503
+    assert second.headers["retry-after"] == str(scan.JOB_RETRY_AFTER)
+    # Only the queued job keeps a spool file
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_callback_url_off_the_allowlist_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_HOSTS", "hooks.example.com")
+    response = client.post(
+        "/scan/?async=true&callback_url=http://169.254.169.254/latest/meta-data",
+        files={"file": ("a.bin", b"test_scan callback")},
+    )
+    assert response.status_code == 400
+
+
+def test_scan_rejects_uploads_over_the_size_limit(client, monkeypatch):
+    monkeypatch.setattr(scan, "receive_upload", functools.partial(scan.receive_upload, max_size=1024))
+    monkeypatch.setattr(scan, "SpooledUpload", functools.partial(scan.SpooledUpload, max_size=1024))
+    body = b"test_scan too large " * 200
+
+    response = client.post("/scan/", files={"file": ("big.bin", body)})
+    assert response.status_code == 413
+
+    response = client.post("/scan/?filename=big.bin", content=body, headers={"content-type": "application/octet-stream"})
+    assert response.status_code == 413
+    assert response.headers["connection"] == "close"
+
+
+def stream_body(client, chunks: list[bytes], delay: float = 0.01, stall_after: int = None):
+    """
+    Posts an application/octet-stream body chunk by chunk, pausing between chunks;
+    TestClient would hand the endpoint the whole body at once. Returns
+    (status, headers, json body, chunks the endpoint read).
+    """
+    async def run():
+        messages, sent = [], 0
+
+        async def receive():
+            nonlocal sent
+            if sent == stall_after:
+                await asyncio.sleep(3600)
+            await asyncio.sleep(delay)
+            sent += 1
+            return {"type": "http.request", "body": chunks[sent - 1], "more_body": sent < len(chunks)}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http", "path": "/scan/",
+            "raw_path": b"/scan/", "root_path": "", "query_string": b"filename=upload.bin",
+            "headers": [(b"content-type", b"application/octet-stream"), (b"host", b"testserver")],
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        }
+        await client.app(scope, receive, send)
+        start = next(m for m in messages if m["type"] == "http.response.start")
+        headers = {k.decode(): v.decode() for k, v in start["headers"]}
+        content = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+        return start["status"], headers, json.loads(content), sent
+
+    return client.portal.call(run)
+
+
+STREAM_CHUNK = 16 * 1024
+STREAM_CHECKPOINT = 4 * STREAM_CHUNK
+
+
+def stream_chunks(count: int, eicar_at: int = None) -> list[bytes]:
+    data = bytearray(b"\x00\x01stream" * (count * STREAM_CHUNK // 8))
+    if eicar_at is not None:
+        data[eicar_at:eicar_at + len(EICAR)] = EICAR
+    return [bytes(data[i:i + STREAM_CHUNK]) for i in range(0, len(data), STREAM_CHUNK)]
+
+
+@pytest.fixture
+def early_checkpoints(monkeypatch):
+    monkeypatch.setattr(scan, "StreamScan", functools.partial(
+        StreamScan, checkpoint=STREAM_CHECKPOINT, checkpoint_limit=64 * STREAM_CHECKPOINT
+    ))
+
+
+def test_stream_upload_is_aborted_once_a_checkpoint_finds_malware(client, early_checkpoints):
+    chunks = stream_chunks(64, eicar_at=STREAM_CHECKPOINT + 100)
+    status, headers, body, read = stream_body(client, chunks)
+    assert status == 200
+    assert body["is_infected"] is True and body["infected_by"] == VIRUS_NAME
+    # Found by the second checkpoint; the rest of the body is never read
+    assert 2 * STREAM_CHECKPOINT <= body["aborted_at"] < 64 * STREAM_CHUNK
+    assert read == body["aborted_at"] // STREAM_CHUNK < 64
+    assert headers["connection"] == "close"
+
+
+def test_clean_stream_upload_is_read_to_the_end(client, early_checkpoints):
+    status, headers, body, read = stream_body(client, stream_chunks(16))
+    assert status == 200
+    assert body["is_infected"] is False and body["aborted_at"] is None
+    assert read == 16 and "connection" not in headers
+
+
+def test_stream_upload_falls_back_to_a_file_scan_when_clamd_drops(client, monkeypatch):
+    class DroppedStreamScan(StreamScan):
+        async def _chunks(self):
+            async for chunk in super()._chunks():
+                yield chunk
+                raise ConnectionResetError("clamd restarted")
+
+    fallbacks, failures = [], []
+    real_scan_file = scan.scan_file
+
+    async def scan_file(file, sha256=None):
+        fallbacks.append(sha256)
+        return await real_scan_file(file, sha256)
+
+    monkeypatch.setattr(scan, "StreamScan", functools.partial(DroppedStreamScan, checkpoint=0))
+    monkeypatch.setattr(scan, "scan_file", scan_file)
+    monkeypatch.setattr(scan.scanner_monitor, "report_failure", failures.append)
+    chunks = stream_chunks(8, eicar_at=STREAM_CHECKPOINT + 100)
+    status, _, body, read = stream_body(client, chunks)
+    assert status == 200
+    assert body["is_infected"] is True and body["infected_by"] == VIRUS_NAME
+    assert read == 8
+    assert fallbacks == [hashlib.sha256(b"".join(chunks)).hexdigest()]
+    assert failures == [scanner]
+
+
+def test_stalled_stream_upload_releases_the_scanner(client, monkeypatch):
+    monkeypatch.setattr(scan, "idle_limited", functools.partial(idle_limited, timeout=0.1))
+    status, headers, body, read = stream_body(client, stream_chunks(8), stall_after=2)
+    assert status == 408
+    assert headers["connection"] == "close"
+    assert read == 2
+    assert all(state.outstanding == 0 for state in scan.scanner_monitor.states)
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from app.core import scan_cache as scan_cache_module
+from app.core.scan_cache import ScanCache, signature_version_from
+
+pytestmark = pytest.mark.anyio
+
+
+def test_signature_version_from_version_reply():
+    assert signature_version_from("ClamAV 1.0.0/27000/Thu Jan  1 00:00:00 2026") == "1.0.0/27000"
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = ScanCache(max_entries=2, disk_path=None)
+    await cache.put("a", False, None)
+    await cache.put("b", False, None)
+    assert await cache.get("a") is not None
+    await cache.put("c", True, "Eicar-Signature")
+    assert await cache.get("b") is None
+    assert (await cache.get("a")).is_infected is False
+    assert (await cache.get("c")).infected_by == "Eicar-Signature"
+    assert cache.stats["evictions"] == 1
+
+
+async def test_expired_entries_are_misses():
+    cache = ScanCache(ttl=0, disk_path=None)
+    await cache.put("a", False, None)
+    assert await cache.get("a") is None
+    assert len(cache) == 0
+
+
+async def test_new_signature_version_empties_both_tiers(tmp_path):
+    path = str(tmp_path / "verdicts.db")
+    cache = ScanCache(disk_path=path)
+    await cache.set_signature_version("1.0.0/1")
+    await cache.put("a", True, "Eicar-Signature")
+
+    # A fresh process with the same signatures is served from disk
+    restarted = ScanCache(disk_path=path)
+    await restarted.set_signature_version("1.0.0/1")
+    assert (await restarted.get("a")).infected_by == "Eicar-Signature"
+    assert restarted.stats["disk_hits"] == 1
+
+    await restarted.set_signature_version("1.0.0/2")
+    assert len(restarted) == 0
+    assert await restarted.get("a") is None
+    assert restarted.stats["invalidations"] == 1
+    assert restarted._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0] == 0
+
+
+async def test_disk_tier_runs_off_the_event_loop(tmp_path, monkeypatch):
+    cache = ScanCache(disk_path=str(tmp_path / "verdicts.db"))
+    threads = []
+    real_get, real_put = ScanCache._disk_get, ScanCache._disk_put
+
+    def disk_get(self, *args):
+        threads.append(threading.current_thread())
+        return real_get(self, *args)
+
+    def disk_put(self, *args):
+        threads.append(threading.current_thread())
+        return real_put(self, *args)
+
+    monkeypatch.setattr(scan_cache_module.ScanCache, "_disk_get", disk_get)
+    monkeypatch.setattr(scan_cache_module.ScanCache, "_disk_put", disk_put)
+    await cache.put("a", False, None)
+    cache._entries.clear()
+    assert await cache.get("a") is not None
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+async def test_disk_read_raced_by_a_signature_change_is_dropped(tmp_path, monkeypatch):
+    cache = ScanCache(disk_path=str(tmp_path / "verdicts.db"))
+    await cache.set_signature_version("1.0.0/1")
+    await cache.put("a", True, "Eicar-Signature")
+    cache._entries.clear()
+    real_get = ScanCache._disk_get
+
+    def disk_get(self, sha256, version):
+        verdict = real_get(self, sha256, version)
+        self.signature_version = "1.0.0/2"  # clamd reloaded while the row was being read
+        return verdict
+
+    monkeypatch.setattr(scan_cache_module.ScanCache, "_disk_get", disk_get)
+    assert await cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,223 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import scan
+from app.core.scan_history import (
+    HistoryQuery, InMemoryScanHistoryBackend, ScanHistory, ScanHistoryBackend, SQLiteScanHistoryBackend, encode_cursor,
+)
+from app.core.security import get_current_user
+from app.models import ScanRecord
+
+pytestmark = pytest.mark.anyio
+
+HASH_A, HASH_B = "a" * 64, "b" * 64
+
+
+def record(i: int, username: str = "alice", sha256: str = HASH_A, second: int = None) -> ScanRecord:
+    # Records sharing a second tie on scanned_at and are ordered by id
+    second = i if second is None else second
+    return ScanRecord(id=f"{i:04d}", scanned_at=f"2026-01-01T00:00:{second:02d}.000000", username=username,
+                      filename=f"f{i}.bin", sha256=sha256, size=i, is_infected=i % 3 == 0, duration_ms=i)
+
+
+def records() -> list[ScanRecord]:
+    return [
+        *(record(i, second=i // 2) for i in range(10)),
+        *(record(i, username="bob", sha256=HASH_B) for i in range(10, 15)),
+    ]
+
+
+async def all_pages(backend: ScanHistoryBackend, **filters) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        page, cursor = await backend.query(HistoryQuery(limit=3, cursor=cursor, **filters))
+        pages.append([r.id for r in page])
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+async def sqlite_backend(tmp_path):
+    backend = SQLiteScanHistoryBackend(str(tmp_path / "history" / "scans.db"))
+    yield backend
+    await backend.close()
+
+
+def test_history_backend_is_abstract():
+    with pytest.raises(TypeError):
+        ScanHistoryBackend()
+
+    class WriteOnly(ScanHistoryBackend):
+        async def write(self, records):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnly()
+
+
+@pytest.mark.parametrize("make_backend", [InMemoryScanHistoryBackend, "sqlite"])
+async def test_keyset_pages_cover_every_match_once(make_backend, tmp_path):
+    backend = SQLiteScanHistoryBackend(str(tmp_path / "scans.db")) if make_backend == "sqlite" else make_backend()
+    try:
+        await backend.write(records())
+        pages = await all_pages(backend, username="alice")
+        assert pages == [["0009", "0008", "0007"], ["0006", "0005", "0004"], ["0003", "0002", "0001"], ["0000"]]
+
+        # A record landing on an earlier page after the cursor was issued doesn't shift later pages
+        first, cursor = await backend.query(HistoryQuery(username="alice", limit=3))
+        await backend.write([record(99, second=30)])
+        second, _ = await backend.query(HistoryQuery(username="alice", limit=3, cursor=cursor))
+        assert [r.id for r in second] == ["0006", "0005", "0004"]
+
+        assert await all_pages(backend, sha256=HASH_B) == [["0014", "0013", "0012"], ["0011", "0010"]]
+        window = HistoryQuery(since="2026-01-01T00:00:02.000000", until="2026-01-01T00:00:11.000000", limit=50)
+        assert [r.id for r in (await backend.query(window))[0]] == ["0011", "0010", "0009", "0008", "0007", "0006", "0005", "0004"]
+        with pytest.raises(ValueError):
+            await backend.query(HistoryQuery(cursor=encode_cursor({"id": "x"})))
+        with pytest.raises(ValueError):
+            await backend.query(HistoryQuery(cursor="%%%"))
+    finally:
+        await backend.close()
+
+
+async def test_sqlite_backend_uses_wal_and_its_indexes(sqlite_backend):
+    await sqlite_backend.write(records())
+    # Rewrites of the same id (a retried batch) are ignored
+    await sqlite_backend.write(records()[:2])
+    with sqlite3.connect(sqlite_backend.path) as db:
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.execute("SELECT COUNT(*) FROM scans").fetchone()[0] == 15
+        plan = " ".join(row[-1] for row in db.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM scans WHERE username = ? AND (scanned_at, id) < (?, ?) "
+            "ORDER BY scanned_at DESC, id DESC LIMIT 4", ("alice", "2026", "x"),
+        ))
+    assert "scans_by_username" in plan and "TEMP B-TREE" not in plan
+
+    page, _ = await sqlite_backend.query(HistoryQuery(sha256=HASH_B, limit=1))
+    assert page == [record(14, username="bob", sha256=HASH_B)]
+
+
+async def test_sqlite_readers_are_not_blocked_by_an_open_write(sqlite_backend):
+    await sqlite_backend.write(records())
+    writer = sqlite3.connect(sqlite_backend.path)
+    try:
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("DELETE FROM scans")
+        # With WAL the API's reads see the last committed state instead of waiting on the lock
+        page, _ = await asyncio.wait_for(sqlite_backend.query(HistoryQuery(limit=50)), 1)
+        assert len(page) == 15
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+class RecordingBackend(InMemoryScanHistoryBackend):
+    def __init__(self, fail: bool = False):
+        super().__init__()
+        self.batches = []
+        self.fail = fail
+
+    async def write(self, records):
+        self.batches.append(len(records))
+        if self.fail:
+            raise OSError("disk full")
+        await super().write(records)
+
+
+async def test_flusher_writes_full_batches():
+    backend = RecordingBackend()
+    history = ScanHistory(backend, batch_size=4, flush_interval=0.1)
+    for i in range(10):
+        history.record(record(i))
+    await history.stop()
+    assert backend.batches == [4, 4, 2]
+    assert history.stats == {"written": 10, "dropped": 0, "failed": 0}
+
+
+async def test_flusher_writes_a_partial_batch_after_the_interval():
+    backend = RecordingBackend()
+    history = ScanHistory(backend, batch_size=100, flush_interval=0.05)
+    history.record(record(1))
+    history.record(record(2))
+    await asyncio.sleep(0.2)
+    # Queryable without stop(): the interval, not the batch size, bounds the delay
+    assert backend.batches == [2]
+    assert [r.id for r in (await history.query(HistoryQuery()))[0]] == ["0002", "0001"]
+    await history.stop()
+
+
+async def test_record_drops_instead_of_waiting_when_full():
+    backend = RecordingBackend()
+    history = ScanHistory(backend, batch_size=10, flush_interval=0, max_queued=3)
+    for i in range(5):
+        history.record(record(i))
+    assert history.depth() == 3 and history.stats["dropped"] == 2
+    await history.stop()
+    assert history.stats["written"] == 3
+
+
+async def test_failed_writes_are_counted_and_the_flusher_keeps_going():
+    backend = RecordingBackend(fail=True)
+    history = ScanHistory(backend, batch_size=2, flush_interval=0.1)
+    for i in range(3):
+        history.record(record(i))
+    await history.stop()
+    assert history.stats == {"written": 0, "dropped": 0, "failed": 3}
+    assert backend.batches == [2, 1]
+
+
+@pytest.fixture
+def history_client(tmp_path, monkeypatch):
+    backend = SQLiteScanHistoryBackend(str(tmp_path / "scans.db"))
+    asyncio.run(backend.write(records()))
+    monkeypatch.setattr(scan, "scan_history", ScanHistory(backend))
+    principal = SimpleNamespace(username="alice", roles=["user"])
+    app = FastAPI()
+    app.include_router(scan.router, prefix="/scan")
+    app.dependency_overrides[get_current_user] = lambda: principal
+    yield TestClient(app), principal
+    asyncio.run(backend.close())
+
+
+def test_history_endpoint_pages_with_the_cursor(history_client):
+    client, _ = history_client
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/scan/history", params=params).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"{i:04d}" for i in range(9, -1, -1)]
+
+
+def test_history_endpoint_scopes_users_to_their_own_scans(history_client):
+    client, principal = history_client
+    # Non-admins asking for someone else's scans still get their own
+    items = client.get("/scan/history", params={"username": "bob", "limit": 500}).json()["items"]
+    assert {item["username"] for item in items} == {"alice"}
+
+    principal.roles = ["admin"]
+    items = client.get("/scan/history", params={"username": "bob", "limit": 500}).json()["items"]
+    assert [item["id"] for item in items] == ["0014", "0013", "0012", "0011", "0010"]
+    items = client.get("/scan/history", params={"sha256": HASH_B.upper(), "limit": 500}).json()["items"]
+    assert len(items) == 5
+
+
+def test_history_endpoint_filters_by_time_in_utc(history_client):
+    client, _ = history_client
+    params = {"since": "2026-01-01T01:00:02+01:00", "until": "2026-01-01T00:00:03Z"}
+    items = client.get("/scan/history", params=params).json()["items"]
+    assert [item["id"] for item in items] == ["0007", "0006", "0005", "0004"]
+
+
+def test_history_endpoint_rejects_bad_cursors(history_client):
+    client, _ = history_client
+    assert client.get("/scan/history", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/scan/history", params={"limit": 0}).status_code == 422
@@ -0,0 +1,77 @@
+import os
+import hashlib
+import tempfile
+
+import pytest
+
+from app.core.scan_pool import ScanPool, shareable_path
+from benchmarks.fake_clamd import FakeClamd, EICAR, VIRUS_NAME
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def clamd_socket(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("clamd") / "clamd.sock")
+    fake = await FakeClamd().start_unix(path)
+    yield path
+    await fake.close()
+
+
+@pytest.fixture
+async def pool():
+    # conftest turns the shared pool off; this one has real (spawned) workers
+    pool = ScanPool(workers=1, large_workers=1, small_file_size=1024, max_tasks=2, timeout=10)
+    yield pool
+    await pool.close()
+
+
+def test_in_memory_spool_is_not_shared_or_rolled_over():
+    with tempfile.SpooledTemporaryFile(max_size=1024) as f:
+        f.write(b"small")
+        assert shareable_path(f) is None
+        assert f.name is None
+
+
+def test_rolled_over_spool_is_shared_through_proc():
+    with tempfile.SpooledTemporaryFile(max_size=16) as f:
+        f.write(b"x" * 64)
+        path = shareable_path(f)
+        assert path == f"/proc/{os.getpid()}/fd/{f.fileno()}"
+        with open(path, "rb") as reopened:
+            assert reopened.read() == b"x" * 64
+
+
+def test_named_files_are_shared_by_name(tmp_path):
+    target = tmp_path / "upload.bin"
+    target.write_bytes(b"data")
+    with open(target, "rb") as f:
+        assert shareable_path(f) == str(target)
+
+
+async def test_workers_hash_and_scan_an_anonymous_spool(pool, clamd_socket):
+    data = b"scan pool " * 1000 + EICAR
+    with tempfile.SpooledTemporaryFile(max_size=1024) as f:
+        f.write(data)
+        f.seek(0)
+        # A worker process opens the server's unnamed temp file through /proc/<pid>/fd
+        path = shareable_path(f)
+        assert path.startswith(f"/proc/{os.getpid()}/fd/")
+        assert await pool.hash(path) == hashlib.sha256(data).hexdigest()
+        assert await pool.scan(path, clamd_socket, None) == (True, VIRUS_NAME)
+        # Reading in the worker leaves the server's file position alone
+        assert f.tell() == 0
+    assert pool.stats["large"] == 2 and pool.stats["in_flight"] == 0
+
+
+async def test_small_files_use_their_own_lane(pool, clamd_socket, tmp_path):
+    clean = tmp_path / "clean.txt"
+    clean.write_bytes(b"clean")
+    assert await pool.scan(str(clean), clamd_socket, None) == (False, None)
+    assert pool.stats["small"] == 1 and pool.stats["large"] == 0
+
+
+async def test_workers_are_recycled_after_max_tasks(pool):
+    pids = [await pool._submit("small", os.getpid) for _ in range(3)]
+    assert os.getpid() not in pids
+    assert pids[0] == pids[1] != pids[2]
@@ -0,0 +1,273 @@
+import asyncio
+
+import orjson
+import pytest
+
+from app.api import healthcheck
+from app.core import scanner_health
+from app.core.clamd import ClamdClient, ClamdUnavailableError
+from app.core.scan_cache import ScanCache
+from app.core.scanner_health import ScannerMonitor
+from benchmarks.fake_clamd import FakeClamd, EICAR, VIRUS_NAME
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sockets(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("clamd")
+    return lambda name: str(directory / f"{name}.sock")
+
+
+@pytest.fixture
+async def servers():
+    started = []
+
+    async def start(path: str, **kwargs) -> FakeClamd:
+        fake = await FakeClamd(**kwargs).start_unix(path)
+        started.append(fake)
+        return fake
+
+    yield start
+    for fake in started:
+        await fake.close()
+
+
+@pytest.fixture
+async def monitors(monkeypatch):
+    # Probe again quickly after a failure so readmission doesn't slow the tests down
+    monkeypatch.setattr(scanner_health, "SCANNER_RECHECK_DELAY", 0.02)
+    monkeypatch.setattr(scanner_health, "scan_cache", ScanCache(disk_path=None))
+    made = []
+
+    def make(nodes, standby=None, **kwargs) -> ScannerMonitor:
+        clients = [ClamdClient(socket_path=path, host=None, timeout=2) for path in nodes]
+        standby = ClamdClient(socket_path=standby, host=None, timeout=2) if standby else None
+        monitor = ScannerMonitor(clients, standby, **{"interval": 60, "hedge_after": 0, **kwargs})
+        made.append(monitor)
+        return monitor
+
+    yield make
+    for monitor in made:
+        await monitor.stop()
+        await monitor.close()
+
+
+def instream(data: bytes):
+    async def scan(client: ClamdClient):
+        async def chunks():
+            yield data
+        return await client.instream(chunks())
+    return scan
+
+
+async def health(endpoint) -> tuple[int, dict]:
+    response = await endpoint()
+    return response.status_code, orjson.loads(response.body)
+
+
+async def test_liveness_and_readiness_are_split(sockets, servers, monitors, monkeypatch):
+    monitor = monitors([sockets("primary")])
+    monkeypatch.setattr(healthcheck, "scanner_monitor", monitor)
+    await monitor.start()
+
+    # clamd is down: the process is alive but not ready
+    assert await health(healthcheck.liveness) == (200, {"status": "ok"})
+    status, body = await health(healthcheck.readiness)
+    assert status == 503 and body["ready"] is False
+    assert body["scanners"][sockets("primary")]["available"] is False
+
+    fake = await servers(sockets("primary"))
+    await monitor.probe_all()
+    status, body = await health(healthcheck.readiness)
+    assert status == 200 and body["status"] == "ok"
+    assert body["scanners"][sockets("primary")]["signature_version"] == "1.0.0/27000"
+
+    # Readiness answers from the last probe; health checks never reach clamd
+    commands = fake.commands
+    for _ in range(20):
+        await health(healthcheck.readiness)
+    assert fake.commands == commands
+
+
+async def test_probes_use_their_own_connection(sockets, servers, monitors):
+    fake = await servers(sockets("primary"))
+    monitor = monitors([sockets("primary")])
+    await monitor.probe_all()
+    assert fake.commands == 2  # PING + VERSION
+    assert monitor.primary.pool_stats() == {"idle": 0, "busy": 0}
+    assert monitor.stats["probes"] == 1 and monitor.stats["probe_failures"] == 0
+
+
+async def test_a_signature_reload_resets_the_verdict_cache(sockets, servers, monitors):
+    fake = await servers(sockets("primary"))
+    monitor = monitors([sockets("primary")])
+    await monitor.probe_all()
+    cache = scanner_health.scan_cache
+    assert cache.signature_version == "1.0.0/27000"
+    await cache.put("a" * 64, False, None)
+
+    fake.version = "ClamAV 1.0.0/27001/Fri Jan  2 00:00:00 2026"
+    await monitor.probe_all()
+    assert monitor.stats["reloads"] == 1
+    assert cache.signature_version == "1.0.0/27001"
+    assert await cache.get("a" * 64) is None
+
+
+async def test_scans_queue_until_a_scanner_comes_back(sockets, servers, monitors):
+    monitor = monitors([sockets("primary")], wait_timeout=5)
+    await monitor.start()
+    assert not monitor.ready()
+
+    scan = asyncio.create_task(monitor.run(instream(EICAR)))
+    await asyncio.sleep(0.1)
+    assert not scan.done() and monitor.stats["waits"] == 1
+
+    # The recheck loop notices the restarted clamd and releases the queued scan
+    await servers(sockets("primary"))
+    assert await asyncio.wait_for(scan, 5) == (True, VIRUS_NAME)
+    assert monitor.ready() and monitor.stats["wait_timeouts"] == 0
+
+
+async def test_queued_scans_give_up_after_the_wait_timeout(sockets, monitors):
+    monitor = monitors([sockets("primary")], wait_timeout=0.1)
+    await monitor.start()
+    with pytest.raises(ClamdUnavailableError):
+        await monitor.run(instream(b"clean"))
+    assert monitor.stats["wait_timeouts"] == 1
+
+
+async def test_standby_takes_over_while_every_node_is_down(sockets, servers, monitors):
+    await servers(sockets("standby"))
+    monitor = monitors([sockets("primary")], standby=sockets("standby"))
+    await monitor.start()
+    assert monitor.ready()
+    assert await monitor.run(instream(EICAR)) == (True, VIRUS_NAME)
+    assert monitor.stats["standby_scans"] == 1 and monitor.stats["waits"] == 0
+
+    # Once the primary is back the standby is left alone again
+    await servers(sockets("primary"))
+    await monitor.probe_all()
+    assert await monitor.run(instream(b"clean")) == (False, None)
+    assert monitor.stats["standby_scans"] == 1
+
+
+def key_preferring(monitor: ScannerMonitor, name: str) -> str:
+    return next(key for key in (f"{i:064x}" for i in range(1000)) if monitor.choose(key).name == name)
+
+
+async def test_rendezvous_choice_is_stable_and_ejection_only_moves_its_keys(sockets, monitors):
+    monitor = monitors([sockets("a"), sockets("b"), sockets("c")])
+    keys = [f"{i:064x}" for i in range(300)]
+    before = {key: monitor.choose(key).name for key in keys}
+    assert before == {key: monitor.choose(key).name for key in keys}
+    # Hashes spread over every node
+    assert set(before.values()) == {sockets("a"), sockets("b"), sockets("c")}
+
+    monitor.states[2].available = False
+    after = {key: monitor.choose(key).name for key in keys}
+    moved = [key for key in keys if after[key] != before[key]]
+    assert moved and all(before[key] == sockets("c") for key in moved)
+    assert sockets("c") not in after.values()
+
+
+async def test_a_busy_preferred_node_is_skipped_beyond_the_slack(sockets, monitors):
+    monitor = monitors([sockets("a"), sockets("b")], affinity_slack=2)
+    key = key_preferring(monitor, sockets("a"))
+    preferred, other = monitor.states
+    preferred.outstanding = 2
+    assert monitor.choose(key) is preferred
+    preferred.outstanding = 3
+    assert monitor.choose(key) is other
+
+
+async def test_slow_nodes_get_fewer_scans(sockets, monitors):
+    monitor = monitors([sockets("a"), sockets("b")])
+    fast, slow = monitor.states
+    fast.observe(0.01)
+    slow.observe(0.2)
+    # Without a key the shortest expected wait wins: three scans queued on the fast node beat one on the slow
+    fast.outstanding = 3
+    assert monitor.choose() is fast
+    fast.outstanding = 30
+    assert monitor.choose() is slow
+
+
+async def test_failed_node_is_ejected_retried_elsewhere_and_readmitted(sockets, servers, monitors):
+    await servers(sockets("a"))
+    await servers(sockets("b"))
+    monitor = monitors([sockets("a"), sockets("b")])
+    await monitor.start()
+    first, second = monitor.states
+    key = key_preferring(monitor, first.name)
+    tried, ejected = [], []
+
+    async def scan(client: ClamdClient):
+        # Both nodes take about as long, so routing follows the hash rather than timing noise
+        tried.append(client.target)
+        ejected.append(first.available is False)
+        await asyncio.sleep(0.01)
+        if client is first.client and len(tried) == 1:
+            raise ClamdUnavailableError("connection reset")
+        return client.target
+
+    assert await monitor.run(scan, key) == second.name
+    assert tried == [first.name, second.name]
+    assert ejected == [False, True]
+    assert monitor.stats["retries"] == 1
+
+    # The immediate re-probe finds clamd healthy and routes the key back
+    for _ in range(100):
+        if first.available:
+            break
+        await asyncio.sleep(0.01)
+    assert first.available is True
+    assert await monitor.run(scan, key) == first.name
+
+
+async def test_a_second_failure_is_not_retried_again(sockets, monitors):
+    monitor = monitors([sockets("a"), sockets("b")])
+    calls = []
+
+    async def scan(client: ClamdClient):
+        calls.append(client.target)
+        raise scanner_health.ClamdTimeoutError("no answer")
+
+    with pytest.raises(scanner_health.ClamdTimeoutError):
+        await monitor.run(scan, "a" * 64)
+    assert sorted(calls) == sorted([sockets("a"), sockets("b")])
+    assert all(state.available is False for state in monitor.states)
+
+
+async def test_slow_scans_are_hedged_on_another_node(sockets, servers, monitors):
+    await servers(sockets("slow"), delay=2)
+    await servers(sockets("fast"))
+    monitor = monitors([sockets("slow"), sockets("fast")], hedge_after=0.05)
+    slow, fast = monitor.states
+    key = key_preferring(monitor, slow.name)
+
+    started = asyncio.get_running_loop().time()
+    assert await monitor.run(instream(EICAR), key, hedge=True) == (True, VIRUS_NAME)
+    assert asyncio.get_running_loop().time() - started < 1
+    assert monitor.stats["hedges"] == 1 and monitor.stats["hedge_wins"] == 1
+    # The losing scan was cancelled, not left running on the slow node
+    assert slow.outstanding == 0 and fast.outstanding == 0
+
+
+async def test_only_hedge_safe_scans_are_raced(sockets, servers, monitors):
+    await servers(sockets("slow"), delay=0.3)
+    await servers(sockets("fast"))
+    monitor = monitors([sockets("slow"), sockets("fast")], hedge_after=0.05)
+    key = key_preferring(monitor, monitor.states[0].name)
+    assert await monitor.run(instream(b"clean"), key) == (False, None)
+    assert monitor.stats["hedges"] == 0
+
+
+async def test_hedges_stay_within_the_budget(sockets, monitors):
+    monitor = monitors([sockets("a"), sockets("b")], hedge_after=0.05, hedge_budget=0.1)
+    # A few hedges are allowed before there are scans to take a fraction of
+    assert monitor._hedge_allowed()
+    monitor.stats.update(scans=100, hedges=14)
+    assert monitor._hedge_allowed()
+    monitor.stats["hedges"] = 15
+    assert not monitor._hedge_allowed()
@@ -0,0 +1,131 @@
+import hashlib
+import threading
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.spool import SpooledUpload, UploadTooLargeError, receive_raw_upload, receive_upload
+
+pytestmark = pytest.mark.anyio
+
+BOUNDARY = b"testboundary"
+CHUNK = 64 * 1024
+
+
+def request_for(chunks: list[bytes], content_type: bytes) -> Request:
+    pending = list(chunks)
+
+    async def receive():
+        body = pending.pop(0) if pending else b""
+        return {"type": "http.request", "body": body, "more_body": bool(pending)}
+
+    return Request({"type": "http", "method": "POST", "headers": [(b"content-type", content_type)]}, receive)
+
+
+def multipart_chunks(payload: bytes) -> list[bytes]:
+    head = (b"--" + BOUNDARY + b'\r\nContent-Disposition: form-data; name="file"; filename="f.bin"\r\n'
+            b"Content-Type: application/octet-stream\r\n\r\n")
+    body = [payload[i:i + CHUNK] for i in range(0, len(payload), CHUNK)]
+    return [head, *body, b"\r\n--" + BOUNDARY + b"--\r\n"]
+
+
+MULTIPART = b"multipart/form-data; boundary=" + BOUNDARY
+PAYLOAD = b"%PDF-1.4\n" + bytes(range(256)) * 2000
+
+
+async def test_multipart_upload_is_hashed_and_sniffed():
+    upload = await receive_upload(request_for(multipart_chunks(PAYLOAD), MULTIPART))
+    try:
+        assert upload.filename == "f.bin"
+        assert upload.size == upload.written == len(PAYLOAD)
+        assert upload.sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+        assert upload.mime_type == "application/pdf"
+        assert upload.file.read() == PAYLOAD
+    finally:
+        upload.close()
+
+
+async def test_raw_upload_is_hashed_and_sniffed():
+    chunks = [PAYLOAD[i:i + 1000] for i in range(0, len(PAYLOAD), 1000)]
+    upload = await receive_raw_upload(request_for(chunks, b"application/octet-stream"), "f.pdf")
+    try:
+        assert upload.sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+        assert upload.mime_type == "application/pdf"
+    finally:
+        upload.close()
+
+
+async def test_hashing_and_writes_run_off_the_event_loop(monkeypatch):
+    threads, buffered = [], []
+    real = SpooledUpload._write_through
+
+    def write_through(self, data):
+        threads.append(threading.current_thread())
+        buffered.append(len(data))
+        return real(self, data)
+
+    monkeypatch.setattr(SpooledUpload, "_write_through", write_through)
+    upload = SpooledUpload("f.bin", flush_bytes=256 * 1024)
+    try:
+        for i in range(0, len(PAYLOAD), CHUNK):
+            upload.write(PAYLOAD[i:i + CHUNK])
+            await upload.drain()
+            # Never more than one flush buffer (plus the chunk that crossed it) waits in memory
+            assert upload.size - upload.written < 256 * 1024 + CHUNK
+        await upload.finish()
+    finally:
+        upload.close()
+    assert threading.main_thread() not in threads
+    # The first write goes early so the type is known; the rest are batched
+    assert buffered[0] == CHUNK and len(buffered) < len(PAYLOAD) // CHUNK
+    assert upload.sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+
+
+async def test_mime_type_is_known_after_the_first_chunks():
+    upload = SpooledUpload("f.pdf", flush_bytes=1024 * 1024)
+    try:
+        upload.write(PAYLOAD[:CHUNK])
+        await upload.drain()
+        assert upload.mime_type == "application/pdf"
+    finally:
+        upload.close()
+
+
+def test_write_past_the_limit_raises():
+    upload = SpooledUpload("f.bin", max_size=10)
+    try:
+        upload.write(b"0123456789")
+        with pytest.raises(UploadTooLargeError):
+            upload.write(b"x")
+    finally:
+        upload.close()
+
+
+async def test_declared_length_over_the_limit_is_refused_unread():
+    reads = []
+
+    async def receive():
+        reads.append(1)
+        return {"type": "http.request", "body": b"x", "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "headers": [
+        (b"content-type", MULTIPART), (b"content-length", b"5000"),
+    ]}, receive)
+    with pytest.raises(HTTPException) as error:
+        await receive_upload(request, max_size=4096)
+    assert error.value.status_code == 413
+    assert reads == []
+
+
+@pytest.mark.parametrize("raw", [False, True])
+async def test_streamed_body_over_the_limit_is_refused(raw):
+    if raw:
+        request = request_for([b"x" * CHUNK] * 4, b"application/octet-stream")
+        receive = receive_raw_upload(request, "f.bin", max_size=CHUNK * 2)
+    else:
+        receive = receive_upload(request_for(multipart_chunks(b"x" * CHUNK * 4), MULTIPART), max_size=CHUNK * 2)
+    with pytest.raises(HTTPException) as error:
+        await receive
+    assert error.value.status_code == 413
+
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import logging
+import threading
+import subprocess
+
+import pytest
+
+from app.core import aws, user_repository
+from app.core.cloudwatch import CloudWatchLoggingHandler
+from app.core.user_repository import UserRepository
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Any TCP connect in the child is recorded and refused, as if AWS were unreachable
+NO_NETWORK = """
+import sys, json, time, socket, threading
+connects = []
+real_connect = socket.socket.connect
+
+def connect(self, address):
+    if self.family in (socket.AF_INET, socket.AF_INET6):
+        connects.append(repr(address))
+        raise OSError("network disabled")
+    return real_connect(self, address)
+
+socket.socket.connect = connect
+start = time.perf_counter()
+"""
+
+
+def run_child(script: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", NO_NETWORK + script], cwd=ROOT, capture_output=True, text=True, timeout=60,
+        env={**os.environ, "AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test", "AWS_MAX_ATTEMPTS": "1",
+             "CLOUDWATCH_MAX_RETRIES": "0"},
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(next(line for line in result.stdout.splitlines() if line.startswith("{")))
+
+
+def test_importing_the_app_contacts_nothing():
+    child = run_child("""
+from app.main import app
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "connects": connects,
+    "boto3": "boto3" in sys.modules,
+    "threads": [t.name for t in threading.enumerate()],
+}))
+""")
+    assert child["connects"] == []
+    assert not child["boto3"]
+    assert "cloudwatch-shipper" not in child["threads"]
+    assert child["seconds"] < 10
+
+
+def test_first_request_is_served_while_aws_is_unreachable():
+    child = run_child("""
+import asyncio
+import httpx
+from app.main import app
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            live = await client.get("/healthcheck/live")
+        return live.status_code, time.perf_counter() - start
+
+status, seconds = asyncio.run(first_request())
+print(json.dumps({"status": status, "seconds": seconds}))
+""")
+    # CloudWatch gives up in the background; startup and the first request don't wait for it
+    assert child["status"] == 200
+    assert child["seconds"] < 10
+
+
+def test_one_session_is_shared_by_every_thread(monkeypatch):
+    monkeypatch.setattr(aws, "_session", None)
+    start = threading.Barrier(8)
+    sessions = []
+
+    def get():
+        start.wait()
+        sessions.append(aws.aws_session())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(session) for session in sessions}) == 1
+    assert sessions[0] is aws.aws_session()
+    assert sessions[0].region_name == aws.AWS_REGION
+
+
+def test_repository_builds_its_table_on_first_use(monkeypatch):
+    calls = []
+
+    def aws_session():
+        calls.append(1)
+        return aws.aws_session()
+
+    monkeypatch.setattr(user_repository, "aws_session", aws_session)
+    monkeypatch.setattr(aws, "_session", None)
+    repository = UserRepository(table_name="users")
+    assert calls == []
+    assert repository.table.name == "users"
+    assert repository.table is repository.table
+    assert calls == [1]
+
+
+def test_log_stream_is_provisioned_on_start_and_earlier_records_are_shipped(monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test")):
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(aws, "_session", None)
+    with moto.mock_aws():
+        logs = boto3.client("logs", region_name=aws.AWS_REGION)
+        handler = CloudWatchLoggingHandler(None, "/test-group", "test-stream", flush_interval=0.05, provision=True)
+        logger = logging.getLogger("test.startup")
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            logger.warning("logged before startup")
+            assert handler.client is None
+            assert logs.describe_log_groups()["logGroups"] == []
+
+            handler.start()
+            logger.warning("logged after startup")
+        finally:
+            handler.close()
+            logger.removeHandler(handler)
+        assert [g["logGroupName"] for g in logs.describe_log_groups()["logGroups"]] == ["/test-group"]
+        events = logs.get_log_events(logGroupName="/test-group", logStreamName="test-stream")["events"]
+        assert [e["message"] for e in events] == ["logged before startup", "logged after startup"]
+        assert handler.stats["sent"] == 2
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from app.core import stream_scan
+from app.core.clamd import ClamdClient
+from app.core.spool import SpooledUpload
+from app.core.stream_scan import StreamScan, UploadStalledError, idle_limited
+from benchmarks.fake_clamd import FakeClamd, EICAR, VIRUS_NAME
+
+pytestmark = pytest.mark.anyio
+
+CHUNK = 1024
+CHECKPOINT = 4 * CHUNK
+
+
+@pytest.fixture
+async def clamd(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("clamd") / "clamd.sock")
+    fake = await FakeClamd().start_unix(path)
+    client = ClamdClient(socket_path=path, host=None, timeout=5)
+    yield client
+    await client.close()
+    await fake.close()
+
+
+@pytest.fixture
+def checkpoint_sizes(monkeypatch):
+    sizes = []
+    real = stream_scan.iter_prefix
+    monkeypatch.setattr(stream_scan, "iter_prefix", lambda fileobj, size: sizes.append(size) or real(fileobj, size))
+    return sizes
+
+
+def body(size: int, eicar_at: int = None) -> bytes:
+    data = bytearray(b"\x00\x01stream" * (size // 8 + 1))[:size]
+    if eicar_at is not None:
+        data[eicar_at:eicar_at + len(EICAR)] = EICAR
+    return bytes(data)
+
+
+async def feed_all(stream: StreamScan, data: bytes):
+    """
+    Feeds `data` chunk by chunk, letting each checkpoint finish before the next
+    chunk so the schedule doesn't depend on timing. Returns (virus_name, bytes fed).
+    """
+    for offset in range(0, len(data), CHUNK):
+        virus_name = await stream.feed(data[offset:offset + CHUNK])
+        if virus_name is not None:
+            return virus_name, offset + CHUNK
+        if stream._checkpoint is not None:
+            await asyncio.wait({stream._checkpoint})
+    return None, len(data)
+
+
+async def test_checkpoints_double_up_to_the_limit(clamd, checkpoint_sizes):
+    upload = SpooledUpload("clean.bin")
+    stream = StreamScan(upload, clamd, checkpoint=CHECKPOINT, checkpoint_limit=8 * CHECKPOINT)
+    try:
+        data = body(64 * CHUNK)
+        assert await feed_all(stream, data) == (None, len(data))
+        assert await stream.finish() == (False, None)
+    finally:
+        await stream.stop()
+        upload.close()
+    assert checkpoint_sizes == [CHECKPOINT, 2 * CHECKPOINT, 4 * CHECKPOINT, 8 * CHECKPOINT]
+    assert stream.checkpoints == 4
+
+
+async def test_payload_after_the_first_checkpoint_is_found_early(clamd, checkpoint_sizes):
+    upload = SpooledUpload("eicar.bin")
+    stream = StreamScan(upload, clamd, checkpoint=CHECKPOINT, checkpoint_limit=64 * CHECKPOINT)
+    try:
+        virus_name, fed = await feed_all(stream, body(64 * CHUNK, eicar_at=CHECKPOINT + 100))
+        await stream.stop()
+    finally:
+        upload.close()
+    assert virus_name == VIRUS_NAME
+    # The first prefix is clean; the second covers the payload and stops the upload at ~2N bytes
+    assert checkpoint_sizes == [CHECKPOINT, 2 * CHECKPOINT]
+    assert fed <= 2 * CHECKPOINT + CHUNK
+
+
+async def test_live_pass_finds_what_the_checkpoints_missed(clamd, checkpoint_sizes):
+    upload = SpooledUpload("eicar.bin")
+    stream = StreamScan(upload, clamd, checkpoint=CHECKPOINT, checkpoint_limit=2 * CHECKPOINT)
+    try:
+        data = body(32 * CHUNK, eicar_at=20 * CHUNK)
+        assert await feed_all(stream, data) == (None, len(data))
+        assert await stream.finish() == (True, VIRUS_NAME)
+    finally:
+        await stream.stop()
+        upload.close()
+    assert checkpoint_sizes == [CHECKPOINT, 2 * CHECKPOINT]
+
+
+async def test_stalled_clamd_cancels_the_live_pass(tmp_path_factory, monkeypatch):
+    # A clamd that accepts the connection but never reads: the socket buffer and then the queue fill up
+    path = str(tmp_path_factory.mktemp("stalled") / "clamd.sock")
+    held = []
+    server = await asyncio.start_unix_server(lambda reader, writer: held.append(writer), path)
+    monkeypatch.setattr(stream_scan, "STREAM_SCAN_QUEUE", 2)
+    client = ClamdClient(socket_path=path, host=None, timeout=0.2)
+    upload = SpooledUpload("stuck.bin", flush_bytes=1)
+    stream = StreamScan(upload, client, checkpoint=0)
+    try:
+        for _ in range(256):
+            await stream.feed(b"x" * 64 * CHUNK)
+            if stream._live.done():
+                break
+        assert stream._live.cancelled()
+        # The caller falls back to scanning the spooled copy
+        assert await stream.finish() is None
+        assert upload.sha256 is not None
+    finally:
+        await stream.stop()
+        upload.close()
+        for writer in held:
+            writer.close()
+        server.close()
+        await client.close()
+
+
+async def test_idle_limited_raises_when_the_body_stalls():
+    async def trickle():
+        yield b"first"
+        await asyncio.sleep(1)
+        yield b"late"
+
+    received = []
+    with pytest.raises(UploadStalledError):
+        async for chunk in idle_limited(trickle(), timeout=0.05):
+            received.append(chunk)
+    assert received == [b"first"]
+
+
+async def test_idle_limited_allows_slow_but_steady_bodies():
+    async def steady():
+        for _ in range(5):
+            await asyncio.sleep(0.02)
+            yield b"chunk"
+
+    # Five chunks take longer than the timeout in total, but none waits longer on its own
+    assert [chunk async for chunk in idle_limited(steady(), timeout=0.05)] == [b"chunk"] * 5
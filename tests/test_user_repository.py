@@ -0,0 +1,177 @@
+import pytest
+
+from app.core import security
+from app.core.principal_cache import principal_cache
+from app.core.user_repository import InMemoryUserRepository, UserRepository
+
+pytestmark = pytest.mark.anyio
+
+ALICE = {"id": "1", "username": "alice", "password": "hash-1", "roles": ["user"], "token_failed": 0}
+
+
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        table = boto3.resource("dynamodb", region_name="us-east-1").create_table(
+            TableName="users",
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "username", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "username-index",
+                "KeySchema": [{"AttributeName": "username", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield table
+
+
+@pytest.fixture
+def dynamodb_repository(dynamodb_table):
+    repository = UserRepository(table_name="users", username_index="username-index", max_pool_connections=4)
+    repository.table = dynamodb_table
+    return repository
+
+
+async def test_in_memory_get_by_username_returns_a_copy():
+    repository = InMemoryUserRepository([ALICE])
+    user = await repository.get_by_username("alice")
+    assert user == ALICE
+    user["roles"].append("admin")
+    user["password"] = "changed"
+    assert (await repository.get_by_username("alice"))["password"] == "hash-1"
+    assert await repository.get_by_username("bob") is None
+
+
+async def test_in_memory_update_and_token_metadata():
+    repository = InMemoryUserRepository([ALICE])
+    await repository.update_password_hash("1", "alice", "hash-2")
+    await repository.update_token_metadata("alice", success=False)
+    user = await repository.get_by_username("alice")
+    assert user["password"] == "hash-2"
+    assert user["token_failed"] == 1
+
+
+async def test_gsi_lookup_create_and_update(dynamodb_repository):
+    assert await dynamodb_repository.get_by_username("alice") is None
+    await dynamodb_repository.create(dict(ALICE))
+    assert (await dynamodb_repository.get_by_username("alice"))["id"] == "1"
+
+    await dynamodb_repository.update("1", "alice", {"password": "hash-2", "token_failed": 3})
+    user = await dynamodb_repository.get_by_username("alice")
+    assert user["password"] == "hash-2"
+    assert user["token_failed"] == 3
+
+
+async def test_gsi_existing_usernames_and_create_many(dynamodb_repository):
+    await dynamodb_repository.create_many([
+        {"id": str(i), "username": f"user{i}", "password": "h", "roles": ["user"]} for i in range(60)
+    ])
+    assert await dynamodb_repository.existing_usernames({"user1", "user59", "nobody"}) == {"user1", "user59"}
+    wanted = {f"user{i}" for i in range(0, 120, 2)}
+    assert await dynamodb_repository.existing_usernames(wanted) == {f"user{i}" for i in range(0, 60, 2)}
+
+
+async def test_existing_usernames_never_scans_the_table(dynamodb_repository, monkeypatch):
+    await dynamodb_repository.create(dict(ALICE))
+
+    def no_scan(**kwargs):
+        raise AssertionError("existing_usernames scanned the table")
+
+    monkeypatch.setattr(dynamodb_repository.table, "scan", no_scan)
+    wanted = {"alice"} | {f"new{i}" for i in range(100)}
+    assert await dynamodb_repository.existing_usernames(wanted) == {"alice"}
+
+
+async def test_revoked_users_only_returns_marked_users(dynamodb_repository):
+    await dynamodb_repository.create(dict(ALICE))
+    await dynamodb_repository.create({"id": "2", "username": "bob", "disabled": True})
+    await dynamodb_repository.create({"id": "3", "username": "carl", "tokens_revoked_at": "2026-01-01T00:00:00"})
+    revoked = {user["username"] for user in await dynamodb_repository.revoked_users()}
+    assert revoked == {"bob", "carl"}
+
+
+@pytest.mark.parametrize("backend", ["memory", "dynamodb"])
+async def test_writes_invalidate_the_principal_cache(backend, monkeypatch, request):
+    if backend == "memory":
+        repository = InMemoryUserRepository([ALICE])
+    else:
+        repository = request.getfixturevalue("dynamodb_repository")
+        await repository.create(dict(ALICE))
+    monkeypatch.setattr(security, "user_repository", repository)
+
+    assert (await security.get_user("alice")).password == "hash-1"
+    assert principal_cache.get("alice") is not None
+
+    await repository.update_password_hash("1", "alice", "hash-2")
+    assert principal_cache.get("alice") is None
+    assert (await security.get_user("alice")).password == "hash-2"
+
+    await repository.update("1", "alice", {"roles": ["user", "admin"]})
+    assert (await security.get_user("alice")).roles == ["user", "admin"]
+
+
+async def test_username_lookup_queries_the_index_and_never_scans(dynamodb_repository, monkeypatch):
+    await dynamodb_repository.create_many([
+        {"id": str(i), "username": f"user{i}", "password": "h", "roles": ["user"]} for i in range(200)
+    ])
+    queries = []
+    real_query = dynamodb_repository.table.query
+
+    def query(**kwargs):
+        queries.append(kwargs)
+        return real_query(**kwargs)
+
+    def no_scan(**kwargs):
+        raise AssertionError("get_by_username scanned the table")
+
+    monkeypatch.setattr(dynamodb_repository.table, "query", query)
+    monkeypatch.setattr(dynamodb_repository.table, "scan", no_scan)
+    assert (await dynamodb_repository.get_by_username("user199"))["id"] == "199"
+    assert await dynamodb_repository.get_by_username("nobody") is None
+    assert [q["IndexName"] for q in queries] == ["username-index", "username-index"]
+    assert all(q["Limit"] == 1 for q in queries)
+
+
+def test_migration_adds_the_username_index_to_an_existing_table(monkeypatch, capsys):
+    moto = pytest.importorskip("moto")
+    import boto3
+    from app.core import migrate_users
+
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        table = boto3.resource("dynamodb", region_name="us-east-1").create_table(
+            TableName="legacy_users",
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for item in ({"id": "1", "username": "alice"}, {"id": "2", "username": "bob"}, {"id": "3", "username": "bob"}):
+            table.put_item(Item=item)
+        assert migrate_users.username_index_status(table, "username-index") is None
+
+        migrate_users.migrate("legacy_users", "username-index", poll=0)
+        assert migrate_users.username_index_status(table, "username-index") == "ACTIVE"
+        assert "bob" in capsys.readouterr().out
+
+        # Running it again is a no-op
+        migrate_users.migrate("legacy_users", "username-index", poll=0)
+        repository = UserRepository(table_name="legacy_users", username_index="username-index", max_pool_connections=2)
+        repository.table = table
+        assert repository._get_by_username("alice")["id"] == "1"